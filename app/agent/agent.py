@@ -4,18 +4,26 @@
 
 from __future__ import annotations
 
-from dataclasses import dataclass
-from typing import Optional, Dict
+import logging
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional
 
 from app.agent import workflows
+from app.config.settings import settings
+from app.core.catalog import get_project_catalog
+from app.mcp_client import git_tools, vector_tools
+
+logger = logging.getLogger(__name__)
 
 
 @dataclass
 class ProjectContext:
-    # Контекст проекта, с которым работает агент (slug, имя, описание)
+    # Контекст проекта, с которым работает агент (slug, имя, описание, репозитории и пространства Confluence)
     slug: str
     name: Optional[str] = None
     description: Optional[str] = None
+    repos: List[Dict[str, Any]] = field(default_factory=list)
+    spaces: List[Dict[str, Any]] = field(default_factory=list)
 
 
 class DocOpsAgent:
@@ -29,6 +37,52 @@ class DocOpsAgent:
         # Инициализирует агента с контекстом проекта и опциональной моделью LLM
         self.project = project
         self.model = model
+        self.warm = False
+
+    # ------------------------
+    # Состояние проекта
+    # ------------------------
+
+    def warm_up(self) -> None:
+        # Поднимает состояние проекта до первого вопроса: метаданные из каталога проектов,
+        # индекс search_in_docs и документы векторного хранилища
+        slug = self.project.slug
+        self._refresh_project()
+
+        files = git_tools.warm_docs_index(slug)
+        try:
+            vectors = vector_tools.warm(slug)
+        except Exception:
+            logger.exception("Vector store warm-up failed for %s", slug)
+            vectors = 0
+        self.warm = True
+        logger.info("Agent for %s is warm: %d docs indexed, %d in vector store", slug, files, vectors)
+
+    def _refresh_project(self) -> None:
+        # Метаданные, репозитории и пространства проекта из каталога (кэш в процессе, сбрасывается при записи в БД)
+        info = get_project_catalog().get(self.project.slug)
+        if info is None:
+            return
+        self.project.name = self.project.name or info.name
+        self.project.description = self.project.description or info.description
+        self.project.repos = info.repos
+        self.project.spaces = info.spaces
+
+    def _confluence_space(self) -> Optional[str]:
+        # Пространство Confluence проекта для поиска; без настроенного Confluence поиск по нему не идет
+        if not settings.confluence.base_url:
+            return None
+        self._refresh_project()
+        return self.project.spaces[0]["space_key"] if self.project.spaces else None
+
+    def close(self) -> None:
+        # Освобождает состояние проекта (индекс документации выгружается из памяти)
+        git_tools.release_docs_index(self.project.slug)
+        self.warm = False
+
+    # ------------------------
+    # Вопросы и ответы
+    # ------------------------
 
     def answer_question(self, question: str) -> dict:
         # Отвечает на вопросы по документации
@@ -36,8 +90,60 @@ class DocOpsAgent:
             project_slug=self.project.slug,
             question=question,
             model=self.model,
+            confluence_space=self._confluence_space(),
+        )
+        return {
+            "answer": qa_result.answer,
+            "sources": qa_result.sources,
+            "context_tokens": qa_result.context_tokens,
+            "cached": qa_result.cached,
+        }
+
+    async def aanswer_question(self, question: str) -> dict:
+        # Асинхронный answer_question (AsyncOpenAI, общие лимиты и объединение одинаковых вопросов)
+        qa_result = await workflows.aqa_over_docs(
+            project_slug=self.project.slug,
+            question=question,
+            model=self.model,
+            confluence_space=self._confluence_space(),
         )
         return {
             "answer": qa_result.answer,
             "sources": qa_result.sources,
+            "context_tokens": qa_result.context_tokens,
+            "cached": qa_result.cached,
+        }
+
+    def answer_question_stream(self, question: str) -> Iterator[Dict[str, Any]]:
+        # Потоковый ответ: сначала источники, затем фрагменты ответа (события qa_over_docs_stream)
+        for event in workflows.qa_over_docs_stream(
+            project_slug=self.project.slug,
+            question=question,
+            model=self.model,
+            confluence_space=self._confluence_space(),
+        ):
+            yield self._stream_event(event)
+
+    async def aanswer_question_stream(self, question: str) -> AsyncIterator[Dict[str, Any]]:
+        # Асинхронный потоковый ответ (AsyncOpenAI, общие лимиты на запросы к LLM)
+        async for event in workflows.aqa_over_docs_stream(
+            project_slug=self.project.slug,
+            question=question,
+            model=self.model,
+            confluence_space=self._confluence_space(),
+        ):
+            yield self._stream_event(event)
+
+    @staticmethod
+    def _stream_event(event: Dict[str, Any]) -> Dict[str, Any]:
+        # Итоговое событие отдается в том же виде, что и answer_question
+        if event["type"] != "done":
+            return event
+        result = event["result"]
+        return {
+            "type": "done",
+            "answer": result.answer,
+            "sources": result.sources,
+            "context_tokens": result.context_tokens,
+            "cached": result.cached,
         }
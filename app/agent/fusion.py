@@ -0,0 +1,107 @@
+# app/agent/fusion.py
+
+# Слияние результатов поиска из разных источников (git, vector, confluence) в один список:
+# единая идентичность документа, reciprocal rank fusion и отсев почти одинаковых фрагментов (MinHash)
+
+from __future__ import annotations
+
+import re
+import zlib
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+# Константа RRF: сглаживает вклад первых позиций (значение из оригинальной статьи)
+_RRF_K = 60
+
+# Параметры MinHash: число хэш-функций, длина шингла в словах, порог оценки Жаккара для дубликата
+_MINHASH_PERMUTATIONS = 64
+_SHINGLE_WORDS = 3
+_DUPLICATE_THRESHOLD = 0.8
+
+# Хэш-функции (a * h + b) mod p; a < 2^31 и h < 2^32, поэтому вычисление не переполняет uint64
+_MERSENNE_PRIME = (1 << 61) - 1
+_rng = np.random.default_rng(1)
+_HASH_A = _rng.integers(1, 1 << 31, size=_MINHASH_PERMUTATIONS, dtype=np.uint64)
+_HASH_B = _rng.integers(0, _MERSENNE_PRIME, size=_MINHASH_PERMUTATIONS, dtype=np.uint64)
+
+_WORD_RE = re.compile(r"\w+")
+
+
+def source_id(kind: str, hit: Dict[str, Any]) -> str:
+    # Общий ключ документа: файл из git и тот же файл в vector store (doc_id = путь) совпадают
+    if kind == "confluence":
+        return f"confluence:{hit.get('id')}"
+    path = str(hit.get("path") or hit.get("doc_id") or hit.get("id") or "")
+    path = path.replace("\\", "/")
+    while path.startswith("./"):
+        path = path[2:]
+    return path
+
+
+def minhash(text: str) -> Optional[np.ndarray]:
+    # Сигнатура MinHash по словным шинглам; None — слишком короткий текст
+    words = _WORD_RE.findall(text.lower())
+    if not words:
+        return None
+    n = min(_SHINGLE_WORDS, len(words))
+    shingles = {" ".join(words[i:i + n]) for i in range(len(words) - n + 1)}
+    hashes = np.fromiter((zlib.crc32(s.encode("utf-8")) for s in shingles), dtype=np.uint64)
+    mixed = (_HASH_A[:, None] * hashes[None, :] + _HASH_B[:, None]) % _MERSENNE_PRIME
+    return mixed.min(axis=1)
+
+
+def similarity(a: Optional[np.ndarray], b: Optional[np.ndarray]) -> float:
+    # Оценка коэффициента Жаккара двух множеств шинглов
+    if a is None or b is None:
+        return 0.0
+    return float(np.mean(a == b))
+
+
+def fuse(
+    results: Dict[str, List[Dict[str, Any]]],
+    limit: Optional[int] = None,
+    duplicate_threshold: float = _DUPLICATE_THRESHOLD,
+) -> List[Dict[str, Any]]:
+    # results: {kind: [hit, ...]} — каждый список упорядочен по релевантности своего источника.
+    # Возвращает [{"path", "snippet", "kind", "kinds", "score"}, ...] по убыванию RRF-очков
+    fused: Dict[str, Dict[str, Any]] = {}
+    for kind, hits in results.items():
+        for rank, hit in enumerate(hits, start=1):
+            key = source_id(kind, hit)
+            contribution = 1.0 / (_RRF_K + rank)
+            item = fused.get(key)
+            if item is None:
+                fused[key] = {
+                    "path": (hit.get("title") or key) if kind == "confluence" else key,
+                    "snippet": hit.get("snippet") or hit.get("text") or "",
+                    "kind": kind,
+                    "kinds": [kind],
+                    "score": contribution,
+                    "_best_rank": rank,
+                }
+                continue
+
+            item["score"] += contribution
+            if kind not in item["kinds"]:
+                item["kinds"].append(kind)
+            # Фрагмент берем у источника, где документ стоит выше
+            if rank < item["_best_rank"]:
+                item["snippet"] = hit.get("snippet") or item["snippet"]
+                item["kind"] = kind
+                item["_best_rank"] = rank
+
+    ordered = sorted(fused.values(), key=lambda x: (-x["score"], x["_best_rank"], x["path"]))
+
+    kept: List[Dict[str, Any]] = []
+    signatures: List[Optional[np.ndarray]] = []
+    for item in ordered:
+        signature = minhash(item["snippet"])
+        if any(similarity(signature, other) >= duplicate_threshold for other in signatures):
+            continue
+        item.pop("_best_rank")
+        kept.append(item)
+        signatures.append(signature)
+        if limit is not None and len(kept) >= limit:
+            break
+    return kept
@@ -0,0 +1,129 @@
+# app/agent/packing.py
+
+# Упаковка найденных фрагментов в контекст LLM под бюджет токенов (подсчет — app.core.tokens):
+# жадный отбор по релевантности на токен и обрезка фрагментов по границам предложений
+
+from __future__ import annotations
+
+import re
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional
+
+from app.core.tokens import estimate_tokens
+
+# Разделитель блоков в промпте (тот же, что склеивает context_blocks в workflows)
+BLOCK_SEPARATOR = "\n\n---\n\n"
+
+# Фрагмент короче этого остатка бюджета не обрезаем под него — слишком мало смысла
+_MIN_TRIMMED_TOKENS = 32
+
+_SENTENCE_RE = re.compile(r"[^.!?…\n]*(?:[.!?…]+|\n+|$)\s*")
+
+
+def split_sentences(text: str) -> List[str]:
+    # Предложения вместе с хвостовыми пробелами: "".join(...) == text
+    return [s for s in _SENTENCE_RE.findall(text) if s]
+
+
+def trim_to_tokens(text: str, max_tokens: int, count: Callable[[str], int]) -> str:
+    # Обрезает текст до max_tokens по границе предложения; если не влезает даже первое
+    # предложение — режет его по словам
+    if count(text) <= max_tokens:
+        return text
+
+    kept: List[str] = []
+    used = 0
+    for sentence in split_sentences(text):
+        cost = count(sentence)
+        if used + cost > max_tokens:
+            break
+        kept.append(sentence)
+        used += cost
+    if kept:
+        return "".join(kept).rstrip()
+
+    words: List[str] = []
+    for word in text.split():
+        if count(" ".join(words + [word])) > max_tokens:
+            break
+        words.append(word)
+    return " ".join(words)
+
+
+def _trim_to_chars(text: str, max_chars: int) -> str:
+    # Обрезка по длине в символах, но по последней целой фразе (если она есть)
+    if len(text) <= max_chars:
+        return text
+    head = text[:max_chars]
+    kept = split_sentences(head)
+    if len(kept) > 1:
+        kept = kept[:-1]
+    return "".join(kept).rstrip() or head
+
+
+def format_block(kind: str, path: str, snippet: str) -> str:
+    return f"[{kind}] {path}\n{snippet}\n"
+
+
+@dataclass
+class PackedContext:
+    # Результат упаковки: выбранные фрагменты (в порядке релевантности) и израсходованные токены
+
+    items: List[Dict[str, Any]] = field(default_factory=list)
+    tokens: int = 0
+    budget: int = 0
+
+    @property
+    def text(self) -> str:
+        return BLOCK_SEPARATOR.join(
+            format_block(item["kind"], item["path"], item["snippet"]) for item in self.items
+        )
+
+
+def pack_context(
+    hits: List[Dict[str, Any]],
+    budget: int,
+    *,
+    max_chars_per_doc: Optional[int] = None,
+    count: Optional[Callable[[str], int]] = None,
+) -> PackedContext:
+    # hits: [{"path", "snippet", "kind", "score", ...}] по убыванию релевантности (выход fuse).
+    # Жадно набирает бюджет по score / tokens; фрагмент, который не влезает целиком,
+    # обрезается по предложениям под остаток. В промпт блоки идут в исходном порядке
+    count = count or estimate_tokens
+    separator_cost = count(BLOCK_SEPARATOR)
+
+    candidates = []
+    for rank, hit in enumerate(hits):
+        snippet = (hit.get("snippet") or "").strip()
+        if max_chars_per_doc is not None:
+            snippet = _trim_to_chars(snippet, max_chars_per_doc)
+        if not snippet:
+            continue
+        header_cost = count(format_block(hit["kind"], hit["path"], ""))
+        tokens = count(format_block(hit["kind"], hit["path"], snippet))
+        # Без score (или все нули) — порядок источника: 1 / (ранг + 1)
+        relevance = hit.get("score") or 1.0 / (rank + 1)
+        candidates.append((relevance / tokens, rank, hit, snippet, header_cost, tokens))
+
+    packed = PackedContext(budget=budget)
+    chosen = []
+    remaining = budget
+    for _, rank, hit, snippet, header_cost, tokens in sorted(candidates, key=lambda c: (-c[0], c[1])):
+        overhead = separator_cost if chosen else 0
+        if tokens + overhead > remaining:
+            room = remaining - overhead - header_cost
+            if room < _MIN_TRIMMED_TOKENS:
+                continue
+            snippet = trim_to_tokens(snippet, room, count)
+            if not snippet:
+                continue
+            tokens = count(format_block(hit["kind"], hit["path"], snippet))
+            if tokens + overhead > remaining:
+                continue
+        chosen.append((rank, {**hit, "snippet": snippet, "tokens": tokens}))
+        remaining -= tokens + overhead
+
+    packed.items = [item for _, item in sorted(chosen, key=lambda c: c[0])]
+    packed.tokens = budget - remaining
+    return packed
@@ -0,0 +1,121 @@
+# app/agent/registry.py
+
+# Реестр агентов по проектам: агент (и поднятое им состояние проекта) живет между запросами,
+# общий для всех воркеров Gradio. Размер ограничен, давно не использованные проекты вытесняются (LRU)
+
+from __future__ import annotations
+
+import logging
+import threading
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Optional
+
+from app.agent.agent import DocOpsAgent, ProjectContext
+from app.config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+
+class AgentRegistry:
+    def __init__(self, max_agents: int = 8, warm: bool = True, model: Optional[str] = None) -> None:
+        self.max_agents = max(1, max_agents)
+        self.warm = warm
+        self.model = model
+
+        # project_slug -> агент; порядок — от давно использованного к недавнему
+        self._agents: "OrderedDict[str, DocOpsAgent]" = OrderedDict()
+        self._lock = threading.Lock()
+        # Локи создания: один проект прогревается один раз, разные — параллельно
+        self._building: Dict[str, threading.Lock] = {}
+
+    def _lookup(self, project_slug: str) -> Optional[DocOpsAgent]:
+        agent = self._agents.get(project_slug)
+        if agent is not None:
+            self._agents.move_to_end(project_slug)
+        return agent
+
+    def get(self, project_slug: str) -> DocOpsAgent:
+        with self._lock:
+            agent = self._lookup(project_slug)
+            if agent is not None:
+                return agent
+            building = self._building.setdefault(project_slug, threading.Lock())
+
+        with building:
+            with self._lock:
+                agent = self._lookup(project_slug)
+                if agent is not None:
+                    return agent
+
+            # Прогрев идет без общего лока — запросы к другим проектам не ждут
+            agent = DocOpsAgent(project=ProjectContext(slug=project_slug), model=self.model)
+            if self.warm:
+                try:
+                    agent.warm_up()
+                except Exception:
+                    logger.exception("Agent warm-up failed for %s", project_slug)
+
+            with self._lock:
+                self._agents[project_slug] = agent
+                self._building.pop(project_slug, None)
+                evicted = self._evict_locked()
+
+        for old in evicted:
+            old.close()
+        return agent
+
+    def _evict_locked(self) -> List[DocOpsAgent]:
+        evicted = []
+        while len(self._agents) > self.max_agents:
+            project_slug, agent = self._agents.popitem(last=False)
+            logger.info("Evicting agent for %s", project_slug)
+            evicted.append(agent)
+        return evicted
+
+    def warm_up(self, project_slugs: Iterable[str]) -> None:
+        # Прогрев при старте; проектов больше лимита — прогреются только последние max_agents
+        for project_slug in project_slugs:
+            self.get(project_slug)
+
+    def evict(self, project_slug: str) -> bool:
+        with self._lock:
+            agent = self._agents.pop(project_slug, None)
+        if agent is None:
+            return False
+        agent.close()
+        return True
+
+    def clear(self) -> None:
+        with self._lock:
+            agents, self._agents = list(self._agents.values()), OrderedDict()
+        for agent in agents:
+            agent.close()
+
+    def projects(self) -> List[str]:
+        with self._lock:
+            return list(self._agents)
+
+
+_registry: Optional[AgentRegistry] = None
+_registry_lock = threading.Lock()
+
+
+def get_agent_registry() -> AgentRegistry:
+    global _registry
+    with _registry_lock:
+        if _registry is None:
+            _registry = AgentRegistry(max_agents=settings.agents.max_agents, warm=settings.agents.warm)
+        return _registry
+
+
+def get_agent(project_slug: str) -> DocOpsAgent:
+    return get_agent_registry().get(project_slug)
+
+
+def reset_agent_registry() -> None:
+    # Закрывает всех агентов (например, при остановке приложения или смене путей в settings)
+    global _registry
+    with _registry_lock:
+        registry, _registry = _registry, None
+    if registry is not None:
+        registry.clear()
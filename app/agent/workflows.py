@@ -4,12 +4,50 @@
 
 from __future__ import annotations
 
+import asyncio
+import logging
+import re
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FutureTimeoutError
 from dataclasses import dataclass
-from typing import List, Dict, Any, Optional
+from typing import AsyncIterator, Callable, Iterator, List, Dict, Any, Optional, Set, Tuple
 
-from app.core.llm import chat as llm_chat
+from app.config.settings import settings
+from app.core.cache import exact_key, get_response_cache, semantic_key
+from app.core.llm import (
+    achat as llm_achat,
+    achat_stream as llm_achat_stream,
+    chat as llm_chat,
+    chat_stream as llm_chat_stream,
+)
+from app.core.tokens import token_counter
 from app.agent import prompts
-from app.mcp_client import git_tools, vector_tools
+from app.agent.fusion import fuse
+from app.agent.packing import pack_context
+from app.mcp_client import confluence_tools, git_tools, vector_tools
+
+logger = logging.getLogger(__name__)
+
+# Общий пул для поиска по источникам: запросы разных вопросов делят одни потоки.
+# Поток нельзя прервать: поиск, не уложившийся в таймаут, досчитывается в фоне и до конца держит
+# поток пула. Git и векторный поиск локальные, запрос к Confluence ограничен своим HTTP-таймаутом,
+# так что хвосты конечны; запас потоков (settings.retrieval.headroom) не дает им занять весь пул
+_retrieval_pool = ThreadPoolExecutor(
+    max_workers=settings.retrieval.max_workers + settings.retrieval.headroom,
+    thread_name_prefix="retrieval",
+)
+
+# Поиски, брошенные по таймауту, которые еще занимают поток пула
+_abandoned: Set[Future] = set()
+_abandoned_lock = threading.Lock()
+
+_TAG_RE = re.compile(r"<[^>]+>")
+
+# Параметры генерации ответа (входят в ключ кэша)
+_ANSWER_MAX_TOKENS = 2048
+_ANSWER_TEMPERATURE = 0.2
+
 
 @dataclass
 class QAResult:
@@ -17,66 +55,256 @@ class QAResult:
 
     answer: str
     sources: List[Dict[str, Any]]  # например, [{path, snippet}, ...]
+    context_tokens: int = 0  # сколько токенов ушло на фрагменты документации в промпте
+    cached: Optional[str] = None  # "exact" / "semantic", если ответ взят из кэша
 
 
-def qa_over_docs(
-    project_slug: str,
-    question: str,
-    max_docs: int = 5,
-    model: Optional[str] = None,
-    max_chars_per_doc: int = 2000,
-) -> QAResult:
-    # Отвечает на вопрос по документации проекта: ищет релевантные материалы, извлекает фрагменты и генерирует ответ через LLM
-    # 1. Ищем по Git-докам
-    git_results = git_tools.search_in_docs(
-        project_slug=project_slug,
-        query=question,
-        max_results=max_docs,
+def _search_confluence(question: str, space_key: str, limit: int, timeout: float) -> List[Dict[str, Any]]:
+    # Страницы Confluence с текстом (storage-формат без разметки). Все HTTP-запросы укладываются
+    # в общий timeout — поток пула освобождается вскоре после того, как retrieve перестал ждать
+    deadline = time.monotonic() + timeout
+    results: List[Dict[str, Any]] = []
+    pages = confluence_tools.search_pages(query=question, space_key=space_key, limit=limit, timeout=timeout)
+    for page in pages:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            break
+        body = confluence_tools.get_page_storage_body(confluence_tools.get_page(page["id"], timeout=remaining))
+        results.append(
+            {
+                "id": page["id"],
+                "title": page.get("title") or "",
+                "url": page.get("url"),
+                "snippet": " ".join(_TAG_RE.sub(" ", body).split()),
+            }
+        )
+    return results
+
+
+def _cache_lookup(
+    messages: List[Dict[str, Any]],
+    model: Optional[str],
+    semantic: Optional[str] = None,
+) -> Tuple[List[str], Optional[str], Optional[str]]:
+    # Ключи кэша для промпта: точный и (если передан) семантический.
+    # Возвращает (ключи, ответ из кэша или None, вид попадания или None)
+    cache = get_response_cache()
+    if cache is None:
+        return [], None, None
+
+    model_name = model or settings.llm.model
+    keys = {"exact": exact_key(model_name, messages, _ANSWER_TEMPERATURE, _ANSWER_MAX_TOKENS)}
+    if semantic is not None:
+        keys["semantic"] = semantic
+    for kind, key in keys.items():
+        hit = cache.get(key)
+        if hit is not None:
+            return list(keys.values()), hit, kind
+    return list(keys.values()), None, None
+
+
+def _cache_store(keys: List[str], answer: str) -> None:
+    cache = get_response_cache()
+    if cache is not None and keys and answer:
+        cache.put(keys, answer)
+
+
+def _ask_llm(
+    messages: List[Dict[str, Any]],
+    model: Optional[str],
+    semantic: Optional[str] = None,
+) -> Tuple[str, Optional[str]]:
+    # Ответ LLM через кэш: сначала точный ключ промпта, затем (если передан) семантический.
+    # Возвращает (ответ, вид попадания в кэш или None)
+    keys, hit, kind = _cache_lookup(messages, model, semantic)
+    if hit is not None:
+        return hit, kind
+
+    answer = llm_chat(
+        messages=messages,
+        model=model,
+        max_tokens=_ANSWER_MAX_TOKENS,
+        temperature=_ANSWER_TEMPERATURE,
     )
+    _cache_store(keys, answer)
+    return answer, None
+
+
+def _stream_llm(
+    messages: List[Dict[str, Any]],
+    model: Optional[str],
+    semantic: Optional[str] = None,
+) -> Iterator[Tuple[str, Optional[str]]]:
+    # Потоковый _ask_llm: (фрагмент, вид попадания в кэш). Ответ из кэша приходит одним фрагментом,
+    # сгенерированный — кладется в кэш, только если поток дочитан до конца
+    keys, hit, kind = _cache_lookup(messages, model, semantic)
+    if hit is not None:
+        yield hit, kind
+        return
+
+    parts: List[str] = []
+    for delta in llm_chat_stream(
+        messages=messages,
+        model=model,
+        max_tokens=_ANSWER_MAX_TOKENS,
+        temperature=_ANSWER_TEMPERATURE,
+    ):
+        parts.append(delta)
+        yield delta, None
+    _cache_store(keys, "".join(parts))
 
-    # 2. Ищем по векторному стораджу (если есть)
-    try:
-        vector_results = vector_tools.search_documents(
+
+async def _astream_llm(
+    messages: List[Dict[str, Any]],
+    model: Optional[str],
+    semantic: Optional[str] = None,
+) -> AsyncIterator[Tuple[str, Optional[str]]]:
+    # Асинхронный _stream_llm: поток генерации не занимает рабочий поток на время ответа.
+    # Кэш — SQLite, его чтение и запись идут в пуле потоков, не в event loop
+    keys, hit, kind = await asyncio.to_thread(_cache_lookup, messages, model, semantic)
+    if hit is not None:
+        yield hit, kind
+        return
+
+    parts: List[str] = []
+    async for delta in llm_achat_stream(
+        messages=messages,
+        model=model,
+        max_tokens=_ANSWER_MAX_TOKENS,
+        temperature=_ANSWER_TEMPERATURE,
+    ):
+        parts.append(delta)
+        yield delta, None
+    await asyncio.to_thread(_cache_store, keys, "".join(parts))
+
+
+def _abandon(future: Future) -> None:
+    with _abandoned_lock:
+        _abandoned.add(future)
+    future.add_done_callback(_forget)
+
+
+def _forget(future: Future) -> None:
+    with _abandoned_lock:
+        _abandoned.discard(future)
+
+
+def abandoned_retrievals() -> int:
+    # Сколько поисков бросили по таймауту, а они еще занимают потоки пула
+    with _abandoned_lock:
+        return len(_abandoned)
+
+
+def retrieve(
+    sources: Dict[str, Callable[[], List[Dict[str, Any]]]],
+    timeouts: Optional[Dict[str, float]] = None,
+) -> Dict[str, List[Dict[str, Any]]]:
+    # Запускает поиск по всем источникам параллельно. Общая задержка — максимум по источникам,
+    # а не сумма; источник, не уложившийся в свой таймаут или упавший, дает пустой список
+    timeouts = timeouts or {}
+    started = time.monotonic()
+    futures: Dict[str, Future] = {
+        name: _retrieval_pool.submit(search) for name, search in sources.items()
+    }
+
+    results: Dict[str, List[Dict[str, Any]]] = {}
+    for name, future in futures.items():
+        timeout = timeouts.get(name, settings.retrieval.timeout_for(name))
+        remaining = max(0.0, timeout - (time.monotonic() - started))
+        try:
+            results[name] = future.result(timeout=remaining)
+        except FutureTimeoutError:
+            if not future.cancel():
+                _abandon(future)
+            logger.warning(
+                "Retrieval source %s timed out after %.1fs (%d abandoned searches still running)",
+                name, timeout, abandoned_retrievals(),
+            )
+            results[name] = []
+        except Exception:
+            logger.exception("Retrieval source %s failed", name)
+            results[name] = []
+    return results
+
+
+@dataclass
+class _QAPrompt:
+    # Подготовленный запрос к LLM: сообщения, источники для UI и ключ семантического кэша
+
+    messages: List[Dict[str, Any]]
+    sources: List[Dict[str, Any]]
+    context_tokens: int = 0
+    semantic: Optional[str] = None
+
+
+def _prepare_qa(
+    project_slug: str,
+    question: str,
+    max_docs: int,
+    model: Optional[str],
+    max_chars_per_doc: int,
+    confluence_space: Optional[str],
+    timeouts: Optional[Dict[str, float]],
+    context_tokens: Optional[int],
+) -> _QAPrompt:
+    # Поиск по источникам, слияние, упаковка контекста и сборка промпта (общая часть обычного и потокового QA)
+    # 1-2. Ищем параллельно по Git-докам, векторному стораджу и (если задан space) Confluence
+    searches: Dict[str, Callable[[], List[Dict[str, Any]]]] = {
+        "git": lambda: git_tools.search_in_docs(
+            project_slug=project_slug,
+            query=question,
+            max_results=max_docs,
+        ),
+        "vector": lambda: vector_tools.search_documents(
             project_slug=project_slug,
             query=question,
             limit=max_docs,
-        )
-    except Exception:
-        vector_results = []
+        ),
+    }
+    if confluence_space:
+        confluence_timeout = (timeouts or {}).get("confluence", settings.retrieval.confluence_timeout)
+        searches["confluence"] = lambda: _search_confluence(question, confluence_space, max_docs, confluence_timeout)
 
-    # 3. Собираем контекст
-    context_blocks: List[str] = []
-    sources: List[Dict[str, Any]] = []
+    found = retrieve(searches, timeouts)
+    git_results = found["git"]
+    vector_results = found["vector"]
+    confluence_results = found.get("confluence", [])
 
-    def _add_source(path: str, snippet: str, kind: str) -> None:
-        sources.append(
-            {
-                "path": path,
-                "snippet": snippet[:max_chars_per_doc],
-                "kind": kind,
-            }
-        )
-        context_blocks.append(
-            f"[{kind}] {path}\n{snippet[:max_chars_per_doc]}\n"
-        )
+    # 3. Сливаем выдачи источников (RRF), убираем повторы одного документа и почти одинаковые фрагменты
+    fused = fuse(
+        {"git": git_results, "vector": vector_results, "confluence": confluence_results},
+        limit=max_docs,
+    )
 
-    for r in git_results:
-        _add_source(
-            path=r.get("path", "unknown"),
-            snippet=r.get("snippet", ""),
-            kind="git",
-        )
+    # 4. Собираем контекст под бюджет токенов: фрагменты отбираются по релевантности на токен
+    #    и обрезаются по границам предложений
+    budget = context_tokens if context_tokens is not None else settings.llm.context_tokens
+    packed = pack_context(
+        fused,
+        budget,
+        max_chars_per_doc=max_chars_per_doc,
+        count=token_counter(model or settings.llm.model),
+    )
+    logger.info(
+        "Packed %d/%d docs into %d/%d context tokens",
+        len(packed.items), len(fused), packed.tokens, budget,
+    )
 
-    for r in vector_results:
-        _add_source(
-            path=r.get("path", r.get("id", "vector-doc")),
-            snippet=r.get("snippet", r.get("text", "")),
-            kind="vector",
-        )
+    sources: List[Dict[str, Any]] = [
+        {
+            "path": item["path"],
+            "snippet": item["snippet"],
+            "kind": item["kind"],
+            "kinds": item["kinds"],
+            "score": item["score"],
+            "tokens": item["tokens"],
+        }
+        for item in packed.items
+    ]
 
-    # 4. Если вообще НИЧЕГО не нашли — все равно спрашиваем LLM,
+    # 5. Если вообще НИЧЕГО не нашли — все равно спрашиваем LLM,
     #    но явно говорим, что специализированного контекста нет.
-    if not context_blocks:
+    if not packed.items:
         system_msg = {
             "role": "system",
             "content": prompts.QA_SYSTEM_PROMPT_NO_CONTEXT,
@@ -91,14 +319,10 @@ def qa_over_docs(
                 "не нашел соответствующую документацию."
             ),
         }
-        answer_text = llm_chat(
-            messages=[system_msg, user_msg],
-            model=model,
-        )
-        return QAResult(answer=answer_text, sources=[])
+        return _QAPrompt(messages=[system_msg, user_msg], sources=[])
 
-    # 5. Нормальный случай: контекст есть
-    context_str = "\n\n---\n\n".join(context_blocks)
+    # 6. Нормальный случай: контекст есть
+    context_str = packed.text
 
     system_msg = {
         "role": "system",
@@ -115,9 +339,150 @@ def qa_over_docs(
         ),
     }
 
-    answer_text = llm_chat(
+    semantic = None
+    if settings.llm_cache.semantic:
+        semantic = semantic_key(
+            model or settings.llm.model,
+            question,
+            (f"{item['kind']}:{item['path']}" for item in packed.items),
+        )
+    return _QAPrompt(
         messages=[system_msg, user_msg],
-        model=model,
+        sources=sources,
+        context_tokens=packed.tokens,
+        semantic=semantic,
+    )
+
+
+def qa_over_docs(
+    project_slug: str,
+    question: str,
+    max_docs: int = 5,
+    model: Optional[str] = None,
+    max_chars_per_doc: int = 2000,
+    confluence_space: Optional[str] = None,
+    timeouts: Optional[Dict[str, float]] = None,
+    context_tokens: Optional[int] = None,
+) -> QAResult:
+    # Отвечает на вопрос по документации проекта: ищет релевантные материалы, извлекает фрагменты и генерирует ответ через LLM
+    prompt = _prepare_qa(
+        project_slug, question, max_docs, model, max_chars_per_doc,
+        confluence_space, timeouts, context_tokens,
+    )
+    answer_text, cached = _ask_llm(prompt.messages, model, prompt.semantic)
+
+    return QAResult(
+        answer=answer_text,
+        sources=prompt.sources,
+        context_tokens=prompt.context_tokens,
+        cached=cached,
+    )
+
+
+def qa_over_docs_stream(
+    project_slug: str,
+    question: str,
+    max_docs: int = 5,
+    model: Optional[str] = None,
+    max_chars_per_doc: int = 2000,
+    confluence_space: Optional[str] = None,
+    timeouts: Optional[Dict[str, float]] = None,
+    context_tokens: Optional[int] = None,
+) -> Iterator[Dict[str, Any]]:
+    # Потоковый qa_over_docs. События по порядку:
+    #   {"type": "sources", "sources": [...], "context_tokens": int} — сразу после поиска;
+    #   {"type": "delta", "text": str} — фрагменты ответа по мере генерации;
+    #   {"type": "done", "result": QAResult} — итог с полным ответом
+    prompt = _prepare_qa(
+        project_slug, question, max_docs, model, max_chars_per_doc,
+        confluence_space, timeouts, context_tokens,
+    )
+    yield {"type": "sources", "sources": prompt.sources, "context_tokens": prompt.context_tokens}
+
+    parts: List[str] = []
+    cached: Optional[str] = None
+    for delta, hit in _stream_llm(prompt.messages, model, prompt.semantic):
+        cached = cached or hit
+        parts.append(delta)
+        yield {"type": "delta", "text": delta}
+
+    yield {
+        "type": "done",
+        "result": QAResult(
+            answer="".join(parts),
+            sources=prompt.sources,
+            context_tokens=prompt.context_tokens,
+            cached=cached,
+        ),
+    }
+
+
+async def aqa_over_docs(
+    project_slug: str,
+    question: str,
+    max_docs: int = 5,
+    model: Optional[str] = None,
+    max_chars_per_doc: int = 2000,
+    confluence_space: Optional[str] = None,
+    timeouts: Optional[Dict[str, float]] = None,
+    context_tokens: Optional[int] = None,
+) -> QAResult:
+    # Асинхронный qa_over_docs: поиск и кэш ответов (SQLite) — в пуле потоков, запрос к LLM — через AsyncOpenAI
+    # с общими лимитами; одинаковые одновременные вопросы делят один вызов API
+    prompt = await asyncio.to_thread(
+        _prepare_qa,
+        project_slug, question, max_docs, model, max_chars_per_doc,
+        confluence_space, timeouts, context_tokens,
+    )
+    keys, answer_text, cached = await asyncio.to_thread(_cache_lookup, prompt.messages, model, prompt.semantic)
+    if answer_text is None:
+        answer_text = await llm_achat(
+            messages=prompt.messages,
+            model=model,
+            max_tokens=_ANSWER_MAX_TOKENS,
+            temperature=_ANSWER_TEMPERATURE,
+        )
+        await asyncio.to_thread(_cache_store, keys, answer_text)
+
+    return QAResult(
+        answer=answer_text,
+        sources=prompt.sources,
+        context_tokens=prompt.context_tokens,
+        cached=cached,
     )
 
-    return QAResult(answer=answer_text, sources=sources)
+
+async def aqa_over_docs_stream(
+    project_slug: str,
+    question: str,
+    max_docs: int = 5,
+    model: Optional[str] = None,
+    max_chars_per_doc: int = 2000,
+    confluence_space: Optional[str] = None,
+    timeouts: Optional[Dict[str, float]] = None,
+    context_tokens: Optional[int] = None,
+) -> AsyncIterator[Dict[str, Any]]:
+    # Асинхронный qa_over_docs_stream с теми же событиями: sources, delta..., done
+    prompt = await asyncio.to_thread(
+        _prepare_qa,
+        project_slug, question, max_docs, model, max_chars_per_doc,
+        confluence_space, timeouts, context_tokens,
+    )
+    yield {"type": "sources", "sources": prompt.sources, "context_tokens": prompt.context_tokens}
+
+    parts: List[str] = []
+    cached: Optional[str] = None
+    async for delta, hit in _astream_llm(prompt.messages, model, prompt.semantic):
+        cached = cached or hit
+        parts.append(delta)
+        yield {"type": "delta", "text": delta}
+
+    yield {
+        "type": "done",
+        "result": QAResult(
+            answer="".join(parts),
+            sources=prompt.sources,
+            context_tokens=prompt.context_tokens,
+            cached=cached,
+        ),
+    }
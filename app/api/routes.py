@@ -0,0 +1,154 @@
+# app/api/routes.py
+
+# JSON API вопросов-ответов поверх того же агента, что и Gradio UI: одиночный вопрос,
+# пакет вопросов с ограниченным параллелизмом и потоковый ответ через SSE
+
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+from fastapi import APIRouter, HTTPException
+from fastapi.responses import StreamingResponse
+
+from app.agent.agent import DocOpsAgent
+from app.agent.registry import get_agent
+from app.config.settings import settings
+from app.core.catalog import get_project_catalog
+from app.core.models import (
+    ErrorResponse,
+    QABatchItem,
+    QABatchRequest,
+    QABatchResponse,
+    QARequest,
+    QAResponse,
+    SourceReference,
+)
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(prefix="/api/v1", tags=["qa"])
+
+
+def _check_project(project_slug: str) -> None:
+    # Проект должен быть в каталоге проектов — том же, из которого UI строит выпадающий список
+    # (SQLite, а пока seed не запускали — каталоги demo_repos_dir)
+    if get_project_catalog().get(project_slug) is None:
+        raise HTTPException(status_code=404, detail=f"Unknown project: {project_slug}")
+
+
+async def _agent(project_slug: str) -> DocOpsAgent:
+    _check_project(project_slug)
+    # Первое обращение к проекту прогревает агента — это блокирующая работа, уводим ее из event loop
+    return await asyncio.to_thread(get_agent, project_slug)
+
+
+def _sources(sources: List[Dict[str, Any]]) -> List[SourceReference]:
+    return [
+        SourceReference(
+            path=src.get("path", ""),
+            snippet=src.get("snippet", ""),
+            kind=src.get("kind"),
+            score=src.get("score"),
+        )
+        for src in sources
+    ]
+
+
+def _response(result: Dict[str, Any]) -> QAResponse:
+    return QAResponse(
+        answer=result.get("answer", ""),
+        sources=_sources(result.get("sources") or []),
+        context_tokens=result.get("context_tokens", 0),
+        cached=result.get("cached"),
+    )
+
+
+@router.post("/qa", response_model=QAResponse, responses={404: {"model": ErrorResponse}})
+async def ask(request: QARequest) -> QAResponse:
+    agent = await _agent(request.project)
+    return _response(await agent.aanswer_question(request.question))
+
+
+@router.post("/qa/batch", response_model=QABatchResponse, responses={413: {"model": ErrorResponse}})
+async def ask_batch(request: QABatchRequest) -> QABatchResponse:
+    # Дедупликация, а не общий поиск: одинаковые (проект, вопрос с точностью до пробелов) считаются
+    # один раз, разные вопросы ищутся и отвечаются независимо. Проверка проекта и агент — один раз
+    # на проект. Одновременно обрабатывается не больше settings.api.batch_concurrency вопросов;
+    # ошибка вопроса не роняет пакет
+    if len(request.items) > settings.api.batch_max_items:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Batch is too large: {len(request.items)} > {settings.api.batch_max_items} items",
+        )
+
+    semaphore = asyncio.Semaphore(max(1, settings.api.batch_concurrency))
+    agents: Dict[str, "asyncio.Future[DocOpsAgent]"] = {}
+
+    def _project_agent(project_slug: str) -> "asyncio.Future[DocOpsAgent]":
+        if project_slug not in agents:
+            agents[project_slug] = asyncio.ensure_future(_agent(project_slug))
+        return agents[project_slug]
+
+    async def _one(project_slug: str, question: str) -> Tuple[Optional[QAResponse], Optional[str]]:
+        async with semaphore:
+            try:
+                agent = await _project_agent(project_slug)
+                return _response(await agent.aanswer_question(question)), None
+            except HTTPException as exc:
+                return None, str(exc.detail)
+            except Exception as exc:
+                logger.exception("Batch question failed for %s", project_slug)
+                return None, f"{type(exc).__name__}: {exc}"
+
+    def _dedup_key(item: QARequest) -> Tuple[str, str]:
+        return item.project, " ".join(item.question.split())
+
+    tasks = {
+        key: asyncio.ensure_future(_one(*key))
+        for key in dict.fromkeys(_dedup_key(i) for i in request.items)
+    }
+    await asyncio.gather(*tasks.values())
+
+    results = []
+    for item in request.items:
+        response, error = tasks[_dedup_key(item)].result()
+        results.append(
+            QABatchItem(project=item.project, question=item.question, response=response, error=error)
+        )
+    return QABatchResponse(results=results)
+
+
+def _sse(event: str, data: Any) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+@router.post("/qa/stream", responses={404: {"model": ErrorResponse}})
+async def ask_stream(request: QARequest) -> StreamingResponse:
+    # Server-Sent Events: sources (сразу после поиска), delta (фрагменты ответа), done (QAResponse)
+    # или error, если генерация оборвалась
+    agent = await _agent(request.project)
+
+    async def _events() -> AsyncIterator[str]:
+        try:
+            async for event in agent.aanswer_question_stream(request.question):
+                if event["type"] == "sources":
+                    yield _sse("sources", {
+                        "sources": [s.model_dump() for s in _sources(event["sources"])],
+                        "context_tokens": event["context_tokens"],
+                    })
+                elif event["type"] == "delta":
+                    yield _sse("delta", {"text": event["text"]})
+                elif event["type"] == "done":
+                    yield _sse("done", _response(event).model_dump())
+        except Exception as exc:
+            logger.exception("Streaming answer failed for %s", request.project)
+            yield _sse("error", {"detail": f"{type(exc).__name__}: {exc}"})
+
+    return StreamingResponse(
+        _events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
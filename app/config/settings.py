@@ -38,6 +38,20 @@ class PathsConfig(BaseModel):
         / "demo.db"
     )
 
+    # Индексы документации git-проектов для search_in_docs
+    docs_index_dir: Path = Field(
+        default_factory=lambda: Path(__file__).resolve().parents[2]
+        / "demo_data"
+        / "docs_index"
+    )
+
+    # Кэш ответов LLM (SQLite)
+    llm_cache_path: Path = Field(
+        default_factory=lambda: Path(__file__).resolve().parents[2]
+        / "demo_data"
+        / "llm_cache.db"
+    )
+
     # Путь до векторного хранилища
     vector_store_path: Path = Field(
         default_factory=lambda: Path(__file__).resolve().parents[2]
@@ -46,11 +60,28 @@ class PathsConfig(BaseModel):
         / "documents.jsonl"
     )
 
+    # SQLite-база FTS5-хранилища документов (бэкенд vector_store.backend = "sqlite")
+    fts_store_path: Path = Field(
+        default_factory=lambda: Path(__file__).resolve().parents[2]
+        / "demo_data"
+        / "demo.db"
+    )
+
 
 class LLMConfig(BaseModel):
     # Выбор модели и загрузка настроек из окружения
 
     model: str = Field(default="gpt-4o-mini")
+    # Более дешевая/быстрая модель, на которую переключаемся у дедлайна запроса
+    fallback_model: Optional[str] = Field(default=None, validate_default=True)
+
+    # Бюджет токенов на фрагменты документации в промпте qa_over_docs
+    context_tokens: int = Field(default=3000, validate_default=True)
+
+    # Ограничения асинхронного клиента: одновременные запросы и лимиты в минуту (0 — без ограничения)
+    max_in_flight: int = Field(default=8, validate_default=True)
+    requests_per_minute: int = Field(default=500, validate_default=True)
+    tokens_per_minute: int = Field(default=200000, validate_default=True)
 
     @field_validator("model", mode="before")
     @classmethod
@@ -60,6 +91,117 @@ class LLMConfig(BaseModel):
         env_val = os.getenv("DOCOPS_MODEL")
         return env_val or v
 
+    @field_validator("fallback_model", mode="before")
+    @classmethod
+    def load_fallback_model(cls, v: Optional[str]) -> Optional[str]:
+        # Загружает запасную модель из переменной окружения DOCOPS_FALLBACK_MODEL
+
+        return os.getenv("DOCOPS_FALLBACK_MODEL") or v
+
+    @field_validator("context_tokens", mode="before")
+    @classmethod
+    def load_context_tokens(cls, v: int) -> int:
+        # Загружает бюджет контекста из переменной окружения DOCOPS_CONTEXT_TOKENS
+
+        return int(os.getenv("DOCOPS_CONTEXT_TOKENS", v))
+
+    @field_validator("max_in_flight", mode="before")
+    @classmethod
+    def load_max_in_flight(cls, v: int) -> int:
+        # Загружает лимит одновременных запросов из переменной окружения DOCOPS_LLM_MAX_IN_FLIGHT
+
+        return int(os.getenv("DOCOPS_LLM_MAX_IN_FLIGHT", v))
+
+    @field_validator("requests_per_minute", mode="before")
+    @classmethod
+    def load_rpm(cls, v: int) -> int:
+        # Загружает лимит запросов в минуту из переменной окружения DOCOPS_LLM_RPM
+
+        return int(os.getenv("DOCOPS_LLM_RPM", v))
+
+    @field_validator("tokens_per_minute", mode="before")
+    @classmethod
+    def load_tpm(cls, v: int) -> int:
+        # Загружает лимит токенов в минуту из переменной окружения DOCOPS_LLM_TPM
+
+        return int(os.getenv("DOCOPS_LLM_TPM", v))
+
+
+class LLMRetryConfig(BaseModel):
+    # Устойчивость запросов к LLM: повторы, таймауты (секунды) и hedged-запросы
+
+    max_retries: int = Field(default=3, validate_default=True)
+    base_delay: float = Field(default=0.5)
+    max_delay: float = Field(default=8.0)
+    attempt_timeout: float = Field(default=30.0)
+    deadline: float = Field(default=60.0, validate_default=True)
+    # Остаток дедлайна, при котором запрос уходит в settings.llm.fallback_model
+    fallback_within: float = Field(default=10.0)
+    hedge: bool = Field(default=False, validate_default=True)
+    # Задержка дублирующего запроса; None — p95 наблюдаемых задержек
+    hedge_delay: Optional[float] = Field(default=None)
+
+    @field_validator("max_retries", mode="before")
+    @classmethod
+    def load_max_retries(cls, v: int) -> int:
+        # Загружает число повторов из переменной окружения DOCOPS_LLM_MAX_RETRIES
+
+        return int(os.getenv("DOCOPS_LLM_MAX_RETRIES", v))
+
+    @field_validator("deadline", mode="before")
+    @classmethod
+    def load_deadline(cls, v: float) -> float:
+        # Загружает общий дедлайн вызова из переменной окружения DOCOPS_LLM_DEADLINE
+
+        return float(os.getenv("DOCOPS_LLM_DEADLINE", v))
+
+    @field_validator("hedge", mode="before")
+    @classmethod
+    def load_hedge(cls, v: bool) -> bool:
+        # Загружает флаг из переменной окружения DOCOPS_LLM_HEDGE (1/true — включить)
+
+        env_val = os.getenv("DOCOPS_LLM_HEDGE")
+        if env_val is None:
+            return v
+        return env_val.strip().lower() in {"1", "true", "yes", "on"}
+
+
+class LLMCacheConfig(BaseModel):
+    # Кэш ответов LLM: TTL (секунды), лимит записей и режим "почти такого же вопроса"
+
+    enabled: bool = Field(default=True, validate_default=True)
+    ttl: float = Field(default=86400.0, validate_default=True)
+    max_entries: int = Field(default=10000)
+    # Ключ по нормализованному вопросу + найденным источникам (а не по точному тексту промпта)
+    semantic: bool = Field(default=False, validate_default=True)
+
+    @field_validator("enabled", mode="before")
+    @classmethod
+    def load_enabled(cls, v: bool) -> bool:
+        # Загружает флаг из переменной окружения DOCOPS_LLM_CACHE (0/false — выключить)
+
+        env_val = os.getenv("DOCOPS_LLM_CACHE")
+        if env_val is None:
+            return v
+        return env_val.strip().lower() not in {"0", "false", "no", "off"}
+
+    @field_validator("ttl", mode="before")
+    @classmethod
+    def load_ttl(cls, v: float) -> float:
+        # Загружает TTL из переменной окружения DOCOPS_LLM_CACHE_TTL
+
+        return float(os.getenv("DOCOPS_LLM_CACHE_TTL", v))
+
+    @field_validator("semantic", mode="before")
+    @classmethod
+    def load_semantic(cls, v: bool) -> bool:
+        # Загружает режим из переменной окружения DOCOPS_LLM_CACHE_SEMANTIC (1/true — включить)
+
+        env_val = os.getenv("DOCOPS_LLM_CACHE_SEMANTIC")
+        if env_val is None:
+            return v
+        return env_val.strip().lower() in {"1", "true", "yes", "on"}
+
 
 class ConfluenceConfig(BaseModel):
     # Интеграция с Confluence
@@ -137,14 +279,123 @@ class MCPConfig(BaseModel):
     )
 
 
+class WatcherConfig(BaseModel):
+    # Фоновое наблюдение за документацией проектов (по желанию запускается вместе с FastAPI-приложением)
+
+    enabled: bool = Field(default=False, validate_default=True)
+    docs_subdir: str = Field(default="docs")
+    poll_interval: float = Field(default=1.0, validate_default=True)
+    debounce: float = Field(default=0.5)
+    ingest_vectors: bool = Field(default=True)
+
+    @field_validator("enabled", mode="before")
+    @classmethod
+    def load_enabled(cls, v: bool) -> bool:
+        # Загружает флаг из переменной окружения DOCOPS_DOCS_WATCHER (1/true — включить, 0/false — выключить)
+
+        env_val = os.getenv("DOCOPS_DOCS_WATCHER")
+        if env_val is None:
+            return v
+        return env_val.strip().lower() not in {"0", "false", "no", "off"}
+
+    @field_validator("poll_interval", mode="before")
+    @classmethod
+    def load_poll_interval(cls, v: float) -> float:
+        # Загружает период опроса (секунды) из переменной окружения DOCOPS_DOCS_WATCHER_INTERVAL
+
+        return float(os.getenv("DOCOPS_DOCS_WATCHER_INTERVAL", v))
+
+
+class AgentsConfig(BaseModel):
+    # Реестр агентов по проектам: сколько держать прогретыми и прогревать ли при старте
+
+    max_agents: int = Field(default=8, validate_default=True)
+    warm: bool = Field(default=True)
+    warm_on_startup: bool = Field(default=True, validate_default=True)
+
+    @field_validator("max_agents", mode="before")
+    @classmethod
+    def load_max_agents(cls, v: int) -> int:
+        # Загружает лимит из переменной окружения DOCOPS_MAX_AGENTS
+
+        return int(os.getenv("DOCOPS_MAX_AGENTS", v))
+
+    @field_validator("warm_on_startup", mode="before")
+    @classmethod
+    def load_warm_on_startup(cls, v: bool) -> bool:
+        # Загружает флаг из переменной окружения DOCOPS_WARM_AGENTS (0/false — выключить)
+
+        env_val = os.getenv("DOCOPS_WARM_AGENTS")
+        if env_val is None:
+            return v
+        return env_val.strip().lower() not in {"0", "false", "no", "off"}
+
+
+class VectorStoreConfig(BaseModel):
+    # Бэкенд хранилища документов: jsonl (JsonlDocumentStore) или sqlite (FTS5 с bm25);
+    # tokenizer — токенайзер FTS5: unicode61 (по словам) или trigram (подстроки идентификаторов)
+
+    backend: str = Field(default="jsonl", validate_default=True)
+    tokenizer: str = Field(default="unicode61", validate_default=True)
+
+    @field_validator("backend", mode="before")
+    @classmethod
+    def load_backend(cls, v: str) -> str:
+        # Загружает бэкенд из переменной окружения DOCOPS_VECTOR_BACKEND
+
+        return os.getenv("DOCOPS_VECTOR_BACKEND", v).strip().lower()
+
+    @field_validator("tokenizer", mode="before")
+    @classmethod
+    def load_tokenizer(cls, v: str) -> str:
+        # Загружает токенайзер из переменной окружения DOCOPS_FTS_TOKENIZER
+
+        return os.getenv("DOCOPS_FTS_TOKENIZER", v).strip().lower()
+
+
+class ApiConfig(BaseModel):
+    # JSON API вопросов-ответов: лимит пакета и число вопросов пакета, обрабатываемых одновременно
+
+    batch_max_items: int = Field(default=100)
+    batch_concurrency: int = Field(default=4, validate_default=True)
+
+    @field_validator("batch_concurrency", mode="before")
+    @classmethod
+    def load_batch_concurrency(cls, v: int) -> int:
+        # Загружает параллелизм пакета из переменной окружения DOCOPS_API_BATCH_CONCURRENCY
+
+        return int(os.getenv("DOCOPS_API_BATCH_CONCURRENCY", v))
+
+
+class RetrievalConfig(BaseModel):
+    # Параллельный поиск по источникам в qa_over_docs: таймауты (секунды) и размер общего пула.
+    # headroom — запасные потоки пула для поисков, которые не уложились в таймаут и еще досчитываются
+
+    git_timeout: float = Field(default=3.0)
+    vector_timeout: float = Field(default=3.0)
+    confluence_timeout: float = Field(default=5.0)
+    max_workers: int = Field(default=8)
+    headroom: int = Field(default=8)
+
+    def timeout_for(self, source: str) -> float:
+        return getattr(self, f"{source}_timeout")
+
+
 class Settings(BaseModel):
     # Основной класс, объединяющий все конфигурационные блоки
 
     paths: PathsConfig = Field(default_factory=PathsConfig)
     llm: LLMConfig = Field(default_factory=LLMConfig)
+    llm_retry: LLMRetryConfig = Field(default_factory=LLMRetryConfig)
+    llm_cache: LLMCacheConfig = Field(default_factory=LLMCacheConfig)
     confluence: ConfluenceConfig = Field(default_factory=ConfluenceConfig)
     github: GitHubConfig = Field(default_factory=GitHubConfig)
     mcp: MCPConfig = Field(default_factory=MCPConfig)
+    watcher: WatcherConfig = Field(default_factory=WatcherConfig)
+    retrieval: RetrievalConfig = Field(default_factory=RetrievalConfig)
+    agents: AgentsConfig = Field(default_factory=AgentsConfig)
+    api: ApiConfig = Field(default_factory=ApiConfig)
+    vector_store: VectorStoreConfig = Field(default_factory=VectorStoreConfig)
 
     environment: str = Field(default_factory=lambda: os.getenv("DOCOPS_ENV", "development"))
 
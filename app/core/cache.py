@@ -0,0 +1,136 @@
+# app/core/cache.py
+
+# Кэш ответов LLM в SQLite: переживает рестарт, записи живут TTL секунд,
+# при переполнении вытесняются давно не использованные (LRU по last_used)
+
+from __future__ import annotations
+
+import hashlib
+import json
+import re
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional
+
+from app.config.settings import settings
+
+_PUNCT_RE = re.compile(r"[^\w\s]")
+
+
+def _normalize_text(text: str) -> str:
+    return " ".join(str(text).split())
+
+
+def _digest(payload: Any) -> str:
+    raw = json.dumps(payload, ensure_ascii=False, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def exact_key(
+    model: str,
+    messages: List[Dict[str, Any]],
+    temperature: float,
+    max_tokens: int,
+) -> str:
+    # Ключ точного совпадения запроса: пробелы в сообщениях схлопываются
+    normalized = [
+        {"role": m.get("role"), "content": _normalize_text(m.get("content", ""))}
+        for m in messages
+    ]
+    return "exact:" + _digest([model, normalized, temperature, max_tokens])
+
+
+def semantic_key(model: str, question: str, source_ids: Iterable[str]) -> str:
+    # Ключ "почти такого же" вопроса: регистр, пунктуация и пробелы не важны,
+    # ответ переиспользуется, только если найдены те же источники
+    normalized = " ".join(_PUNCT_RE.sub(" ", question.lower()).split())
+    return "semantic:" + _digest([model, normalized, sorted(set(source_ids))])
+
+
+class ResponseCache:
+    def __init__(self, path: Path, ttl: float = 86400.0, max_entries: int = 10000) -> None:
+        self.path = Path(path)
+        self.ttl = ttl
+        self.max_entries = max_entries
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        # WAL + synchronous=NORMAL: чтение не ждет записи, коммит без fsync на каждый хит
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS llm_cache (
+                key TEXT PRIMARY KEY,
+                value TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                last_used REAL NOT NULL
+            )
+            """
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_llm_cache_last_used ON llm_cache(last_used)")
+        self._conn.commit()
+
+    def get(self, key: str) -> Optional[str]:
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, created_at FROM llm_cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            if now - row[1] > self.ttl:
+                self._conn.execute("DELETE FROM llm_cache WHERE key = ?", (key,))
+                self._conn.commit()
+                return None
+            self._conn.execute("UPDATE llm_cache SET last_used = ? WHERE key = ?", (now, key))
+            self._conn.commit()
+            return row[0]
+
+    def put(self, keys: Iterable[str], value: str) -> None:
+        # Один ответ можно положить сразу под несколько ключей (точный и семантический)
+        now = time.time()
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO llm_cache (key, value, created_at, last_used) VALUES (?, ?, ?, ?)",
+                [(key, value, now, now) for key in keys],
+            )
+            # Сначала уходят протухшие записи, затем — самые давно использованные сверх лимита
+            self._conn.execute("DELETE FROM llm_cache WHERE created_at < ?", (now - self.ttl,))
+            (count,) = self._conn.execute("SELECT COUNT(*) FROM llm_cache").fetchone()
+            if count > self.max_entries:
+                self._conn.execute(
+                    "DELETE FROM llm_cache WHERE key IN "
+                    "(SELECT key FROM llm_cache ORDER BY last_used LIMIT ?)",
+                    (count - self.max_entries,),
+                )
+            self._conn.commit()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM llm_cache")
+            self._conn.commit()
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+_caches: Dict[Path, ResponseCache] = {}
+_caches_lock = threading.Lock()
+
+
+def get_response_cache() -> Optional[ResponseCache]:
+    # Кэш по текущему пути из settings; None — кэш выключен
+    config = settings.llm_cache
+    if not config.enabled:
+        return None
+    path = settings.paths.llm_cache_path
+    with _caches_lock:
+        cache = _caches.get(path)
+        if cache is None:
+            cache = _caches[path] = ResponseCache(path, ttl=config.ttl, max_entries=config.max_entries)
+        return cache
@@ -0,0 +1,189 @@
+# app/core/catalog.py
+
+# Каталог проектов из SQLite (app.core.storage) с кэшем в процессе: страницы выпадающего списка
+# и карточки проектов (репозитории, пространства Confluence). Кэш сбрасывается после любой записи
+# в БД — из этого процесса (storage.write_generation) или из другого, например seed_projects.py
+# (storage.data_version), — и при смене файла БД или каталога демо-репозиториев
+
+from __future__ import annotations
+
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.config.settings import settings
+from app.core import storage
+
+# Проектов на странице выпадающего списка
+PAGE_SIZE = 50
+
+# Сколько страниц и карточек проектов держать в кэше (LRU)
+_MAX_CACHED = 512
+
+# Состояние, с которым сверяется кэш: файл БД, каталог репозиториев, записи процесса, версия данных БД
+_State = Tuple[Path, Path, int, Optional[int]]
+
+
+@dataclass
+class ProjectInfo:
+    slug: str
+    name: str
+    description: str = ""
+    repos: List[Dict[str, Any]] = field(default_factory=list)
+    spaces: List[Dict[str, Any]] = field(default_factory=list)
+
+    @property
+    def confluence_space(self) -> Optional[str]:
+        # Основное пространство Confluence проекта (первое по порядку добавления)
+        return self.spaces[0]["space_key"] if self.spaces else None
+
+
+@dataclass
+class ProjectPage:
+    items: List[Tuple[str, str]]  # (name, slug) — в формате choices для gr.Dropdown
+    page: int
+    has_more: bool
+
+
+class ProjectCatalog:
+    def __init__(self, page_size: int = PAGE_SIZE, max_cached: int = _MAX_CACHED) -> None:
+        self.page_size = page_size
+        self.max_cached = max_cached
+        self._lock = threading.Lock()
+        self._state: Optional[_State] = None
+        self._from_db: Optional[bool] = None
+        self._pages: "OrderedDict[Tuple[str, int], ProjectPage]" = OrderedDict()
+        self._projects: "OrderedDict[str, Optional[ProjectInfo]]" = OrderedDict()
+
+    # ------------------------
+    # Кэш
+    # ------------------------
+
+    def _current_state(self) -> _State:
+        # data_version первым: открытие его соединения само увеличивает write_generation
+        version = storage.data_version()
+        return storage.DB_PATH, settings.paths.demo_repos_dir, storage.write_generation(), version
+
+    def _fresh(self) -> _State:
+        # Под self._lock: сбрасывает кэш, если с прошлого обращения в БД писали
+        state = self._current_state()
+        if state != self._state:
+            self._pages.clear()
+            self._projects.clear()
+            self._from_db = None
+            self._state = state
+        return state
+
+    def _remember(
+        self,
+        cache: "OrderedDict[Any, Any]",
+        key: Any,
+        value: Any,
+        state: _State,
+    ) -> None:
+        # Значение, прочитанное до чужой записи, в кэш не попадает
+        with self._lock:
+            if self._fresh() != state:
+                return
+            cache[key] = value
+            cache.move_to_end(key)
+            while len(cache) > self.max_cached:
+                cache.popitem(last=False)
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._state = None
+
+    def _uses_db(self) -> bool:
+        # Под self._lock. Пока в БД нет проектов (не запускали seed), каталог — каталоги demo_repos_dir
+        if self._from_db is None:
+            self._from_db = storage.has_projects()
+        return self._from_db
+
+    # ------------------------
+    # Публичный API
+    # ------------------------
+
+    def page(self, query: str = "", page: int = 0) -> ProjectPage:
+        # Страница проектов для выпадающего списка; query — префикс имени или slug
+        query = " ".join(query.split())
+        page = max(0, page)
+        key = (query.lower(), page)
+        with self._lock:
+            state = self._fresh()
+            cached = self._pages.get(key)
+            if cached is not None:
+                self._pages.move_to_end(key)
+                return cached
+            from_db = self._uses_db()
+
+        offset = page * self.page_size
+        if from_db:
+            # Берем на одну запись больше, чтобы узнать, есть ли следующая страница, без COUNT(*)
+            rows = storage.list_projects(query, limit=self.page_size + 1, offset=offset)
+        else:
+            rows = _directory_projects(query)[offset:offset + self.page_size + 1]
+
+        result = ProjectPage(
+            items=[(row["name"], row["slug"]) for row in rows[: self.page_size]],
+            page=page,
+            has_more=len(rows) > self.page_size,
+        )
+        self._remember(self._pages, key, result, state)
+        return result
+
+    def get(self, slug: str) -> Optional[ProjectInfo]:
+        # Карточка проекта с репозиториями и пространствами Confluence; None — проекта нет
+        with self._lock:
+            state = self._fresh()
+            if slug in self._projects:
+                self._projects.move_to_end(slug)
+                return self._projects[slug]
+            from_db = self._uses_db()
+
+        info: Optional[ProjectInfo] = None
+        row = storage.get_project(slug) if from_db else None
+        if row is not None:
+            sources = storage.get_project_sources(slug)
+            info = ProjectInfo(
+                slug=row["slug"],
+                name=row["name"],
+                description=row.get("description") or "",
+                repos=sources["repos"],
+                spaces=sources["spaces"],
+            )
+        elif not from_db and Path(slug).name == slug and (settings.paths.demo_repos_dir / slug).is_dir():
+            info = ProjectInfo(slug=slug, name=slug)
+
+        self._remember(self._projects, slug, info, state)
+        return info
+
+    def default_slug(self) -> Optional[str]:
+        first = self.page()
+        return first.items[0][1] if first.items else None
+
+
+def _directory_projects(query: str) -> List[Dict[str, str]]:
+    repos_dir = settings.paths.demo_repos_dir
+    if not repos_dir.is_dir():
+        return []
+    needle = query.lower()
+    return [
+        {"slug": p.name, "name": p.name}
+        for p in sorted(repos_dir.iterdir())
+        if p.is_dir() and not p.name.startswith(".") and p.name.lower().startswith(needle)
+    ]
+
+
+_catalog: Optional[ProjectCatalog] = None
+_catalog_lock = threading.Lock()
+
+
+def get_project_catalog() -> ProjectCatalog:
+    global _catalog
+    with _catalog_lock:
+        if _catalog is None:
+            _catalog = ProjectCatalog()
+        return _catalog
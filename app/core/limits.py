@@ -0,0 +1,96 @@
+# app/core/limits.py
+
+# Примитивы ограничения нагрузки на внешние API: token bucket (запросы/токены в минуту),
+# семафор для потоков и корутин и single-flight (одинаковые одновременные запросы делят один вызов)
+
+from __future__ import annotations
+
+import asyncio
+import threading
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+
+class TokenBucket:
+    # Ведро на rate_per_minute единиц в минуту; емкость (допустимый всплеск) — минутный лимит.
+    # Состояние общее для всех event loop'ов процесса, поэтому защищено обычным локом
+
+    def __init__(self, rate_per_minute: float, capacity: Optional[float] = None) -> None:
+        self.rate = rate_per_minute / 60.0
+        self.capacity = capacity if capacity is not None else rate_per_minute
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _take(self, amount: float) -> float:
+        # Забирает amount и возвращает 0, либо возвращает, сколько секунд ждать пополнения
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            if self._tokens >= amount:
+                self._tokens -= amount
+                return 0.0
+            return (amount - self._tokens) / self.rate
+
+    def wait(self, amount: float = 1.0) -> None:
+        # Синхронный acquire: блокирует поток до пополнения ведра
+        amount = min(amount, self.capacity)
+        while True:
+            wait = self._take(amount)
+            if wait <= 0:
+                return
+            time.sleep(wait)
+
+    async def acquire(self, amount: float = 1.0) -> None:
+        # Запрос больше емкости ведра пропускается, когда ведро полное, — иначе он не прошел бы никогда
+        amount = min(amount, self.capacity)
+        while True:
+            wait = self._take(amount)
+            if wait <= 0:
+                return
+            await asyncio.sleep(wait)
+
+
+class ProcessSemaphore:
+    # Семафор на весь процесс: его делят потоки (синхронные вызовы) и корутины любых event loop'ов.
+    # Корутина не держит поток ожидания: пробует занять слот без блокировки и спит между попытками,
+    # поэтому отмена ожидания не может «потерять» слот
+
+    _POLL_MIN = 0.002
+    _POLL_MAX = 0.05
+
+    def __init__(self, limit: int) -> None:
+        self.limit = limit
+        self._semaphore = threading.BoundedSemaphore(limit)
+
+    def acquire(self) -> None:
+        self._semaphore.acquire()
+
+    async def acquire_async(self) -> None:
+        delay = self._POLL_MIN
+        while not self._semaphore.acquire(blocking=False):
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, self._POLL_MAX)
+
+    def release(self) -> None:
+        self._semaphore.release()
+
+
+class SingleFlight:
+    # Одновременные вызовы с одним ключом ждут один и тот же результат. Общий вызов идет
+    # отдельной задачей: отмена одного из ожидающих не отменяет его для остальных
+
+    def __init__(self) -> None:
+        self._calls: Dict[str, asyncio.Future] = {}
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[Any]]) -> Any:
+        task = self._calls.get(key)
+        if task is None:
+            task = asyncio.ensure_future(fn())
+            self._calls[key] = task
+            task.add_done_callback(lambda _: self._calls.pop(key, None))
+        return await asyncio.shield(task)
+
+    def in_flight(self) -> int:
+        return len(self._calls)
@@ -4,12 +4,21 @@
 
 from __future__ import annotations
 
-from typing import List, Dict, Any, Optional
+from contextlib import asynccontextmanager, contextmanager
+from dataclasses import replace
+from typing import List, Dict, Any, AsyncIterator, Iterator, Optional
+import asyncio
 import os
+import threading
+import weakref
 
-from openai import OpenAI
+from openai import AsyncOpenAI, OpenAI
 
 from app.config.settings import settings
+from app.core.cache import exact_key
+from app.core.limits import ProcessSemaphore, SingleFlight, TokenBucket
+from app.core.resilience import acall_with_retries, call_with_retries, policy_from_settings
+from app.core.tokens import estimate_tokens
 
 
 # Инициализация клиента
@@ -60,15 +69,255 @@ def chat(
     client = get_client()
     model_name = model or settings.llm.model
 
-    completion = client.chat.completions.create(
-        model=model_name,
-        messages=messages,
-        max_tokens=max_tokens,
-        temperature=temperature,
-    )
+    def _attempt(attempt_model: str, timeout: float) -> Any:
+        # Каждая попытка проходит общие для процесса лимиты (см. _limited)
+        with _limited_sync(messages, max_tokens):
+            return client.with_options(timeout=timeout, max_retries=0).chat.completions.create(
+                model=attempt_model,
+                messages=messages,
+                max_tokens=max_tokens,
+                temperature=temperature,
+            )
+
+    # Повторы, таймауты и запасная модель — по политике из settings.llm_retry (см. resilience)
+    completion = call_with_retries(_attempt, model_name)
 
     if not completion.choices:
         return ""
 
     choice = completion.choices[0]
     return _extract_content_from_choice(choice)
+
+
+def chat_stream(
+    messages: List[Dict[str, Any]],
+    *,
+    model: Optional[str] = None,
+    max_tokens: int = 2048,
+    temperature: float = 0.2,
+) -> Iterator[str]:
+    # Потоковый вариант chat: отдает фрагменты ответа по мере генерации
+
+    client = get_client()
+    model_name = model or settings.llm.model
+
+    # Слот лимита занят, пока поток не дочитан или не закрыт.
+    # Повторяется только открытие потока: после первого фрагмента ответ уже ушел клиенту
+    with _limited_sync(messages, max_tokens):
+        stream = call_with_retries(
+            lambda attempt_model, timeout: client.with_options(timeout=timeout, max_retries=0).chat.completions.create(
+                model=attempt_model,
+                messages=messages,
+                max_tokens=max_tokens,
+                temperature=temperature,
+                stream=True,
+            ),
+            model_name,
+        )
+
+        try:
+            for chunk in stream:
+                if not chunk.choices:
+                    continue
+                delta = getattr(chunk.choices[0].delta, "content", None)
+                if delta:
+                    yield delta
+        finally:
+            # Клиент ушел раньше конца генерации — закрываем соединение, чтобы не дочитывать ответ
+            close = getattr(stream, "close", None)
+            if close is not None:
+                close()
+
+
+# ------------------------
+# Лимиты
+# ------------------------
+
+# Лимиты общие для процесса — для синхронных вызовов из потоков и асинхронных из любых event loop'ов:
+# квоты API считаются на ключ, а не на поток или loop
+_buckets: Dict[str, Optional[TokenBucket]] = {}
+_slots: Optional[ProcessSemaphore] = None
+_limits_lock = threading.Lock()
+
+
+def _bucket(name: str, rate_per_minute: int) -> Optional[TokenBucket]:
+    with _limits_lock:
+        if name not in _buckets:
+            _buckets[name] = TokenBucket(rate_per_minute) if rate_per_minute > 0 else None
+        return _buckets[name]
+
+
+def _semaphore() -> Optional[ProcessSemaphore]:
+    # Не больше settings.llm.max_in_flight вызовов одновременно (0 — без ограничения)
+    global _slots
+    limit = settings.llm.max_in_flight
+    if limit <= 0:
+        return None
+    with _limits_lock:
+        if _slots is None:
+            _slots = ProcessSemaphore(limit)
+        return _slots
+
+
+def reset_async_limits() -> None:
+    # Сбрасывает клиентов event loop'ов, семафор и ведра (например, после смены лимитов в settings)
+    global _slots
+    _gates.clear()
+    with _limits_lock:
+        _buckets.clear()
+        _slots = None
+
+
+def _estimate_request_tokens(messages: List[Dict[str, Any]], max_tokens: int) -> int:
+    # Лимит TPM учитывает и промпт, и max_tokens ответа
+    return sum(estimate_tokens(str(m.get("content", ""))) for m in messages) + max_tokens
+
+
+@contextmanager
+def _limited_sync(messages: List[Dict[str, Any]], max_tokens: int) -> Iterator[None]:
+    # Сначала лимиты в минуту (ожидание не занимает слот семафора), затем слот
+    requests = _bucket("requests", settings.llm.requests_per_minute)
+    if requests is not None:
+        requests.wait(1)
+    tokens = _bucket("tokens", settings.llm.tokens_per_minute)
+    if tokens is not None:
+        tokens.wait(_estimate_request_tokens(messages, max_tokens))
+
+    slots = _semaphore()
+    if slots is None:
+        yield
+        return
+    slots.acquire()
+    try:
+        yield
+    finally:
+        slots.release()
+
+
+@asynccontextmanager
+async def _limited(messages: List[Dict[str, Any]], max_tokens: int) -> AsyncIterator[None]:
+    # То же для корутин: ожидание не блокирует event loop
+    requests = _bucket("requests", settings.llm.requests_per_minute)
+    if requests is not None:
+        await requests.acquire(1)
+    tokens = _bucket("tokens", settings.llm.tokens_per_minute)
+    if tokens is not None:
+        await tokens.acquire(_estimate_request_tokens(messages, max_tokens))
+
+    slots = _semaphore()
+    if slots is None:
+        yield
+        return
+    await slots.acquire_async()
+    try:
+        yield
+    finally:
+        slots.release()
+
+
+# ------------------------
+# Асинхронный клиент
+# ------------------------
+
+class _AsyncGate:
+    # Состояние, привязанное к event loop: клиент (его пул соединений) и текущие вызовы.
+    # Лимиты — общие для процесса, см. _limited
+
+    def __init__(self) -> None:
+        self.client = _create_async_client()
+        self.flights = SingleFlight()
+
+
+_gates: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, _AsyncGate]" = weakref.WeakKeyDictionary()
+
+
+def _create_async_client() -> AsyncOpenAI:
+    # base_url берется SDK из OPENAI_BASE_URL — так подключается локальный фейковый сервер
+    api_key = os.getenv("OPENAI_API_KEY")
+    if not api_key:
+        raise RuntimeError(
+            "OPENAI_API_KEY is not set. Set it in .env or environment."
+        )
+    return AsyncOpenAI(api_key=api_key)
+
+
+def _gate() -> _AsyncGate:
+    loop = asyncio.get_running_loop()
+    gate = _gates.get(loop)
+    if gate is None:
+        gate = _gates[loop] = _AsyncGate()
+    return gate
+
+
+async def achat(
+    messages: List[Dict[str, Any]],
+    *,
+    model: Optional[str] = None,
+    max_tokens: int = 2048,
+    temperature: float = 0.2,
+) -> str:
+    # Асинхронный chat: не держит поток на время генерации. Одинаковые одновременные
+    # запросы (модель, сообщения, параметры) делят один вызов API
+
+    gate = _gate()
+    model_name = model or settings.llm.model
+
+    async def _attempt(attempt_model: str, timeout: float) -> Any:
+        # Каждая попытка (и hedged-дубль) заново проходит лимиты; пауза между повторами слот не держит
+        async with _limited(messages, max_tokens):
+            return await gate.client.with_options(timeout=timeout, max_retries=0).chat.completions.create(
+                model=attempt_model,
+                messages=messages,
+                max_tokens=max_tokens,
+                temperature=temperature,
+            )
+
+    async def _call() -> str:
+        completion = await acall_with_retries(_attempt, model_name)
+        if not completion.choices:
+            return ""
+        return _extract_content_from_choice(completion.choices[0])
+
+    key = exact_key(model_name, messages, temperature, max_tokens)
+    return await gate.flights.do(key, _call)
+
+
+async def achat_stream(
+    messages: List[Dict[str, Any]],
+    *,
+    model: Optional[str] = None,
+    max_tokens: int = 2048,
+    temperature: float = 0.2,
+) -> AsyncIterator[str]:
+    # Асинхронный потоковый chat. Слот семафора занят, пока поток не дочитан или не закрыт;
+    # потоки не объединяются — каждый клиент читает свою генерацию
+
+    gate = _gate()
+    model_name = model or settings.llm.model
+
+    # Повторяется только открытие потока; без хеджа — лишний открытый поток пришлось бы дочитывать
+    policy = replace(policy_from_settings(), hedge=False)
+
+    async with _limited(messages, max_tokens):
+        stream = await acall_with_retries(
+            lambda attempt_model, timeout: gate.client.with_options(
+                timeout=timeout, max_retries=0
+            ).chat.completions.create(
+                model=attempt_model,
+                messages=messages,
+                max_tokens=max_tokens,
+                temperature=temperature,
+                stream=True,
+            ),
+            model_name,
+            policy,
+        )
+        try:
+            async for chunk in stream:
+                if not chunk.choices:
+                    continue
+                delta = getattr(chunk.choices[0].delta, "content", None)
+                if delta:
+                    yield delta
+        finally:
+            await stream.close()
@@ -5,7 +5,7 @@
 from __future__ import annotations
 
 from typing import List, Optional, Dict, Any
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 
 class ProjectInfo(BaseModel):
     # Модель данных для предоставления информации
@@ -19,6 +19,8 @@ class SourceReference(BaseModel):
     
     path: str
     snippet: str
+    kind: Optional[str] = None
+    score: Optional[float] = None
 
 
 class QAResponse(BaseModel):
@@ -26,6 +28,36 @@ class QAResponse(BaseModel):
     
     answer: str
     sources: List[SourceReference]
+    context_tokens: int = 0
+    cached: Optional[str] = None
+
+
+class QARequest(BaseModel):
+    # Модель данных для вопроса через API
+
+    project: str = Field(min_length=1)
+    question: str = Field(min_length=1)
+
+
+class QABatchRequest(BaseModel):
+    # Модель данных для пакета вопросов через API
+
+    items: List[QARequest] = Field(min_length=1)
+
+
+class QABatchItem(BaseModel):
+    # Модель данных для результата одного вопроса из пакета: ответ либо ошибка
+
+    project: str
+    question: str
+    response: Optional[QAResponse] = None
+    error: Optional[str] = None
+
+
+class QABatchResponse(BaseModel):
+    # Модель данных для вывода результатов пакета в порядке вопросов
+
+    results: List[QABatchItem]
 
 
 class ErrorResponse(BaseModel):
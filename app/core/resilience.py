@@ -0,0 +1,216 @@
+# app/core/resilience.py
+
+# Политика устойчивости запросов к LLM: повторы с экспоненциальной задержкой и jitter
+# (с учетом Retry-After), общий дедлайн на вызов, запасная модель у дедлайна
+# и hedged-запросы (дублирующий запрос, если ответа нет дольше p95)
+
+from __future__ import annotations
+
+import asyncio
+import email.utils
+import logging
+import random
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Deque, Optional, Set, TypeVar
+
+import openai
+
+from app.config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# Статусы, после которых повтор имеет смысл: таймаут, конфликт, лимиты и ошибки сервера
+_RETRYABLE_STATUSES = {408, 409, 429}
+
+# Сколько последних задержек учитывать в p95 и с какого числа замеров ему доверять
+_LATENCY_WINDOW = 200
+_LATENCY_MIN_SAMPLES = 20
+
+
+@dataclass
+class RetryPolicy:
+    # Параметры одного вызова; по умолчанию берутся из settings.llm_retry (см. policy_from_settings)
+
+    max_retries: int = 3
+    base_delay: float = 0.5
+    max_delay: float = 8.0
+    attempt_timeout: float = 30.0  # таймаут одной попытки, секунды
+    deadline: float = 60.0  # общий бюджет времени на вызов со всеми повторами
+    fallback_model: Optional[str] = None
+    fallback_within: float = 10.0  # остаток дедлайна, при котором переключаемся на fallback_model
+    hedge: bool = False
+    hedge_delay: Optional[float] = None  # фиксированная задержка хеджа; None — p95 наблюдаемых задержек
+
+
+def policy_from_settings() -> RetryPolicy:
+    config = settings.llm_retry
+    return RetryPolicy(
+        max_retries=config.max_retries,
+        base_delay=config.base_delay,
+        max_delay=config.max_delay,
+        attempt_timeout=config.attempt_timeout,
+        deadline=config.deadline,
+        fallback_model=settings.llm.fallback_model,
+        fallback_within=config.fallback_within,
+        hedge=config.hedge,
+        hedge_delay=config.hedge_delay,
+    )
+
+
+class LatencyTracker:
+    # Скользящее окно задержек успешных попыток для оценки p95
+
+    def __init__(self, window: int = _LATENCY_WINDOW) -> None:
+        self._samples: Deque[float] = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def observe(self, seconds: float) -> None:
+        with self._lock:
+            self._samples.append(seconds)
+
+    def p95(self) -> Optional[float]:
+        with self._lock:
+            if len(self._samples) < _LATENCY_MIN_SAMPLES:
+                return None
+            ordered = sorted(self._samples)
+        return ordered[min(len(ordered) - 1, int(0.95 * len(ordered)))]
+
+
+latencies = LatencyTracker()
+
+
+def is_retryable(exc: BaseException) -> bool:
+    if isinstance(exc, (openai.APIConnectionError, openai.APITimeoutError, asyncio.TimeoutError)):
+        return True
+    if isinstance(exc, openai.APIStatusError):
+        return exc.status_code in _RETRYABLE_STATUSES or exc.status_code >= 500
+    return False
+
+
+def retry_after(exc: BaseException) -> Optional[float]:
+    # Пауза, которую просит сервер (retry-after-ms / retry-after в секундах или HTTP-дата)
+    response = getattr(exc, "response", None)
+    headers = getattr(response, "headers", None)
+    if not headers:
+        return None
+    for header, divisor in (("retry-after-ms", 1000.0), ("retry-after", 1.0)):
+        value = headers.get(header)
+        if value is None:
+            continue
+        try:
+            return max(0.0, float(value) / divisor)
+        except ValueError:
+            pass
+    parsed = email.utils.parsedate_tz(headers.get("retry-after") or "")
+    if parsed is None:
+        return None
+    return max(0.0, email.utils.mktime_tz(parsed) - time.time())
+
+
+def backoff_delay(attempt: int, exc: BaseException, policy: RetryPolicy) -> float:
+    # Full jitter: случайная пауза до base * 2^attempt (не больше max_delay);
+    # Retry-After от сервера — нижняя граница паузы
+    delay = random.uniform(0, min(policy.max_delay, policy.base_delay * (2 ** attempt)))
+    hinted = retry_after(exc)
+    if hinted is not None:
+        delay = max(delay, hinted)
+    return delay
+
+
+def _pick_model(model: str, remaining: float, attempt: int, policy: RetryPolicy) -> str:
+    # Запасная модель — когда до дедлайна осталось мало или это последняя из нескольких попыток
+    # (без повторов единственная попытка идет к основной модели)
+    last_retry = policy.max_retries > 0 and attempt == policy.max_retries
+    if policy.fallback_model and (remaining <= policy.fallback_within or last_retry):
+        return policy.fallback_model
+    return model
+
+
+def call_with_retries(
+    fn: Callable[[str, float], T],
+    model: str,
+    policy: Optional[RetryPolicy] = None,
+) -> T:
+    # fn(model, timeout) — одна попытка. Повторяет ретраябельные ошибки, пока есть попытки
+    # и пауза укладывается в дедлайн; иначе пробрасывает последнюю ошибку
+    policy = policy or policy_from_settings()
+    deadline = time.monotonic() + policy.deadline
+    attempt = 0
+    while True:
+        remaining = deadline - time.monotonic()
+        current = _pick_model(model, remaining, attempt, policy)
+        started = time.monotonic()
+        try:
+            result = fn(current, max(0.1, min(policy.attempt_timeout, remaining)))
+        except Exception as exc:
+            delay = backoff_delay(attempt, exc, policy)
+            if not is_retryable(exc) or attempt >= policy.max_retries or time.monotonic() + delay >= deadline:
+                raise
+            logger.warning("LLM call to %s failed (%s), retry %d in %.2fs", current, exc, attempt + 1, delay)
+            time.sleep(delay)
+            attempt += 1
+            continue
+        latencies.observe(time.monotonic() - started)
+        return result
+
+
+async def _hedged(fn: Callable[[str, float], Awaitable[T]], model: str, timeout: float, policy: RetryPolicy) -> T:
+    # Попытка с хеджем: если первый запрос не ответил за задержку хеджа, параллельно уходит второй;
+    # берется первый успешный ответ, оставшийся запрос отменяется
+    def _attempt(attempt_timeout: float) -> Awaitable[T]:
+        # Таймаут SDK ограничивает отдельные операции чтения; wait_for — попытку целиком
+        return asyncio.wait_for(fn(model, attempt_timeout), attempt_timeout)
+
+    hedge_delay = policy.hedge_delay if policy.hedge_delay is not None else latencies.p95()
+    if not policy.hedge or hedge_delay is None or hedge_delay >= timeout:
+        return await _attempt(timeout)
+
+    pending: Set[asyncio.Future] = {asyncio.ensure_future(_attempt(timeout))}
+    try:
+        done, pending = await asyncio.wait(pending, timeout=hedge_delay)
+        if not done:
+            logger.info("LLM call to %s slower than %.2fs, sending hedged request", model, hedge_delay)
+            pending.add(asyncio.ensure_future(_attempt(max(0.1, timeout - hedge_delay))))
+        while True:
+            for task in done:
+                if task.exception() is None:
+                    return task.result()
+            if not pending:
+                # Все попытки упали — наружу идет ошибка последней
+                raise done.pop().exception()
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+    finally:
+        for task in pending:
+            task.cancel()
+
+
+async def acall_with_retries(
+    fn: Callable[[str, float], Awaitable[T]],
+    model: str,
+    policy: Optional[RetryPolicy] = None,
+) -> T:
+    # Асинхронный call_with_retries; каждая попытка может быть хеджирована
+    policy = policy or policy_from_settings()
+    deadline = time.monotonic() + policy.deadline
+    attempt = 0
+    while True:
+        remaining = deadline - time.monotonic()
+        current = _pick_model(model, remaining, attempt, policy)
+        started = time.monotonic()
+        try:
+            result = await _hedged(fn, current, max(0.1, min(policy.attempt_timeout, remaining)), policy)
+        except Exception as exc:
+            delay = backoff_delay(attempt, exc, policy)
+            if not is_retryable(exc) or attempt >= policy.max_retries or time.monotonic() + delay >= deadline:
+                raise
+            logger.warning("LLM call to %s failed (%s), retry %d in %.2fs", current, exc, attempt + 1, delay)
+            await asyncio.sleep(delay)
+            attempt += 1
+            continue
+        latencies.observe(time.monotonic() - started)
+        return result
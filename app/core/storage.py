@@ -2,103 +2,459 @@
 
 # Управление SQLite
 
+import logging
 import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+from itertools import chain, islice
 from pathlib import Path
-from typing import Iterable, Dict, Any
+from typing import Iterable, Iterator, Dict, Any, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
 
 # Путь к файлу БД
 DB_PATH = Path(__file__).resolve().parents[2] / "demo_data" / "demo.db"
 
+# Настройки соединения: WAL (чтение не блокируется записью), без fsync на каждый коммит,
+# отображение файла в память и страничный кэш 16 МБ (отрицательное значение — в КиБ)
+_PRAGMAS = (
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA mmap_size=268435456",
+    "PRAGMA cache_size=-16000",
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA busy_timeout=5000",
+)
 
-def get_connection() -> sqlite3.Connection:
-    # Получает соединение с БД, создает директорию с ней
-    
-    DB_PATH.parent.mkdir(parents=True, exist_ok=True)
-    conn = sqlite3.connect(DB_PATH)
+# Сколько подготовленных выражений держит каждое соединение (кэш модуля sqlite3)
+_CACHED_STATEMENTS = 256
+
+# Строк в одной транзакции массовой вставки
+INSERT_BATCH_SIZE = 1000
+
+
+def _connect(path: Path, readonly: bool = False) -> sqlite3.Connection:
+    if readonly:
+        conn = sqlite3.connect(
+            f"{path.as_uri()}?mode=ro",
+            uri=True,
+            check_same_thread=False,
+            cached_statements=_CACHED_STATEMENTS,
+        )
+        conn.execute("PRAGMA query_only=ON")
+    else:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(path, check_same_thread=False, cached_statements=_CACHED_STATEMENTS)
+        # Режим WAL хранится в самом файле БД — достаточно включить со стороны пишущего соединения
+        conn.execute("PRAGMA journal_mode=WAL")
+    for pragma in _PRAGMAS:
+        conn.execute(pragma)
     conn.row_factory = sqlite3.Row
     return conn
 
 
-def init_schema() -> None:
-    # Создает таблицы БД
+class _ConnectionPool:
+    # Соединения по потокам: каждый воркер Gradio/FastAPI держит свое пишущее и свое
+    # читающее соединение на файл БД и переиспользует их (и их кэш выражений) между запросами
+
+    def __init__(self) -> None:
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._all: List[sqlite3.Connection] = []
+
+    def get(self, path: Path, readonly: bool) -> sqlite3.Connection:
+        conns: Dict[Tuple[Path, bool], sqlite3.Connection] = self._local.__dict__.setdefault("conns", {})
+        conn = conns.get((path, readonly))
+        if conn is None:
+            conn = conns[(path, readonly)] = _connect(path, readonly)
+            with self._lock:
+                self._all.append(conn)
+        return conn
+
+    def close_all(self) -> None:
+        # Закрывает соединения всех потоков (при остановке приложения, в тестах)
+        with self._lock:
+            conns, self._all = self._all, []
+        for conn in conns:
+            try:
+                conn.close()
+            except sqlite3.Error:
+                pass
+        self._local = threading.local()
+
+
+_pool = _ConnectionPool()
+
+# Счетчик записей в БД из этого процесса: кэши поверх таблиц (каталог проектов) сверяются с ним
+_generation = 0
+_generation_lock = threading.Lock()
+
+
+def _bump_generation() -> None:
+    global _generation
+    with _generation_lock:
+        _generation += 1
+
+
+def write_generation() -> int:
+    return _generation
+
+
+# Отдельное соединение для PRAGMA data_version: значение меняется после коммитов других соединений,
+# в том числе других процессов (scripts/seed_projects.py), и сравнимо только в пределах одного соединения
+_version_conn: Optional[sqlite3.Connection] = None
+_version_path: Optional[Path] = None
+_version_lock = threading.Lock()
+
+
+def data_version() -> Optional[int]:
+    # Версия данных файла БД для сверки кэшей с записями извне процесса; None — БД еще не создана
+    global _version_conn, _version_path
+    if not DB_PATH.exists():
+        return None
+    with _version_lock:
+        if _version_conn is None or _version_path != DB_PATH:
+            _close_version_connection()
+            _version_conn = _connect(DB_PATH, readonly=True)
+            _version_path = DB_PATH
+            # Счетчик нового соединения несравним с прежним — кэши должны сброситься
+            _bump_generation()
+        try:
+            return _version_conn.execute("PRAGMA data_version").fetchone()[0]
+        except sqlite3.Error:
+            _close_version_connection()
+            return None
+
+
+def _close_version_connection() -> None:
+    # Под _version_lock
+    global _version_conn, _version_path
+    if _version_conn is not None:
+        try:
+            _version_conn.close()
+        except sqlite3.Error:
+            pass
+    _version_conn, _version_path = None, None
+
+
+def get_connection() -> sqlite3.Connection:
+    # Получает отдельное (не из пула) соединение с БД, создает директорию с ней; закрывает вызывающий
     
-    conn = get_connection()
-    cur = conn.cursor()
-
-    cur.execute(
-        """
-        CREATE TABLE IF NOT EXISTS projects (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            slug TEXT UNIQUE NOT NULL,
-            name TEXT NOT NULL,
-            description TEXT
-        );
-        """
-    )
+    return _connect(DB_PATH)
 
-    cur.execute(
-        """
-        CREATE TABLE IF NOT EXISTS repos (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            project_id INTEGER NOT NULL,
-            name TEXT NOT NULL,
-            path TEXT NOT NULL,
-            FOREIGN KEY (project_id) REFERENCES projects(id)
-        );
-        """
-    )
 
-    cur.execute(
-        """
-        CREATE TABLE IF NOT EXISTS confluence_spaces (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            project_id INTEGER NOT NULL,
-            space_key TEXT NOT NULL,
-            name TEXT NOT NULL,
-            base_url TEXT NOT NULL,
-            FOREIGN KEY (project_id) REFERENCES projects(id)
-        );
-        """
-    )
+@contextmanager
+def connection() -> Iterator[sqlite3.Connection]:
+    # Пишущее соединение текущего потока из пула: коммит по выходу, откат при ошибке
 
-    cur.execute(
-        """
-        CREATE TABLE IF NOT EXISTS demo_queries (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            project_id INTEGER NOT NULL,
-            title TEXT NOT NULL,
-            question TEXT NOT NULL,
-            expected_outline TEXT,
-            FOREIGN KEY (project_id) REFERENCES projects(id)
-        );
-        """
-    )
+    conn = _pool.get(DB_PATH, readonly=False)
+    changes = conn.total_changes
+    try:
+        yield conn
+        conn.commit()
+    except BaseException:
+        conn.rollback()
+        raise
+    if conn.total_changes != changes:
+        _bump_generation()
+
+
+@contextmanager
+def read_connection() -> Iterator[sqlite3.Connection]:
+    # Соединение только для чтения текущего потока из пула (для запросов на пути обработки вопросов)
+
+    conn = _pool.get(DB_PATH, readonly=True)
+    try:
+        yield conn
+    finally:
+        # Завершаем неявную транзакцию чтения, чтобы не держать снимок WAL
+        if conn.in_transaction:
+            conn.rollback()
+
+
+def close_connections() -> None:
+    _pool.close_all()
+    with _version_lock:
+        _close_version_connection()
+
+
+# Миграции схемы: (версия, описание, SQL-выражения). Примененные версии записываются в schema_version;
+# новые изменения схемы — только новой миграцией в конце списка, уже выпущенные не редактируются
+MIGRATIONS: List[Tuple[int, str, Tuple[str, ...]]] = [
+    (
+        1,
+        "base tables",
+        (
+            """
+            CREATE TABLE IF NOT EXISTS projects (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                slug TEXT UNIQUE NOT NULL,
+                name TEXT NOT NULL,
+                description TEXT
+            );
+            """,
+            """
+            CREATE TABLE IF NOT EXISTS repos (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                project_id INTEGER NOT NULL,
+                name TEXT NOT NULL,
+                path TEXT NOT NULL,
+                FOREIGN KEY (project_id) REFERENCES projects(id)
+            );
+            """,
+            """
+            CREATE TABLE IF NOT EXISTS confluence_spaces (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                project_id INTEGER NOT NULL,
+                space_key TEXT NOT NULL,
+                name TEXT NOT NULL,
+                base_url TEXT NOT NULL,
+                FOREIGN KEY (project_id) REFERENCES projects(id)
+            );
+            """,
+            """
+            CREATE TABLE IF NOT EXISTS demo_queries (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                project_id INTEGER NOT NULL,
+                title TEXT NOT NULL,
+                question TEXT NOT NULL,
+                expected_outline TEXT,
+                FOREIGN KEY (project_id) REFERENCES projects(id)
+            );
+            """,
+        ),
+    ),
+    (
+        2,
+        "indexes on foreign keys and lookup columns",
+        (
+            # projects.slug индексируется ограничением UNIQUE (sqlite_autoindex_projects_1)
+            "CREATE INDEX IF NOT EXISTS idx_repos_project_id ON repos(project_id);",
+            "CREATE INDEX IF NOT EXISTS idx_confluence_spaces_project_id ON confluence_spaces(project_id);",
+            "CREATE INDEX IF NOT EXISTS idx_confluence_spaces_space_key ON confluence_spaces(space_key);",
+            "CREATE INDEX IF NOT EXISTS idx_demo_queries_project_id ON demo_queries(project_id);",
+        ),
+    ),
+    (
+        3,
+        "project catalog indexes",
+        (
+            # Страницы каталога идут по индексу в порядке имени, поиск по префиксу имени/slug — LIKE 'x%'
+            # (оптимизация LIKE работает только с индексом в NOCASE)
+            "CREATE INDEX IF NOT EXISTS idx_projects_name ON projects(name COLLATE NOCASE, slug);",
+            "CREATE INDEX IF NOT EXISTS idx_projects_slug_nocase ON projects(slug COLLATE NOCASE);",
+        ),
+    ),
+]
+
+
+def _schema_version(conn: sqlite3.Connection) -> int:
+    (version,) = conn.execute("SELECT COALESCE(MAX(version), 0) FROM schema_version").fetchone()
+    return version
 
-    conn.commit()
-    conn.close()
+
+def migrate() -> int:
+    # Применяет недостающие миграции, каждую в своей транзакции; возвращает текущую версию схемы.
+    # BEGIN IMMEDIATE сразу берет блокировку записи — параллельный процесс дождется ее
+    # и увидит уже примененную версию
+
+    with connection() as conn:
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS schema_version (
+                version INTEGER PRIMARY KEY,
+                description TEXT NOT NULL,
+                applied_at TEXT NOT NULL DEFAULT (datetime('now'))
+            );
+            """
+        )
+
+    for version, description, statements in MIGRATIONS:
+        with connection() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            if _schema_version(conn) >= version:
+                continue
+            for statement in statements:
+                conn.execute(statement)
+            conn.execute(
+                "INSERT INTO schema_version (version, description) VALUES (?, ?)",
+                (version, description),
+            )
+            logger.info("Applied schema migration %d: %s", version, description)
+
+    with read_connection() as conn:
+        return _schema_version(conn)
+
+
+def init_schema() -> None:
+    # Создает таблицы БД и доводит схему до последней версии
+    
+    migrate()
+
+
+def query_plan(sql: str, params: Iterable[Any] = ()) -> List[str]:
+    # Строки EXPLAIN QUERY PLAN — для проверки, что запрос идет по индексу, а не полным сканом
+
+    with read_connection() as conn:
+        return [row["detail"] for row in conn.execute(f"EXPLAIN QUERY PLAN {sql}", tuple(params))]
 
 
 def clear_all() -> None:
     # Очищает данные из БД путем удаления записей из всех таблиц
     
-    conn = get_connection()
-    cur = conn.cursor()
-    cur.execute("DELETE FROM demo_queries;")
-    cur.execute("DELETE FROM confluence_spaces;")
-    cur.execute("DELETE FROM repos;")
-    cur.execute("DELETE FROM projects;")
-    conn.commit()
-    conn.close()
-
-
-def insert_many(sql: str, rows: Iterable[Dict[str, Any]]) -> None:
-    if not rows:
-        return
-    conn = get_connection()
-    cur = conn.cursor()
-    columns = list(rows[0].keys())
-    placeholders = ", ".join([f":{c}" for c in columns])
+    with connection() as conn:
+        cur = conn.cursor()
+        cur.execute("DELETE FROM demo_queries;")
+        cur.execute("DELETE FROM confluence_spaces;")
+        cur.execute("DELETE FROM repos;")
+        cur.execute("DELETE FROM projects;")
+
+
+@dataclass
+class InsertStats:
+    # Итог массовой вставки: строк, транзакций и затраченное время
+
+    rows: int = 0
+    batches: int = 0
+    seconds: float = 0.0
+
+    @property
+    def rows_per_second(self) -> float:
+        return self.rows / self.seconds if self.seconds > 0 else 0.0
+
+
+def _insert_sql(
+    sql: str,
+    columns: Sequence[str],
+    conflict: Optional[Sequence[str]],
+    update: Optional[Sequence[str]],
+) -> str:
+    placeholders = ", ".join(f":{c}" for c in columns)
     sql_full = f"{sql} ({', '.join(columns)}) VALUES ({placeholders})"
-    cur.executemany(sql_full, rows)
-    conn.commit()
-    conn.close()
\ No newline at end of file
+    if conflict:
+        # Upsert: при конфликте по ключу обновляем переданные колонки (по умолчанию — все, кроме ключа)
+        targets = [c for c in (update if update is not None else columns) if c not in conflict]
+        sql_full += f" ON CONFLICT ({', '.join(conflict)}) "
+        if targets:
+            sql_full += "DO UPDATE SET " + ", ".join(f"{c} = excluded.{c}" for c in targets)
+        else:
+            sql_full += "DO NOTHING"
+    return sql_full
+
+
+def insert_many(
+    sql: str,
+    rows: Iterable[Dict[str, Any]],
+    *,
+    batch_size: int = INSERT_BATCH_SIZE,
+    conflict: Optional[Sequence[str]] = None,
+    update: Optional[Sequence[str]] = None,
+) -> InsertStats:
+    # Потоковая вставка: rows — любой итерируемый объект (в т.ч. генератор), колонки берутся
+    # из первой строки. В памяти держится одна пачка, каждая пачка — отдельная транзакция.
+    # conflict — колонки уникального ключа для INSERT ... ON CONFLICT DO UPDATE
+
+    stats = InsertStats()
+    iterator = iter(rows)
+    first = next(iterator, None)
+    if first is None:
+        return stats
+
+    sql_full = _insert_sql(sql, list(first.keys()), conflict, update)
+    iterator = chain([first], iterator)
+    started = time.perf_counter()
+    while True:
+        batch = list(islice(iterator, max(1, batch_size)))
+        if not batch:
+            break
+        with connection() as conn:
+            conn.executemany(sql_full, batch)
+        stats.rows += len(batch)
+        stats.batches += 1
+    stats.seconds = time.perf_counter() - started
+
+    logger.debug(
+        "%s: %d rows in %d batches, %.3fs (%.0f rows/s)",
+        sql, stats.rows, stats.batches, stats.seconds, stats.rows_per_second,
+    )
+    return stats
+
+
+def get_project(slug: str) -> Optional[Dict[str, Any]]:
+    # Метаданные проекта (slug, name, description) или None, если БД еще не создана/проекта нет
+
+    if not DB_PATH.exists():
+        return None
+    try:
+        with read_connection() as conn:
+            row = conn.execute(
+                "SELECT slug, name, description FROM projects WHERE slug = ?", (slug,)
+            ).fetchone()
+    except sqlite3.OperationalError:
+        return None
+    return dict(row) if row is not None else None
+
+
+# Репозитории и пространства Confluence проекта: поиск по slug (UNIQUE-индекс) и project_id (индексы миграции 2)
+PROJECT_REPOS_SQL = (
+    "SELECT r.name, r.path FROM repos AS r JOIN projects AS p ON p.id = r.project_id "
+    "WHERE p.slug = ? ORDER BY r.id"
+)
+PROJECT_SPACES_SQL = (
+    "SELECT s.space_key, s.name, s.base_url FROM confluence_spaces AS s "
+    "JOIN projects AS p ON p.id = s.project_id WHERE p.slug = ? ORDER BY s.id"
+)
+
+
+def get_project_sources(slug: str) -> Dict[str, List[Dict[str, Any]]]:
+    # {"repos": [...], "spaces": [...]} проекта; пустые списки, если БД еще не создана/проекта нет
+
+    if not DB_PATH.exists():
+        return {"repos": [], "spaces": []}
+    try:
+        with read_connection() as conn:
+            repos = [dict(row) for row in conn.execute(PROJECT_REPOS_SQL, (slug,))]
+            spaces = [dict(row) for row in conn.execute(PROJECT_SPACES_SQL, (slug,))]
+    except sqlite3.OperationalError:
+        return {"repos": [], "spaces": []}
+    return {"repos": repos, "spaces": spaces}
+
+
+def _like_prefix(query: str) -> str:
+    escaped = query.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return escaped + "%"
+
+
+def list_projects(query: str = "", limit: int = 50, offset: int = 0) -> List[Dict[str, Any]]:
+    # Страница проектов (slug, name) по имени; query — префикс имени или slug без учета регистра.
+    # Читается только нужная страница по индексам миграции 3; пустой список, если БД еще не создана
+
+    if not DB_PATH.exists():
+        return []
+    if query:
+        pattern = _like_prefix(query)
+        sql = (
+            "SELECT slug, name FROM projects WHERE name LIKE ? ESCAPE '\\' OR slug LIKE ? ESCAPE '\\' "
+            "ORDER BY name COLLATE NOCASE, slug LIMIT ? OFFSET ?"
+        )
+        params: Tuple[Any, ...] = (pattern, pattern, limit, offset)
+    else:
+        sql = "SELECT slug, name FROM projects ORDER BY name COLLATE NOCASE, slug LIMIT ? OFFSET ?"
+        params = (limit, offset)
+    try:
+        with read_connection() as conn:
+            return [dict(row) for row in conn.execute(sql, params)]
+    except sqlite3.OperationalError:
+        return []
+
+
+def has_projects() -> bool:
+    if not DB_PATH.exists():
+        return False
+    try:
+        with read_connection() as conn:
+            return conn.execute("SELECT 1 FROM projects LIMIT 1").fetchone() is not None
+    except sqlite3.OperationalError:
+        return False
+
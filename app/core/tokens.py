@@ -0,0 +1,55 @@
+# app/core/tokens.py
+
+# Подсчет токенов текста: tiktoken, если установлен, иначе калиброванная оценка.
+# Нужен и упаковке контекста (app.agent.packing), и лимиту токенов в минуту (app.core.llm)
+
+from __future__ import annotations
+
+import math
+import re
+from functools import lru_cache
+from typing import Any, Callable, Optional
+
+try:
+    import tiktoken
+except ImportError:  # токенизатор не обязателен — без него работает оценка
+    tiktoken = None
+
+_TOKEN_RE = re.compile(r"\w+|[^\w\s]")
+
+
+@lru_cache(maxsize=8)
+def _encoding(model: Optional[str]) -> Any:
+    if tiktoken is None:
+        return None
+    try:
+        return tiktoken.encoding_for_model(model or "")
+    except Exception:
+        pass
+    try:
+        return tiktoken.get_encoding("o200k_base")
+    except Exception:
+        # Нет кэша словаря и нет сети — остаемся на оценке
+        return None
+
+
+def estimate_tokens(text: str) -> int:
+    # Калиброванная оценка для BPE-токенизаторов OpenAI: латиница ~4 символа на токен,
+    # кириллица и прочие не-ASCII ~2.5, каждый знак препинания — отдельный токен.
+    # Оценка скорее завышена, чтобы промпт не вылезал за бюджет
+    tokens = 0
+    for match in _TOKEN_RE.finditer(text):
+        word = match.group()
+        if word.isascii():
+            tokens += math.ceil(len(word) / 4)
+        else:
+            tokens += math.ceil(len(word) / 2.5)
+    return tokens
+
+
+def token_counter(model: Optional[str] = None) -> Callable[[str], int]:
+    # Счетчик токенов для модели: tiktoken, если установлен, иначе оценка
+    encoding = _encoding(model)
+    if encoding is None:
+        return estimate_tokens
+    return lambda text: len(encoding.encode(text, disallowed_special=()))
@@ -0,0 +1,164 @@
+# app/core/watcher.py
+
+# Фоновое наблюдение за документацией проектов в demo_repos_dir: опрос mtime/size через scandir,
+# изменения копятся и после паузы (debounce) одной пачкой уходят в индекс search_in_docs
+# и в очередь загрузки векторного хранилища. Запросы к индексу при этом не сверяют его с диском
+
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Optional, Set, Tuple
+
+from app.config.settings import settings
+from app.mcp_client.docs_index import DocsIndex, get_docs_index, iter_markdown
+from app.mcp_client.ingest import VectorIngestQueue
+
+logger = logging.getLogger(__name__)
+
+# Сколько максимум ждать тишины, если файлы меняются непрерывно
+_MAX_DEBOUNCE_FACTOR = 10
+
+
+class DocsWatcher:
+    def __init__(
+        self,
+        repos_dir: Optional[Path] = None,
+        docs_subdir: str = "docs",
+        poll_interval: float = 1.0,
+        debounce: float = 0.5,
+        ingest: Optional[VectorIngestQueue] = None,
+    ) -> None:
+        self.repos_dir = repos_dir or settings.paths.demo_repos_dir
+        self.docs_subdir = docs_subdir
+        self.poll_interval = poll_interval
+        self.debounce = debounce
+        self.ingest = ingest
+
+        # project_slug -> {rel_path: (mtime_ns, size)} на момент последнего опроса
+        self._snapshots: Dict[str, Dict[str, Tuple[int, int]]] = {}
+        # Накопленные, но еще не отправленные изменения: project_slug -> пути
+        self._pending: Dict[str, Set[str]] = {}
+        self._first_change = 0.0
+        self._last_change = 0.0
+
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    # ------------------------
+    # Жизненный цикл
+    # ------------------------
+
+    def start(self) -> None:
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        if self.ingest is not None:
+            self.ingest.start()
+        self._thread = threading.Thread(target=self._run, name="docs-watcher", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self._dispatch()
+        for project_slug in self._snapshots:
+            self._index(project_slug).watched = False
+        if self.ingest is not None:
+            self.ingest.stop()
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            try:
+                self.poll()
+            except Exception:
+                logger.exception("Docs watcher poll failed")
+            self._stop.wait(self.poll_interval)
+
+    # ------------------------
+    # Опрос
+    # ------------------------
+
+    def _index(self, project_slug: str) -> DocsIndex:
+        root = (self.repos_dir / project_slug).resolve()
+        return get_docs_index(root, project_slug, self.docs_subdir)
+
+    def _scan(self, project_slug: str) -> Dict[str, Tuple[int, int]]:
+        root = (self.repos_dir / project_slug).resolve()
+        snapshot: Dict[str, Tuple[int, int]] = {}
+        for entry in iter_markdown(root / self.docs_subdir):
+            try:
+                st = entry.stat()
+            except OSError:
+                continue
+            snapshot[Path(entry.path).relative_to(root).as_posix()] = (st.st_mtime_ns, st.st_size)
+        return snapshot
+
+    def poll(self) -> None:
+        # Один проход: сравнить снимки каталогов, накопить изменения, отправить их после паузы
+        try:
+            projects = sorted(p.name for p in self.repos_dir.iterdir() if p.is_dir())
+        except OSError:
+            projects = []
+
+        now = time.monotonic()
+        for project_slug in projects:
+            snapshot = self._scan(project_slug)
+            previous = self._snapshots.get(project_slug)
+            self._snapshots[project_slug] = snapshot
+
+            if previous is None:
+                # Новый проект: индекс догоняет диск сам (через git или сверку) и дальше ведется watcher'ом
+                index = self._index(project_slug)
+                index.refresh()
+                index.watched = True
+                continue
+
+            changed = {p for p in snapshot.keys() | previous.keys() if snapshot.get(p) != previous.get(p)}
+            if changed:
+                if not self._pending:
+                    self._first_change = now
+                self._last_change = now
+                self._pending.setdefault(project_slug, set()).update(changed)
+
+        if not self._pending:
+            return
+        quiet = now - self._last_change >= self.debounce
+        overdue = now - self._first_change >= self.debounce * _MAX_DEBOUNCE_FACTOR
+        if quiet or overdue:
+            self._dispatch()
+
+    def _dispatch(self) -> None:
+        pending, self._pending = self._pending, {}
+        for project_slug, paths in pending.items():
+            self._index(project_slug).update_files(sorted(paths))
+            if self.ingest is not None:
+                self.ingest.enqueue(project_slug, sorted(paths))
+            logger.info("Docs changed in %s: %d files", project_slug, len(paths))
+
+
+_watcher: Optional[DocsWatcher] = None
+
+
+def start_docs_watcher() -> DocsWatcher:
+    global _watcher
+    if _watcher is None:
+        _watcher = DocsWatcher(
+            docs_subdir=settings.watcher.docs_subdir,
+            poll_interval=settings.watcher.poll_interval,
+            debounce=settings.watcher.debounce,
+            ingest=VectorIngestQueue() if settings.watcher.ingest_vectors else None,
+        )
+    _watcher.start()
+    return _watcher
+
+
+def stop_docs_watcher() -> None:
+    global _watcher
+    if _watcher is not None:
+        _watcher.stop()
+        _watcher = None
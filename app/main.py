@@ -2,7 +2,10 @@
 
 from __future__ import annotations
 
+import logging
 import os
+import threading
+from contextlib import asynccontextmanager
 
 from dotenv import load_dotenv
 load_dotenv()
@@ -11,9 +14,27 @@ import gradio as gr
 from fastapi import FastAPI
 import uvicorn
 
+from app.config.settings import settings
 from app.core import logging as _logging  # noqa: F401
+from app.agent.registry import get_agent_registry, reset_agent_registry
+from app.core.catalog import get_project_catalog
+from app.core.storage import close_connections
+from app.api.routes import router as api_router
+from app.core.watcher import start_docs_watcher, stop_docs_watcher
 from app.ui.layouts import build_app
 
+logger = logging.getLogger(__name__)
+
+
+def _warm_agents() -> None:
+    # Прогревает агентов первых проектов каталога (индексы документации, vector store, метаданные);
+    # читается только первая страница каталога, а не вся таблица проектов
+    try:
+        projects = [slug for _, slug in get_project_catalog().page().items]
+        get_agent_registry().warm_up(projects[: settings.agents.max_agents])
+    except Exception:
+        logger.exception("Agents warm-up failed")
+
 def _resolve_gradio_theme() -> object | None:
     # Определяет тему Gradio по переменным окружения и возвращает соответствующий объект темы
 
@@ -60,13 +81,31 @@ def create_fastapi_app() -> FastAPI:
         except Exception:
             pass
 
-    fastapi_app = FastAPI(title="DocOps MCP Assistant")
+    @asynccontextmanager
+    async def lifespan(_: FastAPI):
+        # Фоновое наблюдение за документацией держит индексы поиска актуальными
+        if settings.watcher.enabled:
+            start_docs_watcher()
+        # Агенты проектов прогреваются в фоне, чтобы не задерживать старт сервера
+        if settings.agents.warm_on_startup:
+            threading.Thread(target=_warm_agents, name="agents-warm-up", daemon=True).start()
+        try:
+            yield
+        finally:
+            stop_docs_watcher()
+            reset_agent_registry()
+            close_connections()
+
+    fastapi_app = FastAPI(title="DocOps MCP Assistant", lifespan=lifespan)
 
     @fastapi_app.get("/healthz")
     async def healthcheck():
         # Проверка состояния приложения
         return {"status": "ok"}
 
+    # JSON API вопросов-ответов (для ботов и нагрузочных тестов, без UI)
+    fastapi_app.include_router(api_router)
+
     fastapi_app = gr.mount_gradio_app(
         fastapi_app,
         blocks,
@@ -3,7 +3,7 @@
 from __future__ import annotations
 
 from dataclasses import dataclass, field
-from typing import Optional
+from typing import Optional, Union
 
 from app.config.settings import settings
 
@@ -11,13 +11,16 @@ from app.config.settings import settings
 #   pip install -e mcp-servers/confluence-mcp-server
 #   pip install -e mcp-servers/vector-mcp-server
 from mcp_confluence.api_client import ConfluenceClient  # type: ignore
+from mcp_vector.fts import SqliteFtsDocumentStore  # type: ignore
 from mcp_vector.store import JsonlDocumentStore  # type: ignore
 
+DocumentStore = Union[JsonlDocumentStore, SqliteFtsDocumentStore]
+
 
 @dataclass
 class MCPClients:
     _confluence: Optional[ConfluenceClient] = field(default=None, init=False)
-    _vector_store: Optional[JsonlDocumentStore] = field(default=None, init=False)
+    _vector_store: Optional[DocumentStore] = field(default=None, init=False)
 
     @property
     def confluence(self) -> ConfluenceClient:
@@ -30,11 +33,22 @@ class MCPClients:
         return self._confluence
 
     @property
-    def vector_store(self) -> JsonlDocumentStore:
+    def vector_store(self) -> DocumentStore:
         if self._vector_store is None:
-            self._vector_store = JsonlDocumentStore(
-                path=settings.paths.vector_store_path
-            )
+            # Бэкенд — settings.vector_store.backend: jsonl или sqlite (FTS5)
+            if settings.vector_store.backend == "sqlite":
+                self._vector_store = SqliteFtsDocumentStore(
+                    path=settings.paths.fts_store_path,
+                    tokenizer=settings.vector_store.tokenizer,
+                )
+            elif settings.vector_store.backend == "jsonl":
+                self._vector_store = JsonlDocumentStore(
+                    path=settings.paths.vector_store_path
+                )
+            else:
+                raise ValueError(
+                    f"Unknown vector store backend: {settings.vector_store.backend}. Expected 'jsonl' or 'sqlite'."
+                )
         return self._vector_store
 
 _clients = MCPClients()
@@ -44,5 +58,5 @@ def get_confluence_client() -> ConfluenceClient:
     return _clients.confluence
 
 
-def get_vector_store() -> JsonlDocumentStore:
+def get_vector_store() -> DocumentStore:
     return _clients.vector_store
\ No newline at end of file
@@ -11,14 +11,15 @@ def search_pages(
     query: str,
     space_key: Optional[str] = None,
     limit: int = 10,
+    timeout: Optional[float] = None,
 ) -> List[Dict[str, Any]]:
     client = get_confluence_client()
-    return client.search_pages(query=query, space_key=space_key, limit=limit)
+    return client.search_pages(query=query, space_key=space_key, limit=limit, timeout=timeout)
 
 
-def get_page(page_id: str) -> Dict[str, Any]:
+def get_page(page_id: str, timeout: Optional[float] = None) -> Dict[str, Any]:
     client = get_confluence_client()
-    return client.get_page(page_id)
+    return client.get_page(page_id, timeout=timeout)
 
 
 def get_page_storage_body(page: Dict[str, Any]) -> str:
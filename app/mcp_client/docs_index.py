@@ -0,0 +1,449 @@
+# app/mcp_client/docs_index.py
+
+# Индекс markdown-документации проекта для git_tools.search_in_docs: постинги и статистика BM25
+# хранятся на диске (demo_data/docs_index/), при обновлении перечитываются только изменившиеся файлы.
+# Если проект — git-репозиторий, изменения берутся из git diff/status относительно последнего
+# проиндексированного коммита, без обхода дерева
+
+from __future__ import annotations
+
+import bisect
+import json
+import math
+import os
+import re
+import threading
+import time
+from collections import Counter
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+from app.config.settings import settings
+
+# Пакет ставится вместе с git MCP-сервером: pip install -e mcp-servers/git-mcp-server
+from mcp_git.utils import run_git_command  # type: ignore
+
+# Термы — слова из букв/цифр/подчеркиваний, допускаются дефисы внутри
+_TERM_RE = re.compile(r"\w+(?:-\w+)*")
+
+# Через сколько секунд после изменения индекса сохраняется его снапшот (изменения подряд объединяются)
+_SAVE_DELAY_SECONDS = 1.0
+
+# Параметры BM25F: насыщение tf, нормировка длины, вес заголовка документа
+_BM25_K1 = 1.2
+_BM25_B = 0.75
+_BM25_TITLE_BOOST = 2.0
+
+
+# Русские термы сравниваются по основе: до двух последних букв (окончание) отбрасываются,
+# основа не короче _STEM_MIN_LENGTH; короче этого — только точное совпадение
+_STEM_MIN_LENGTH = 4
+_CYRILLIC_RE = re.compile(r"[а-яё]")
+
+
+def tokenize(text: str) -> List[str]:
+    return _TERM_RE.findall(text.lower())
+
+
+def expand_term(term: str, vocabulary: List[str]) -> List[str]:
+    # Термы отсортированного словаря с той же основой, что у term: "биллинг" находит "биллинга"
+    if len(term) <= _STEM_MIN_LENGTH:
+        i = bisect.bisect_left(vocabulary, term)
+        return [term] if i < len(vocabulary) and vocabulary[i] == term else []
+    prefix = term[: max(_STEM_MIN_LENGTH, len(term) - 2)] if _CYRILLIC_RE.search(term) else term
+    start = bisect.bisect_left(vocabulary, prefix)
+    end = bisect.bisect_left(vocabulary, prefix + "\uffff", start)
+    return vocabulary[start:end]
+
+
+def doc_title(path: Path, text: str) -> str:
+    # Заголовок — первый markdown-заголовок, иначе имя файла
+    for line in text.splitlines():
+        if line.startswith("#"):
+            return line.lstrip("#").strip()
+    return path.stem
+
+
+def iter_markdown(directory: Path) -> Iterator[os.DirEntry]:
+    # Рекурсивный обход через scandir: stat берется из записи каталога, файлы не открываются
+    try:
+        entries = list(os.scandir(directory))
+    except OSError:
+        return
+    for entry in entries:
+        if entry.is_dir(follow_symlinks=False):
+            yield from iter_markdown(Path(entry.path))
+        elif entry.name.endswith(".md") and entry.is_file():
+            yield entry
+
+
+def _parse_name_status(output: str) -> Set[str]:
+    # git diff --name-status -z: "M\0path\0", для переименований/копий "R100\0old\0new\0" — берем оба пути
+    tokens = output.split("\0")
+    paths: Set[str] = set()
+    i = 0
+    while i < len(tokens) and tokens[i]:
+        status = tokens[i]
+        n = 2 if status[0] in "RC" else 1
+        paths.update(tokens[i + 1:i + 1 + n])
+        i += 1 + n
+    return paths
+
+
+def _parse_porcelain(output: str) -> Set[str]:
+    # git status --porcelain -z: "XY path\0", для переименований следом идет исходный путь
+    tokens = output.split("\0")
+    paths: Set[str] = set()
+    i = 0
+    while i < len(tokens) and tokens[i]:
+        entry = tokens[i]
+        paths.add(entry[3:])
+        if "R" in entry[:2] or "C" in entry[:2]:
+            i += 1
+            paths.add(tokens[i])
+        i += 1
+    return paths
+
+
+class DocsIndex:
+    VERSION = 2
+
+    def __init__(self, root: Path, docs_subdir: str, path: Path) -> None:
+        self.root = root
+        self.docs_subdir = docs_subdir
+        self.docs_root = (root / docs_subdir).resolve()
+        self.path = path
+        # rel_path -> {"mtime_ns", "size", "length", "terms": [...], "title_length", "title_terms": [...]}
+        self.files: Dict[str, Dict[str, Any]] = {}
+        # term -> {rel_path: tf} отдельно для текста и заголовков
+        self.postings: Dict[str, Dict[str, int]] = {}
+        self.title_postings: Dict[str, Dict[str, int]] = {}
+        self.stats: Dict[str, int] = {"length": 0, "title_length": 0}
+        # Отсортированный словарь (термы текста и заголовков) для expand_term; None — пересобрать
+        self._vocabulary: Optional[List[str]] = None
+        # Последний проиндексированный коммит и файлы, которые тогда отличались от него в рабочем дереве
+        self.commit: Optional[str] = None
+        self.dirty: List[str] = []
+        # True, пока индекс обновляет DocsWatcher — тогда поиск не сверяет его с файлами сам
+        self.watched = False
+        # time.monotonic() последней сверки (refresh с max_age пропускает сверку чаще этого)
+        self._refreshed_at: Optional[float] = None
+        self.lock = threading.RLock()
+        self._save_timer: Optional[threading.Timer] = None
+
+    # ------------------------
+    # Обновление
+    # ------------------------
+
+    def add_file(self, rel_path: str, text: str, mtime_ns: int, size: int) -> None:
+        with self.lock:
+            self.remove_file(rel_path)
+            self._vocabulary = None
+
+            terms = tokenize(text)
+            title_terms = tokenize(doc_title(Path(rel_path), text))
+            body_tf = Counter(terms)
+            title_tf = Counter(title_terms)
+
+            for term, tf in body_tf.items():
+                self.postings.setdefault(term, {})[rel_path] = tf
+            for term, tf in title_tf.items():
+                self.title_postings.setdefault(term, {})[rel_path] = tf
+
+            self.files[rel_path] = {
+                "mtime_ns": mtime_ns,
+                "size": size,
+                "length": len(terms),
+                "terms": list(body_tf),
+                "title_length": len(title_terms),
+                "title_terms": list(title_tf),
+            }
+            self.stats["length"] += len(terms)
+            self.stats["title_length"] += len(title_terms)
+
+    def remove_file(self, rel_path: str) -> bool:
+        with self.lock:
+            entry = self.files.pop(rel_path, None)
+            if entry is None:
+                return False
+            self._vocabulary = None
+
+            for postings, terms in ((self.postings, entry["terms"]), (self.title_postings, entry["title_terms"])):
+                for term in terms:
+                    docs = postings.get(term)
+                    if docs is None:
+                        continue
+                    docs.pop(rel_path, None)
+                    if not docs:
+                        del postings[term]
+
+            self.stats["length"] -= entry["length"]
+            self.stats["title_length"] -= entry["title_length"]
+            return True
+
+    def update_file(self, rel_path: str) -> bool:
+        # Переиндексирует один файл (или удаляет его из индекса, если файла больше нет).
+        # True, если индекс изменился
+        path = self.root / rel_path
+        try:
+            st = path.stat()
+        except OSError:
+            return self.remove_file(rel_path)
+
+        with self.lock:
+            entry = self.files.get(rel_path)
+            if entry is not None and entry["mtime_ns"] == st.st_mtime_ns and entry["size"] == st.st_size:
+                return False
+            try:
+                text = path.read_text(encoding="utf-8", errors="ignore")
+            except OSError:
+                return self.remove_file(rel_path)
+            self.add_file(rel_path, text, st.st_mtime_ns, st.st_size)
+            return True
+
+    def update_files(self, rel_paths: Iterable[str]) -> int:
+        # Пакетная версия update_file; снапшот сохраняется один раз. Возвращает число изменений
+        changed = sum(1 for rel_path in rel_paths if self.update_file(rel_path))
+        if changed:
+            self._schedule_save()
+        return changed
+
+    def _in_docs(self, rel_path: str) -> bool:
+        if not rel_path.endswith(".md"):
+            return False
+        try:
+            (self.root / rel_path).resolve().relative_to(self.docs_root)
+        except ValueError:
+            return False
+        return True
+
+    def _git(self, *args: str) -> Optional[str]:
+        try:
+            return run_git_command(list(args), cwd=self.root)
+        except (RuntimeError, OSError):
+            return None
+
+    def _git_state(self) -> Optional[Tuple[str, Set[str]]]:
+        # (HEAD, файлы docs, измененные в рабочем дереве) — только если корень проекта и есть корень репозитория
+        toplevel = self._git("rev-parse", "--show-toplevel")
+        if toplevel is None or Path(toplevel.strip()).resolve() != self.root.resolve():
+            return None
+        head = self._git("rev-parse", "--verify", "-q", "HEAD")
+        status = self._git("status", "--porcelain", "-z", "--untracked-files=all", "--", self.docs_subdir or ".")
+        if not head or status is None:
+            return None
+        return head.strip(), {p for p in _parse_porcelain(status) if self._in_docs(p)}
+
+    def _git_changes(self, head: str) -> Optional[Set[str]]:
+        # Файлы docs, измененные коммитами с последней индексации; None — историю сравнить нельзя
+        if self.commit is None:
+            return None
+        if self.commit == head:
+            return set()
+        diff = self._git("diff", "--name-status", "-z", f"{self.commit}..{head}", "--", self.docs_subdir or ".")
+        if diff is None:
+            return None
+        return {p for p in _parse_name_status(diff) if self._in_docs(p)}
+
+    def refresh(self, max_age: float = 0.0) -> int:
+        # Приводит индекс в соответствие с файлами. В git-репозитории проверяются только пути
+        # из git diff <последний коммит>..HEAD, git status и прошлые изменения рабочего дерева;
+        # иначе — полная сверка по (mtime, size). Возвращает число добавленных/измененных/удаленных файлов.
+        # max_age > 0 — сверка пропускается, если прошлая была меньше max_age секунд назад
+        with self.lock:
+            now = time.monotonic()
+            if max_age > 0 and self._refreshed_at is not None and now - self._refreshed_at < max_age:
+                return 0
+            self._refreshed_at = now
+            state = self._git_state()
+            changes = self._git_changes(state[0]) if state is not None else None
+            if state is not None and changes is not None:
+                head, dirty = state
+                changed = sum(1 for p in changes | dirty | set(self.dirty) if self.update_file(p))
+            else:
+                changed = self._scan()
+
+            head, dirty = state if state is not None else (None, set())
+            if changed or head != self.commit or sorted(dirty) != self.dirty:
+                self.commit = head
+                self.dirty = sorted(dirty)
+                self._schedule_save()
+            return changed
+
+    def _scan(self) -> int:
+        # Полная сверка с файловой системой по (mtime, size): перечитываются только измененные файлы
+        with self.lock:
+            seen: Dict[str, os.DirEntry] = {}
+            if self.docs_root.exists():
+                for entry in iter_markdown(self.docs_root):
+                    seen[Path(entry.path).relative_to(self.root).as_posix()] = entry
+
+            changed = 0
+            for rel_path in [p for p in self.files if p not in seen]:
+                self.remove_file(rel_path)
+                changed += 1
+
+            for rel_path, dir_entry in seen.items():
+                try:
+                    st = dir_entry.stat()
+                except OSError:
+                    continue
+                entry = self.files.get(rel_path)
+                if entry is not None and entry["mtime_ns"] == st.st_mtime_ns and entry["size"] == st.st_size:
+                    continue
+                try:
+                    text = Path(dir_entry.path).read_text(encoding="utf-8", errors="ignore")
+                except OSError:
+                    continue
+                self.add_file(rel_path, text, st.st_mtime_ns, st.st_size)
+                changed += 1
+            return changed
+
+    # ------------------------
+    # Поиск
+    # ------------------------
+
+    def bm25(self, terms: List[str]) -> Dict[str, float]:
+        # BM25F по файлам: {rel_path: score}. Терм запроса — все словоформы словаря с его основой
+        # (вхождения складываются); обходим только их постинги
+        with self.lock:
+            n_docs = len(self.files)
+            if not n_docs:
+                return {}
+            avg_length = self.stats["length"] / n_docs or 1.0
+            avg_title = self.stats["title_length"] / n_docs or 1.0
+            if self._vocabulary is None:
+                self._vocabulary = sorted(set(self.postings) | set(self.title_postings))
+
+            scores: Dict[str, float] = {}
+            for term in set(terms):
+                body: Dict[str, int] = {}
+                titles: Dict[str, int] = {}
+                for form in expand_term(term, self._vocabulary):
+                    for rel_path, tf in self.postings.get(form, {}).items():
+                        body[rel_path] = body.get(rel_path, 0) + tf
+                    for rel_path, tf in self.title_postings.get(form, {}).items():
+                        titles[rel_path] = titles.get(rel_path, 0) + tf
+                candidates = set(body) | set(titles)
+                if not candidates:
+                    continue
+
+                df = len(candidates)
+                idf = math.log(1.0 + (n_docs - df + 0.5) / (df + 0.5))
+                for rel_path in candidates:
+                    entry = self.files[rel_path]
+                    tf = body.get(rel_path, 0) / (1.0 - _BM25_B + _BM25_B * entry["length"] / avg_length)
+                    tf += _BM25_TITLE_BOOST * titles.get(rel_path, 0) / (
+                        1.0 - _BM25_B + _BM25_B * entry["title_length"] / avg_title
+                    )
+                    scores[rel_path] = scores.get(rel_path, 0.0) + idf * tf * (_BM25_K1 + 1.0) / (_BM25_K1 + tf)
+            return scores
+
+    # ------------------------
+    # Персистентность
+    # ------------------------
+
+    def _schedule_save(self) -> None:
+        # Снапшот пишется в фоне: коммит сохраняется вместе с постингами, поэтому после
+        # потери последнего снапшота индекс просто догонит изменения от предыдущего коммита
+        with self.lock:
+            if self._save_timer is None:
+                self._save_timer = threading.Timer(_SAVE_DELAY_SECONDS, self.flush)
+                self._save_timer.daemon = True
+                self._save_timer.start()
+
+    def flush(self) -> None:
+        # Сохраняет отложенный снапшот, если он есть
+        with self.lock:
+            timer, self._save_timer = self._save_timer, None
+            if timer is None:
+                return
+            timer.cancel()
+            self.save()
+
+    def save(self) -> None:
+        with self.lock:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = self.path.with_name(self.path.name + ".tmp")
+            with tmp_path.open("w", encoding="utf-8") as f:
+                json.dump(
+                    {
+                        "version": self.VERSION,
+                        "docs_root": str(self.docs_root),
+                        "files": self.files,
+                        "postings": self.postings,
+                        "title_postings": self.title_postings,
+                        "stats": self.stats,
+                        "commit": self.commit,
+                        "dirty": self.dirty,
+                    },
+                    f,
+                    ensure_ascii=False,
+                )
+            os.replace(tmp_path, self.path)
+
+    @classmethod
+    def load(cls, root: Path, docs_subdir: str, path: Path) -> "DocsIndex":
+        # Снапшот с диска, если он от того же каталога и той же версии; иначе пустой индекс
+        index = cls(root, docs_subdir, path)
+        try:
+            with path.open("r", encoding="utf-8") as f:
+                raw = json.load(f)
+        except (OSError, ValueError):
+            return index
+        if raw.get("version") != cls.VERSION or raw.get("docs_root") != str(index.docs_root):
+            return index
+
+        index.files = raw.get("files", {})
+        index.postings = raw.get("postings", {})
+        index.title_postings = raw.get("title_postings", {})
+        index.stats = raw.get("stats", index.stats)
+        index.commit = raw.get("commit")
+        index.dirty = raw.get("dirty", [])
+        return index
+
+
+def _safe_name(value: str) -> str:
+    return re.sub(r"[^\w.-]", "_", value)
+
+
+def index_path_for(project_slug: str, docs_subdir: str) -> Path:
+    # demo_data/docs_index/<project_slug>.<docs_subdir>.json
+    return settings.paths.docs_index_dir / f"{_safe_name(project_slug)}.{_safe_name(docs_subdir)}.json"
+
+
+_indexes: Dict[Tuple[Path, str, Path], DocsIndex] = {}
+_indexes_lock = threading.Lock()
+
+
+def get_docs_index(root: Path, project_slug: str, docs_subdir: str = "docs") -> DocsIndex:
+    # Один экземпляр индекса на (корень проекта, подкаталог, файл снапшота) в процессе
+    path = index_path_for(project_slug, docs_subdir)
+    key = (root, docs_subdir, path)
+    with _indexes_lock:
+        index = _indexes.get(key)
+        if index is None:
+            index = _indexes[key] = DocsIndex.load(root, docs_subdir, path)
+        return index
+
+
+def drop_docs_index(root: Path, project_slug: str, docs_subdir: str = "docs") -> bool:
+    # Выгружает индекс проекта из памяти (снапшот сохраняется). Индекс, который ведет watcher,
+    # остается: иначе следующий поиск снова сверял бы его с диском
+    key = (root, docs_subdir, index_path_for(project_slug, docs_subdir))
+    with _indexes_lock:
+        index = _indexes.get(key)
+        if index is None or index.watched:
+            return False
+        del _indexes[key]
+    index.flush()
+    return True
+
+
+def reset_docs_indexes() -> None:
+    # Сбрасывает кэш экземпляров (например, после смены путей в settings), сохранив отложенные снапшоты
+    with _indexes_lock:
+        for index in _indexes.values():
+            index.flush()
+        _indexes.clear()
+
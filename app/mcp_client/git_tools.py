@@ -2,10 +2,12 @@
 
 from __future__ import annotations
 
+import re
 from pathlib import Path
-from typing import Any, Dict, List
+from typing import Any, Dict, List, Optional, Tuple
 
 from app.config.settings import settings
+from app.mcp_client.docs_index import drop_docs_index, get_docs_index, tokenize
 
 
 def _project_root(project_slug: str) -> Path:
@@ -14,20 +16,93 @@ def _project_root(project_slug: str) -> Path:
     return root.resolve()
 
 
+# Короткие стоп-слова, которые не участвуют в поиске по токенам
+_STOP_WORDS = {"как", "что", "где", "когда", "и", "в", "на", "с", "по", "для", "или", "а", "это", "эта", "этот"}
+
+# Порог очков по умолчанию для каждого ранжировщика
+_DEFAULT_MIN_SCORE = {"bm25": 0.0, "legacy": 5.0}
+
+# Как часто (секунды) поиск без DocsWatcher сверяет индекс документации с файлами
+_DOCS_REFRESH_INTERVAL = 2.0
+
+
+def _snippet(text: str, needles: List[str]) -> str:
+    # Фрагмент вокруг первого найденного совпадения (приоритет — порядок needles)
+    text_norm = text.lower()
+    best_idx = 0
+    for needle in needles:
+        idx = text_norm.find(needle)
+        if idx != -1:
+            best_idx = idx
+            break
+
+    start = max(0, best_idx - 200)
+    end = min(len(text), best_idx + 200)
+    return text[start:end].strip()
+
+
+def _legacy_score(text_norm: str, tokens: List[str], technical_phrases: List[str]) -> Tuple[float, List[str]]:
+    # Прежний скоринг: число вхождений подстрок с весами
+    score = 0.0
+    matched_tokens = []
+
+    # 1. Фразовый поиск (высокий вес) - exact match дает большой бонус
+    for phrase in technical_phrases:
+        phrase_count = text_norm.count(phrase)
+        if phrase_count > 0:
+            score += phrase_count * 10.0  # Фраза дает 10 баллов за вхождение
+            matched_tokens.append(phrase)
+
+    # 2. Поиск по токенам (базовый вес)
+    token_matches = 0
+    for token in tokens:
+        count = text_norm.count(token)
+        if count > 0:
+            score += count * 1.0  # Токен дает 1 балл за вхождение
+            matched_tokens.append(token)
+            token_matches += 1
+
+    # 3. Бонус за количество совпавших разных токенов (diversity bonus)
+    if token_matches >= 2:
+        score += token_matches * 2.0
+
+    return score, matched_tokens
+
+
+def warm_docs_index(project_slug: str, docs_subdir: str = "docs") -> int:
+    # Загружает и сверяет с диском индекс search_in_docs заранее; число проиндексированных файлов
+    index = get_docs_index(_project_root(project_slug), project_slug, docs_subdir)
+    if not index.watched:
+        index.refresh()
+    return len(index.files)
+
+
+def release_docs_index(project_slug: str, docs_subdir: str = "docs") -> bool:
+    # Выгружает индекс проекта из памяти (при следующем поиске он загрузится из снапшота)
+    return drop_docs_index(_project_root(project_slug), project_slug, docs_subdir)
+
+
 def search_in_docs(
     project_slug: str,
     query: str,
     docs_subdir: str = "docs",
     max_results: int = 5,
-    min_score: float = 5.0,
+    min_score: Optional[float] = None,
+    ranker: str = "bm25",
 ) -> List[Dict[str, Any]]:
     """
     Ищет строку/фразу в markdown-файлах документации проекта.
-    Использует токенизацию и фразовый поиск для улучшения релевантности.
+    ranker="bm25" — BM25F по словам (с учетом длины документа и заголовка),
+    ranker="legacy" — прежний подсчет вхождений токенов и фраз, для сравнения.
 
     Возвращает список словарей:
       {"path": str, "snippet": str, "score": float}
     """
+    if ranker not in _DEFAULT_MIN_SCORE:
+        raise ValueError(f"Unknown ranker: {ranker}. Expected 'bm25' or 'legacy'.")
+    if min_score is None:
+        min_score = _DEFAULT_MIN_SCORE[ranker]
+
     root = _project_root(project_slug)
     docs_root = (root / docs_subdir).resolve()
 
@@ -36,11 +111,50 @@ def search_in_docs(
 
     query_norm = query.lower().strip()
 
+    if ranker == "bm25":
+        # Скоринг по постингам индекса; с диска читаются только файлы из выдачи — для фрагмента.
+        # Если индекс ведет DocsWatcher, сверку с файлами запрос не делает; без него сверка
+        # (git rev-parse/status или обход каталога) идет не чаще раза в _DOCS_REFRESH_INTERVAL секунд
+        index = get_docs_index(root, project_slug, docs_subdir)
+        if not index.watched:
+            index.refresh(max_age=_DOCS_REFRESH_INTERVAL)
+
+        query_terms = tokenize(query_norm)
+        terms = [t for t in query_terms if len(t) > 2 and t not in _STOP_WORDS] or query_terms
+        scored = sorted(
+            ((score, rel_path) for rel_path, score in index.bm25(terms).items() if score >= min_score),
+            key=lambda x: (-x[0], x[1]),
+        )
+        results: List[Dict[str, Any]] = []
+        for score, rel_path in scored[:max_results]:
+            try:
+                text = (root / rel_path).read_text(encoding="utf-8", errors="ignore")
+            except OSError:
+                continue
+            results.append(
+                {
+                    "path": rel_path,
+                    "snippet": _snippet(text, terms),
+                    "score": score,
+                }
+            )
+        return results
+
+    return _search_legacy(root, docs_root, query_norm, max_results, min_score)
+
+
+def _search_legacy(
+    root: Path,
+    docs_root: Path,
+    query_norm: str,
+    max_results: int,
+    min_score: float,
+) -> List[Dict[str, Any]]:
+    # Прежний поиск полным проходом по файлам — оставлен для сравнения с BM25
     # Токенизация: разбиваем запрос на слова, фильтруем короткие стоп-слова
-    stop_words = {"как", "что", "где", "когда", "и", "в", "на", "с", "по", "для", "или", "а", "это", "эта", "этот"}
     tokens = [
         word for word in query_norm.split()
-        if len(word) > 2 and word not in stop_words
+        if len(word) > 2 and word not in _STOP_WORDS
     ]
 
     if not tokens:
@@ -48,7 +162,6 @@ def search_in_docs(
         tokens = [query_norm]
 
     # Извлекаем технические термины (2-3 слова подряд из латиницы/цифр)
-    import re
     technical_phrases = re.findall(r'\b[a-z][a-z0-9_-]*(?:\s+[a-z][a-z0-9_-]*){0,2}\b', query_norm)
     technical_phrases = [p for p in technical_phrases if len(p) > 3]
 
@@ -60,56 +173,15 @@ def search_in_docs(
         except OSError:
             continue
 
-        text_norm = text.lower()
-
-        # Подсчитываем релевантность на основе токенов и фраз
-        score = 0.0
-        matched_tokens = []
-
-        # 1. Фразовый поиск (высокий вес) - exact match дает большой бонус
-        for phrase in technical_phrases:
-            phrase_count = text_norm.count(phrase)
-            if phrase_count > 0:
-                score += phrase_count * 10.0  # Фраза дает 10 баллов за вхождение
-                matched_tokens.append(phrase)
-
-        # 2. Поиск по токенам (базовый вес)
-        token_matches = 0
-        for token in tokens:
-            count = text_norm.count(token)
-            if count > 0:
-                score += count * 1.0  # Токен дает 1 балл за вхождение
-                matched_tokens.append(token)
-                token_matches += 1
-
-        # 3. Бонус за количество совпавших разных токенов (diversity bonus)
-        if token_matches >= 2:
-            score += token_matches * 2.0
+        score, matched_tokens = _legacy_score(text.lower(), tokens, technical_phrases)
 
         # Применяем минимальный порог релевантности
         if score >= min_score:
-            # Находим фрагмент с наибольшей концентрацией совпадений
-            best_idx = -1
-            if matched_tokens:
-                # Приоритет - фразы, потом токены
-                for token in matched_tokens:
-                    idx = text_norm.find(token)
-                    if idx != -1:
-                        best_idx = idx
-                        break
-
-            if best_idx == -1:
-                best_idx = 0
-
-            # Берем фрагмент вокруг найденного места
-            start = max(0, best_idx - 200)
-            end = min(len(text), best_idx + 200)
-            snippet = text[start:end].strip()
-
             results.append(
                 {
                     "path": str(path.relative_to(root)),
-                    "snippet": snippet,
+                    # Приоритет - фразы, потом токены
+                    "snippet": _snippet(text, matched_tokens),
                     "score": score,
                 }
             )
@@ -118,6 +190,7 @@ def search_in_docs(
     results.sort(key=lambda r: r.get("score", 0), reverse=True)
     return results[:max_results]
 
+
 def list_files(project_slug: str, subdir: str = "docs") -> List[Dict[str, Any]]:
     # Возвращает список файлов подкаталога с их содержимым: path + content
     root = _project_root(project_slug)
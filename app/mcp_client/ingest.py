@@ -0,0 +1,102 @@
+# app/mcp_client/ingest.py
+
+# Очередь загрузки измененных файлов документации в векторное хранилище.
+# События копятся в очереди, фоновый поток забирает все накопившееся разом,
+# схлопывает повторы и пишет каждый проект одним upsert_documents
+
+from __future__ import annotations
+
+import logging
+import queue
+import threading
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from app.config.settings import settings
+from app.mcp_client import vector_tools
+from app.mcp_client.docs_index import doc_title
+
+logger = logging.getLogger(__name__)
+
+
+def _read_doc(root: Path, rel_path: str) -> Optional[Dict[str, object]]:
+    # Документ для vector store или None, если файла больше нет
+    try:
+        text = (root / rel_path).read_text(encoding="utf-8", errors="ignore")
+    except OSError:
+        return None
+    return {
+        "doc_id": rel_path,
+        "title": doc_title(Path(rel_path), text),
+        "text": text,
+        "metadata": {"kind": "doc", "source": "git"},
+    }
+
+
+class VectorIngestQueue:
+    def __init__(self) -> None:
+        self._queue: "queue.Queue[Optional[Tuple[str, List[str]]]]" = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._thread = threading.Thread(target=self._run, name="vector-ingest", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        # Обрабатывает уже поставленные события и останавливает поток
+        if self._thread is None:
+            return
+        self._queue.put(None)
+        self._thread.join(timeout)
+        self._thread = None
+
+    def enqueue(self, project_slug: str, rel_paths: Iterable[str]) -> None:
+        paths = list(rel_paths)
+        if paths:
+            self._queue.put((project_slug, paths))
+
+    def join(self) -> None:
+        # Ждет, пока все поставленные события будут записаны
+        self._queue.join()
+
+    def _run(self) -> None:
+        while True:
+            items = [self._queue.get()]
+            while True:
+                try:
+                    items.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            pending: Dict[str, Set[str]] = {}
+            for item in items:
+                if item is not None:
+                    pending.setdefault(item[0], set()).update(item[1])
+            try:
+                for project_slug, paths in pending.items():
+                    self._ingest(project_slug, sorted(paths))
+            except Exception:
+                logger.exception("Vector ingest failed")
+            finally:
+                for _ in items:
+                    self._queue.task_done()
+
+            if any(item is None for item in items):
+                return
+
+    @staticmethod
+    def _ingest(project_slug: str, rel_paths: List[str]) -> None:
+        # Файлы читаются в момент записи — при нескольких правках подряд попадет последняя версия
+        root = (settings.paths.demo_repos_dir / project_slug).resolve()
+        documents = []
+        for rel_path in rel_paths:
+            doc = _read_doc(root, rel_path)
+            if doc is None:
+                vector_tools.delete_document(project_slug=project_slug, doc_id=rel_path)
+            else:
+                documents.append(doc)
+        if documents:
+            vector_tools.upsert_documents(project_slug=project_slug, documents=documents)
+        logger.info("Ingested %d docs into vector store for %s", len(rel_paths), project_slug)
@@ -24,14 +24,41 @@ def upsert_document(
     )
 
 
+def upsert_documents(
+    project_slug: str,
+    documents: List[Dict[str, Any]],
+) -> Dict[str, Any]:
+    # Пакетная загрузка документов одним проходом: [{"doc_id", "title", "text", "metadata"}, ...]
+    store = get_vector_store()
+    return store.upsert_documents(
+        project_slug=project_slug,
+        documents=documents,
+    )
+
+
+def delete_document(project_slug: str, doc_id: str) -> Dict[str, Any]:
+    store = get_vector_store()
+    return store.delete_document(project_slug=project_slug, doc_id=doc_id)
+
+
 def search_documents(
     project_slug: str,
     query: str,
     limit: int = 5,
+    mode: str = "keyword",
+    ranker: str = "bm25",
 ) -> List[Dict[str, Any]]:
     store = get_vector_store()
     return store.search_documents(
         project_slug=project_slug,
         query=query,
         limit=limit,
-    )
\ No newline at end of file
+        mode=mode,
+        ranker=ranker,
+    )
+
+
+def warm(project_slug: str) -> int:
+    # Предзагрузка индекса и документов хранилища; число документов проекта
+    store = get_vector_store()
+    return store.warm(project_slug)
\ No newline at end of file
@@ -4,17 +4,57 @@
 
 from __future__ import annotations
 
-from typing import List, Dict, Any
+import asyncio
+from typing import Any, AsyncIterator, Dict, List, Optional
 
-from app.agent.agent import DocOpsAgent, ProjectContext
+import gradio as gr
+
+from app.agent.agent import DocOpsAgent
+from app.agent.registry import get_agent
+from app.core.catalog import get_project_catalog
 
 
 def _make_agent(project_slug: str) -> DocOpsAgent:
-    # Внутренний хелпер: создает DocOpsAgent для указанного slug проекта
+    # Внутренний хелпер: агент проекта из общего реестра (создается и прогревается при первом обращении)
+
+    return get_agent(project_slug)
+
+
+def _project_page(query: str, page: int, current: Optional[str]) -> tuple:
+    # Страница каталога для выпадающего списка. Выбранный проект остается выбранным,
+    # даже если его нет на странице (добавляется в начало списка)
+
+    catalog = get_project_catalog()
+    result = catalog.page(query or "", page)
+    choices = list(result.items)
+    slugs = {slug for _, slug in choices}
+    if current and current not in slugs:
+        info = catalog.get(current)
+        if info is not None:
+            choices.insert(0, (info.name, info.slug))
+            slugs.add(info.slug)
+    value = current if current in slugs else (choices[0][1] if choices else None)
+
+    return (
+        gr.update(choices=choices, value=value),
+        result.page,
+        gr.update(interactive=result.page > 0),
+        gr.update(interactive=result.has_more),
+    )
+
+
+def on_search_projects(query: str, current: Optional[str]) -> tuple:
+    # Колбэк поиска проекта: первая страница совпадений по префиксу
 
-    project = ProjectContext(slug=project_slug)
-    agent = DocOpsAgent(project=project)
-    return agent
+    return _project_page(query, 0, current)
+
+
+def on_prev_projects(query: str, page: int, current: Optional[str]) -> tuple:
+    return _project_page(query, max(0, (page or 0) - 1), current)
+
+
+def on_next_projects(query: str, page: int, current: Optional[str]) -> tuple:
+    return _project_page(query, (page or 0) + 1, current)
 
 
 def format_sources_markdown(sources: List[Dict[str, Any]]) -> str:
@@ -30,21 +70,29 @@ def format_sources_markdown(sources: List[Dict[str, Any]]) -> str:
         lines.append(f"- `{path}` — {snippet}")
     return "\n".join(lines)
 
-def on_ask_question(
+async def on_ask_question(
     project_slug: str,
     question: str,
-) -> tuple[str, str]:
-    # Колбэк обработки запроса Q&A: создает агента, отвечает на вопрос и возвращает ответ и источники
+) -> AsyncIterator[tuple[str, str]]:
+    # Колбэк обработки запроса Q&A (асинхронный генератор): Gradio перерисовывает ответ на каждом
+    # yield — сначала источники, затем ответ по мере генерации. Поток воркера при этом не занят
 
     if not question.strip():
-        return "It appears the question is empty - please try to formulate it a bit more detailed.", ""
-
-    agent = _make_agent(project_slug)
-    result = agent.answer_question(question=question)
-
-    answer = result.get("answer", "")
-    sources = result.get("sources") or []
-
-    sources_md = format_sources_markdown(sources)
-
-    return answer, sources_md
\ No newline at end of file
+        yield "It appears the question is empty - please try to formulate it a bit more detailed.", ""
+        return
+
+    # Первое обращение к проекту прогревает агента — это блокирующая работа, уводим ее из event loop
+    agent = await asyncio.to_thread(_make_agent, project_slug)
+    answer = ""
+    sources_md = ""
+
+    async for event in agent.aanswer_question_stream(question=question):
+        if event["type"] == "sources":
+            sources_md = format_sources_markdown(event["sources"])
+            yield answer, sources_md
+        elif event["type"] == "delta":
+            answer += event["text"]
+            yield answer, sources_md
+        elif event["type"] == "done" and event.get("cached"):
+            sources_md = f"_Answer served from cache ({event['cached']} match)._\n\n{sources_md}"
+            yield answer, sources_md
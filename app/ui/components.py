@@ -2,30 +2,50 @@
 
 from __future__ import annotations
 
-from typing import List, Tuple
-
 import gradio as gr
 
+from app.core.catalog import get_project_catalog
+
 
 def project_dropdown(
     label: str = "Проект",
     value: str | None = None,
 ) -> gr.Dropdown:
-    # Создает выпадающий список для выбора демо-проекта (доступны два предустановленных варианта)
+    # Создает выпадающий список проектов: первая страница каталога из SQLite (остальные — через поиск и листание)
 
-    choices: List[Tuple[str, str]] = [
-        ("DocOps SaaS Platform", "docops-saas"),
-        ("Airport Food Delivery", "airport-food"),
-    ]
+    catalog = get_project_catalog()
+    first = catalog.page()
 
     return gr.Dropdown(
         label=label,
-        choices=[c[1] for c in choices],
-        value=value or "docops-saas",
-        info="Выберите демо-проект, на вопросы по которому должен отвечать агент",
+        choices=first.items,
+        value=value or catalog.default_slug(),
+        info="Выберите проект, на вопросы по которому должен отвечать агент",
     )
 
 
+def project_picker():
+    # Создает выбор проекта для больших каталогов: поиск по префиксу имени/slug, выпадающий список
+    # текущей страницы и листание страниц (номер страницы хранится в gr.State)
+
+    search_input = gr.Textbox(
+        label="Поиск проекта",
+        placeholder="Начало названия или slug",
+        max_lines=1,
+    )
+    project_dd = project_dropdown()
+    with gr.Row():
+        prev_btn = gr.Button("← Назад", size="sm", interactive=False)
+        next_btn = gr.Button(
+            "Далее →",
+            size="sm",
+            interactive=get_project_catalog().page().has_more,
+        )
+    page_state = gr.State(0)
+
+    return search_input, project_dd, prev_btn, next_btn, page_state
+
+
 def sources_markdown(label: str = "Использованные источники") -> gr.Markdown:
     # Создает markdown-компонент для отображения источников
 
@@ -35,7 +55,7 @@ def sources_markdown(label: str = "Использованные источник
 def qa_tab_components():
     # Создает набор UI-компонентов для вкладки Q&A: выбор проекта, ввод вопроса и вывод ответа
 
-    project_dd = project_dropdown()
+    search_input, project_dd, prev_btn, next_btn, page_state = project_picker()
 
     question_input = gr.Textbox(
         label="Вопрос по системе/документации",
@@ -48,4 +68,14 @@ def qa_tab_components():
     answer_md = gr.Markdown(label="Ответ")
     sources_md = sources_markdown()
 
-    return project_dd, question_input, ask_btn, answer_md, sources_md
\ No newline at end of file
+    return (
+        search_input,
+        project_dd,
+        prev_btn,
+        next_btn,
+        page_state,
+        question_input,
+        ask_btn,
+        answer_md,
+        sources_md,
+    )
\ No newline at end of file
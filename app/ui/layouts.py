@@ -24,13 +24,36 @@ _Демо-версия ИИ-агента для работы с документ
             with gr.Tab("Q&A по системе"):
                 # Set up Q&A tab with its components and event handlers
                 (
+                    qa_project_search,
                     qa_project_dd,
+                    qa_prev_btn,
+                    qa_next_btn,
+                    qa_page_state,
                     qa_question_input,
                     qa_ask_btn,
                     qa_answer_md,
                     qa_sources_md,
                 ) = components.qa_tab_components()
 
+                # Поиск и листание каталога проектов перерисовывают выпадающий список
+                picker_outputs = [qa_project_dd, qa_page_state, qa_prev_btn, qa_next_btn]
+                qa_project_search.change(
+                    fn=callbacks.on_search_projects,
+                    inputs=[qa_project_search, qa_project_dd],
+                    outputs=picker_outputs,
+                    trigger_mode="always_last",
+                )
+                qa_prev_btn.click(
+                    fn=callbacks.on_prev_projects,
+                    inputs=[qa_project_search, qa_page_state, qa_project_dd],
+                    outputs=picker_outputs,
+                )
+                qa_next_btn.click(
+                    fn=callbacks.on_next_projects,
+                    inputs=[qa_project_search, qa_page_state, qa_project_dd],
+                    outputs=picker_outputs,
+                )
+
                 # Connect the Q&A button click event to the appropriate callback
                 qa_ask_btn.click(
                     fn=callbacks.on_ask_question,
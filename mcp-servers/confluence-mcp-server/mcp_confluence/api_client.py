@@ -31,8 +31,15 @@ class ConfluenceClient:
             timeout=timeout,
         )
 
-    def _get(self, path: str, params: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
-        resp = self.client.get(path, params=params or {})
+    def _get(
+        self,
+        path: str,
+        params: Optional[Dict[str, Any]] = None,
+        timeout: Optional[float] = None,
+    ) -> Dict[str, Any]:
+        # timeout — таймаут этого запроса вместо заданного для клиента
+        kwargs: Dict[str, Any] = {"timeout": timeout} if timeout is not None else {}
+        resp = self.client.get(path, params=params or {}, **kwargs)
         resp.raise_for_status()
         return resp.json()
 
@@ -46,11 +53,12 @@ class ConfluenceClient:
         query: str,
         space_key: Optional[str] = None,
         limit: int = 10,
+        timeout: Optional[float] = None,
     ) -> List[Dict[str, Any]]:
         cql = build_cql(query=query, space_key=space_key)
         params = {"cql": cql, "limit": limit}
 
-        data = self._get("/rest/api/search", params=params)
+        data = self._get("/rest/api/search", params=params, timeout=timeout)
 
         results: List[Dict[str, Any]] = []
         for item in data.get("results", []):
@@ -70,11 +78,11 @@ class ConfluenceClient:
             )
         return results
 
-    def get_page(self, page_id: str) -> Dict[str, Any]:
+    def get_page(self, page_id: str, timeout: Optional[float] = None) -> Dict[str, Any]:
         params = {
             "expand": "body.storage,version,space",
         }
-        return self._get(f"/rest/api/content/{page_id}", params=params)
+        return self._get(f"/rest/api/content/{page_id}", params=params, timeout=timeout)
 
     def create_page(
         self,
@@ -0,0 +1,169 @@
+# mcp-servers/vector-mcp-server/mcp_vector/ann.py
+
+# Приближенный поиск соседей (IVF): векторы разбиты на кластеры сферическим k-means,
+# при поиске просматриваются только nprobe ближайших к запросу кластеров
+
+from __future__ import annotations
+
+import os
+import time
+from itertools import chain
+from pathlib import Path
+from typing import Dict, List, Optional, Set, Tuple
+
+import numpy as np
+
+# Сколько строк на центроид берем в выборку для обучения k-means
+_TRAIN_SAMPLES_PER_LIST = 256
+
+# Строк матрицы за один шаг при назначении кластеров
+_ASSIGN_CHUNK = 65536
+
+
+class IVFIndex:
+    def __init__(self, centroids: np.ndarray, assign: np.ndarray) -> None:
+        # centroids: (nlist, dim), L2-нормированы; assign[row] — номер кластера строки или -1
+        self.centroids = centroids
+        self.assign = assign
+        self.lists: List[Set[int]] = [set() for _ in range(len(centroids))]
+        for row, label in enumerate(assign):
+            if label >= 0:
+                self.lists[label].add(row)
+        self.trained_rows = int((assign >= 0).sum())
+
+    @property
+    def nlist(self) -> int:
+        return len(self.centroids)
+
+    @classmethod
+    def train(
+        cls,
+        matrix: np.ndarray,
+        alive: np.ndarray,
+        nlist: Optional[int] = None,
+        iterations: int = 10,
+        seed: int = 0,
+    ) -> "IVFIndex":
+        rows = np.flatnonzero(alive)
+        nlist = max(1, min(nlist or int(np.sqrt(len(rows))), len(rows)))
+        rng = np.random.default_rng(seed)
+
+        sample_size = min(len(rows), nlist * _TRAIN_SAMPLES_PER_LIST)
+        sample = np.asarray(matrix[np.sort(rng.choice(rows, sample_size, replace=False))])
+        centroids = sample[rng.choice(len(sample), nlist, replace=False)].copy()
+
+        for _ in range(iterations):
+            labels = np.argmax(sample @ centroids.T, axis=1)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, labels, sample)
+            empty = np.bincount(labels, minlength=nlist) == 0
+            sums[empty] = centroids[empty]
+            norms = np.linalg.norm(sums, axis=1, keepdims=True)
+            norms[norms == 0] = 1.0
+            centroids = (sums / norms).astype(np.float32)
+
+        assign = np.full(matrix.shape[0], -1, dtype=np.int32)
+        for start in range(0, len(rows), _ASSIGN_CHUNK):
+            chunk = rows[start:start + _ASSIGN_CHUNK]
+            assign[chunk] = np.argmax(matrix[chunk] @ centroids.T, axis=1)
+        return cls(centroids, assign)
+
+    # ------------------------
+    # Инкрементальные изменения
+    # ------------------------
+
+    def add(self, row: int, vector: np.ndarray) -> None:
+        if row >= len(self.assign):
+            grown = np.full(max(row + 1, len(self.assign) * 2), -1, dtype=np.int32)
+            grown[: len(self.assign)] = self.assign
+            self.assign = grown
+        self.remove(row)
+
+        label = int(np.argmax(self.centroids @ vector))
+        self.assign[row] = label
+        self.lists[label].add(row)
+
+    def remove(self, row: int) -> None:
+        if row >= len(self.assign):
+            return
+        label = self.assign[row]
+        if label >= 0:
+            self.lists[label].discard(row)
+            self.assign[row] = -1
+
+    # ------------------------
+    # Поиск
+    # ------------------------
+
+    def search(
+        self,
+        matrix: np.ndarray,
+        query: np.ndarray,
+        k: int,
+        nprobe: int,
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        # Возвращает (строки, скоры) top-k по убыванию близости среди nprobe кластеров
+        nprobe = max(1, min(nprobe, self.nlist))
+        centroid_scores = self.centroids @ query
+        probe = np.argpartition(-centroid_scores, nprobe - 1)[:nprobe]
+
+        candidates = np.fromiter(chain.from_iterable(self.lists[p] for p in probe), dtype=np.int64)
+        if not len(candidates) or k <= 0:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32)
+
+        scores = matrix[candidates] @ query
+        k = min(k, len(candidates))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return candidates[top], scores[top]
+
+    # ------------------------
+    # Персистентность
+    # ------------------------
+
+    def save(self, directory: Path, name: str, rows: int) -> None:
+        for suffix, array in (("ivf_centroids", self.centroids), ("ivf_assign", self.assign[:rows])):
+            tmp = directory / f"{name}.{suffix}.npy.tmp"
+            with tmp.open("wb") as f:
+                np.save(f, array)
+            os.replace(tmp, directory / f"{name}.{suffix}.npy")
+
+    @classmethod
+    def load(cls, directory: Path, name: str) -> Optional["IVFIndex"]:
+        centroids_path = directory / f"{name}.ivf_centroids.npy"
+        assign_path = directory / f"{name}.ivf_assign.npy"
+        if not centroids_path.exists() or not assign_path.exists():
+            return None
+        return cls(np.load(centroids_path), np.load(assign_path))
+
+
+def recall_at_k(
+    matrix: np.ndarray,
+    queries: np.ndarray,
+    k: int = 10,
+    nprobes: Tuple[int, ...] = (1, 2, 4, 8, 16),
+    nlist: Optional[int] = None,
+) -> Dict[int, Dict[str, float]]:
+    # Бенчмарк IVF против точного поиска: recall@k и среднее время запроса (мс) для каждого nprobe
+    ivf = IVFIndex.train(matrix, np.ones(len(matrix), dtype=bool), nlist=nlist)
+
+    exact: List[Set[int]] = []
+    started = time.perf_counter()
+    for q in queries:
+        scores = matrix @ q
+        exact.append(set(np.argpartition(-scores, k - 1)[:k].tolist()))
+    exact_ms = (time.perf_counter() - started) * 1000 / len(queries)
+
+    report: Dict[int, Dict[str, float]] = {}
+    for nprobe in nprobes:
+        hits = 0
+        started = time.perf_counter()
+        for q, truth in zip(queries, exact):
+            rows, _ = ivf.search(matrix, q, k, nprobe)
+            hits += len(truth.intersection(rows.tolist()))
+        report[nprobe] = {
+            "recall": hits / (k * len(queries)),
+            "ms_per_query": (time.perf_counter() - started) * 1000 / len(queries),
+            "exact_ms_per_query": exact_ms,
+        }
+    return report
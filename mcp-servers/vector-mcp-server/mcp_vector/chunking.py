@@ -0,0 +1,112 @@
+# mcp-servers/vector-mcp-server/mcp_vector/chunking.py
+
+# Нарезка документов на чанки: сначала по markdown-заголовкам, затем по размеру с перекрытием
+
+from __future__ import annotations
+
+import re
+from dataclasses import dataclass
+from typing import List, Tuple
+
+_HEADING_RE = re.compile(r"^(#{1,6})[ \t]+(.+?)[ \t]*#*[ \t]*$", re.MULTILINE)
+_FENCE_RE = re.compile(r"^[ \t]*(```|~~~)", re.MULTILINE)
+
+# Где предпочтительно резать слишком длинную секцию — от более крупных границ к мелким
+_BREAKS = ("\n\n", "\n", ". ", " ")
+
+
+@dataclass
+class Chunk:
+    index: int
+    start: int  # смещение в символах в тексте родительского документа
+    end: int
+    heading: str  # путь заголовков: "Сервис биллинга / Архитектура"
+
+
+def _fenced_ranges(text: str) -> List[Tuple[int, int]]:
+    # Диапазоны блоков кода: "# ..." внутри них — не заголовки
+    fences = [m.start() for m in _FENCE_RE.finditer(text)]
+    return [(fences[i], fences[i + 1]) for i in range(0, len(fences) - 1, 2)]
+
+
+def _sections(text: str) -> List[Tuple[int, int, str]]:
+    # (start, end, путь заголовков) для каждой секции; текст до первого заголовка — секция без заголовка
+    fenced = _fenced_ranges(text)
+    headings = [
+        m for m in _HEADING_RE.finditer(text)
+        if not any(start <= m.start() < end for start, end in fenced)
+    ]
+
+    sections: List[Tuple[int, int, str]] = []
+    stack: List[Tuple[int, str]] = []
+    section_start, section_heading = 0, ""
+    for m in headings:
+        if m.start() > section_start:
+            sections.append((section_start, m.start(), section_heading))
+
+        level = len(m.group(1))
+        while stack and stack[-1][0] >= level:
+            stack.pop()
+        stack.append((level, m.group(2).strip()))
+        section_start, section_heading = m.start(), " / ".join(title for _, title in stack)
+    sections.append((section_start, len(text), section_heading))
+
+    sections = [s for s in sections if text[s[0]:s[1]].strip()]
+    return _drop_heading_only(text, sections)
+
+
+def _is_heading_only(fragment: str) -> bool:
+    lines = [line for line in fragment.strip().splitlines() if line.strip()]
+    return all(_HEADING_RE.match(line) for line in lines)
+
+
+def _drop_heading_only(text: str, sections: List[Tuple[int, int, str]]) -> List[Tuple[int, int, str]]:
+    # Заголовок без текста объединяем со следующей секцией
+    merged: List[Tuple[int, int, str]] = []
+    pending_start = None
+    for start, end, heading in sections:
+        if _is_heading_only(text[start:end]):
+            if pending_start is None:
+                pending_start = start
+            continue
+        if pending_start is not None:
+            start = pending_start
+            pending_start = None
+        merged.append((start, end, heading))
+    if pending_start is not None:
+        merged.append((pending_start, len(text), sections[-1][2]))
+    return merged
+
+
+def _split_window(text: str, start: int, end: int, max_chars: int) -> int:
+    # Конец окна [start, ...) не дальше max_chars, по возможности на "хорошей" границе
+    if end - start <= max_chars:
+        return end
+    limit = start + max_chars
+    for sep in _BREAKS:
+        cut = text.rfind(sep, start + max_chars // 2, limit)
+        if cut != -1:
+            return cut + len(sep)
+    return limit
+
+
+def chunk_text(text: str, max_chars: int = 1200, overlap: int = 200) -> List[Chunk]:
+    if not text.strip():
+        return []
+
+    overlap = max(0, min(overlap, max_chars // 2))
+    chunks: List[Chunk] = []
+    for section_start, section_end, heading in _sections(text):
+        start = section_start
+        while start < section_end:
+            end = _split_window(text, start, section_end, max_chars)
+            if text[start:end].strip():
+                chunks.append(Chunk(index=len(chunks), start=start, end=end, heading=heading))
+            if end >= section_end:
+                break
+
+            # Следующее окно начинается с перекрытием, с начала слова
+            next_start = max(end - overlap, start + 1)
+            space = text.find(" ", next_start, end)
+            start = space + 1 if space != -1 else next_start
+    return chunks
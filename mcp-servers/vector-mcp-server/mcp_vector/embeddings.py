@@ -0,0 +1,81 @@
+# mcp-servers/vector-mcp-server/mcp_vector/embeddings.py
+
+# Локальные эмбеддеры для плотного поиска. Любой объект с name, dim и embed(texts) подходит как Embedder.
+
+from __future__ import annotations
+
+import os
+import zlib
+from functools import lru_cache
+from typing import Dict, List, Protocol, Tuple, Type
+
+import numpy as np
+
+from .index import tokenize
+
+
+class Embedder(Protocol):
+    name: str
+    dim: int
+
+    def embed(self, texts: List[str]) -> np.ndarray:
+        # Возвращает матрицу float32 формы (len(texts), dim) с L2-нормированными строками
+        ...
+
+
+@lru_cache(maxsize=65536)
+def _term_features(term: str, dim: int, ngram_weight: float) -> Tuple[Tuple[int, float], ...]:
+    # (bucket, signed weight) для слова и его символьных триграмм; термы повторяются, поэтому кэшируем
+    features: List[Tuple[int, float]] = []
+
+    def _add(feature: str, weight: float) -> None:
+        h = zlib.crc32(feature.encode("utf-8"))
+        sign = 1.0 if (h >> 31) & 1 else -1.0
+        features.append((h % dim, sign * weight))
+
+    _add(term, 1.0)
+    padded = f"<{term}>"
+    for i in range(len(padded) - 2):
+        _add(padded[i:i + 3], ngram_weight)
+    return tuple(features)
+
+
+class HashingEmbedder:
+    # Детерминированный эмбеддер без обучения и сети: hashing trick по словам
+    # и символьным триграммам (триграммы сближают словоформы: "биллинг" ~ "биллинга")
+
+    def __init__(self, dim: int = 256, ngram_weight: float = 0.5) -> None:
+        self.dim = dim
+        self.ngram_weight = ngram_weight
+        self.name = f"hashing-{dim}"
+
+    def embed(self, texts: List[str]) -> np.ndarray:
+        out = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            buckets: List[int] = []
+            weights: List[float] = []
+            for term in tokenize(text):
+                for bucket, value in _term_features(term, self.dim, self.ngram_weight):
+                    buckets.append(bucket)
+                    weights.append(value)
+            if buckets:
+                out[row] = np.bincount(buckets, weights=weights, minlength=self.dim)
+
+        norms = np.linalg.norm(out, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        out /= norms
+        return out
+
+
+EMBEDDERS: Dict[str, Type[HashingEmbedder]] = {
+    "hashing": HashingEmbedder,
+}
+
+
+def get_embedder(name: str | None = None) -> Embedder:
+    # Имя берется из DOCOPS_VECTOR_EMBEDDER (по умолчанию "hashing")
+    name = name or os.getenv("DOCOPS_VECTOR_EMBEDDER", "hashing")
+    try:
+        return EMBEDDERS[name]()
+    except KeyError:
+        raise ValueError(f"Unknown embedder: {name}. Available: {', '.join(EMBEDDERS)}")
@@ -0,0 +1,402 @@
+# mcp-servers/vector-mcp-server/mcp_vector/fts.py
+from __future__ import annotations
+
+import json
+import os
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from .chunking import chunk_text
+from .index import tokenize
+
+# Короткие стоп-слова, которые не участвуют в поиске по токенам (как в JsonlDocumentStore)
+_STOP_WORDS = {"как", "что", "где", "когда", "и", "в", "на", "с", "по", "для", "или", "а", "это", "эта", "этот"}
+
+# Токенайзеры FTS5: unicode61 — по словам (регистр и диакритика не важны),
+# trigram — по триграммам, находит подстроки идентификаторов вроде create_invoice / InvoiceService
+_TOKENIZERS = {
+    "unicode61": "unicode61 remove_diacritics 2",
+    "trigram": "trigram case_sensitive 0",
+}
+
+# Веса колонок для bm25(): заголовок документа весомее текста чанка
+_TITLE_WEIGHT = 2.0
+_BODY_WEIGHT = 1.0
+
+# Длина отрывка snippet() в токенах (максимум FTS5 — 64)
+_SNIPPET_TOKENS = 64
+
+# rowid чанка = id документа * _CHUNKS_PER_DOCUMENT + номер чанка: чанки документа удаляются
+# диапазоном по rowid, а не перебором всей FTS-таблицы по неиндексируемой колонке
+_CHUNKS_PER_DOCUMENT = 1 << 20
+
+
+def _project_token(project_slug: str) -> str:
+    # Проект в FTS-индексе — один токен из hex-цифр между «x»: и unicode61, и trigram сопоставляют
+    # его только с тем же slug (разделители «x» не дают совпасть с частью чужого токена)
+    return "x" + project_slug.encode("utf-8").hex() + "x"
+
+
+def get_fts_path() -> Path:
+    env_path = os.getenv("DOCOPS_FTS_STORE_PATH")
+    if env_path:
+        p = Path(env_path).expanduser().resolve()
+    else:
+        # По умолчанию — та же SQLite-база, что и у app.core.storage (<root>/demo_data/demo.db)
+        root = Path(__file__).resolve().parents[3]
+        p = root / "demo_data" / "demo.db"
+
+    p.parent.mkdir(parents=True, exist_ok=True)
+    return p
+
+
+class SqliteFtsDocumentStore:
+    # Хранилище документов в SQLite: fts_documents — документы с метаданными и границами чанков,
+    # fts_chunks — FTS5-индекс по чанкам. Запись транзакционная (WAL, у каждого потока свое соединение),
+    # поиск — bm25() с отрывками snippet(). Интерфейс совпадает с JsonlDocumentStore (только keyword-поиск)
+
+    def __init__(
+        self,
+        path: Optional[Path] = None,
+        *,
+        tokenizer: str = "unicode61",
+        chunk_size: int = 1200,
+        chunk_overlap: int = 200,
+    ) -> None:
+        if tokenizer not in _TOKENIZERS:
+            raise ValueError(f"Unknown tokenizer: {tokenizer}. Expected 'unicode61' or 'trigram'.")
+        self.path: Path = path or get_fts_path()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.tokenizer = tokenizer
+        self.chunk_size = chunk_size
+        self.chunk_overlap = chunk_overlap
+
+        self._local = threading.local()
+        self._conns: List[sqlite3.Connection] = []
+        self._conns_lock = threading.Lock()
+        self._init_schema()
+
+    # ------------------------
+    # Внутренние helpers
+    # ------------------------
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA busy_timeout=5000")
+            conn.row_factory = sqlite3.Row
+            self._local.conn = conn
+            with self._conns_lock:
+                self._conns.append(conn)
+        return conn
+
+    def _init_schema(self) -> None:
+        conn = self._conn()
+        with conn:
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS fts_documents (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    project_slug TEXT NOT NULL,
+                    doc_id TEXT NOT NULL,
+                    title TEXT NOT NULL,
+                    text TEXT NOT NULL,
+                    metadata TEXT NOT NULL,
+                    chunks TEXT NOT NULL,
+                    UNIQUE (project_slug, doc_id)
+                )
+                """
+            )
+            conn.execute(
+                f"""
+                CREATE VIRTUAL TABLE IF NOT EXISTS fts_chunks USING fts5(
+                    title,
+                    body,
+                    project,
+                    tokenize = '{_TOKENIZERS[self.tokenizer]}'
+                )
+                """
+            )
+        # Индекс уже мог быть создан с другим токенайзером — поиск идет тем, что записан в схеме
+        row = conn.execute("SELECT sql FROM sqlite_master WHERE name = 'fts_chunks'").fetchone()
+        if row is not None and "trigram" in row["sql"]:
+            self.tokenizer = "trigram"
+        elif row is not None:
+            self.tokenizer = "unicode61"
+        if row is not None and "document_id" in row["sql"]:
+            self._rebuild_chunks(conn)
+
+    def _rebuild_chunks(self, conn: sqlite3.Connection) -> None:
+        # Индекс старой схемы (чанки с колонкой document_id) пересобирается из fts_documents
+        with conn:
+            conn.execute("DROP TABLE fts_chunks")
+            conn.execute(
+                f"""
+                CREATE VIRTUAL TABLE fts_chunks USING fts5(
+                    title,
+                    body,
+                    project,
+                    tokenize = '{_TOKENIZERS[self.tokenizer]}'
+                )
+                """
+            )
+            for row in conn.execute("SELECT id, project_slug, title, text, chunks FROM fts_documents").fetchall():
+                self._insert_chunks(
+                    conn, row["id"], row["project_slug"], row["title"], row["text"], json.loads(row["chunks"])
+                )
+
+    def _chunk(self, text: str) -> List[Dict[str, Any]]:
+        return [
+            {"start": c.start, "end": c.end, "heading": c.heading}
+            for c in chunk_text(text, self.chunk_size, self.chunk_overlap)
+        ]
+
+    def _write(
+        self,
+        conn: sqlite3.Connection,
+        project_slug: str,
+        doc_id: str,
+        title: str,
+        text: str,
+        metadata: Optional[Dict[str, Any]],
+    ) -> bool:
+        # Пишет документ и его чанки в открытой транзакции; True — документ заменен
+        chunks = self._chunk(text)
+        replaced = self._delete(conn, project_slug, doc_id)
+        cur = conn.execute(
+            "INSERT INTO fts_documents (project_slug, doc_id, title, text, metadata, chunks) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            (
+                project_slug,
+                doc_id,
+                title,
+                text,
+                json.dumps(metadata or {}, ensure_ascii=False),
+                json.dumps(chunks, ensure_ascii=False),
+            ),
+        )
+        self._insert_chunks(conn, cur.lastrowid, project_slug, title, text, chunks)
+        return replaced
+
+    @staticmethod
+    def _insert_chunks(
+        conn: sqlite3.Connection,
+        document_id: int,
+        project_slug: str,
+        title: str,
+        text: str,
+        chunks: List[Dict[str, Any]],
+    ) -> None:
+        if len(chunks) > _CHUNKS_PER_DOCUMENT:
+            raise ValueError(f"Too many chunks in document: {len(chunks)} (max {_CHUNKS_PER_DOCUMENT}).")
+        project = _project_token(project_slug)
+        base = document_id * _CHUNKS_PER_DOCUMENT
+        conn.executemany(
+            "INSERT INTO fts_chunks (rowid, title, body, project) VALUES (?, ?, ?, ?)",
+            [(base + i, title, text[c["start"]:c["end"]], project) for i, c in enumerate(chunks)],
+        )
+
+    @staticmethod
+    def _delete(conn: sqlite3.Connection, project_slug: str, doc_id: str) -> bool:
+        row = conn.execute(
+            "SELECT id FROM fts_documents WHERE project_slug = ? AND doc_id = ?",
+            (project_slug, doc_id),
+        ).fetchone()
+        if row is None:
+            return False
+        base = row["id"] * _CHUNKS_PER_DOCUMENT
+        conn.execute(
+            "DELETE FROM fts_chunks WHERE rowid BETWEEN ? AND ?",
+            (base, base + _CHUNKS_PER_DOCUMENT - 1),
+        )
+        conn.execute("DELETE FROM fts_documents WHERE id = ?", (row["id"],))
+        return True
+
+    def _match_query(self, query: str) -> Optional[str]:
+        # Запрос FTS5: термы в кавычках (спецсимволы синтаксиса не мешают), объединенные OR —
+        # bm25 сам поднимет чанки, где совпало больше термов
+        query_terms = tokenize(query)
+        tokens = [word for word in query_terms if len(word) > 2 and word not in _STOP_WORDS]
+        if not tokens:
+            tokens = query_terms
+        if self.tokenizer == "trigram":
+            # Триграммный индекс не находит термы короче трех символов
+            tokens = [word for word in tokens if len(word) >= 3]
+        if not tokens:
+            return None
+        return " OR ".join('"' + word.replace('"', '""') + '"' for word in dict.fromkeys(tokens))
+
+    # ------------------------
+    # Публичный API
+    # ------------------------
+
+    def upsert_document(
+        self,
+        project_slug: str,
+        doc_id: str,
+        title: str,
+        text: str,
+        metadata: Optional[Dict[str, Any]] = None,
+    ) -> Dict[str, Any]:
+        conn = self._conn()
+        with conn:
+            replaced = self._write(conn, project_slug, doc_id, title, text, metadata)
+        return {
+            "status": "ok",
+            "replaced": replaced,
+        }
+
+    def upsert_documents(
+        self,
+        project_slug: str,
+        documents: List[Dict[str, Any]],
+    ) -> Dict[str, Any]:
+        # Пакетная запись одной транзакцией; при повторе doc_id побеждает последний
+        if not documents:
+            return {"status": "ok", "inserted": 0, "replaced": 0, "results": []}
+
+        results: List[Dict[str, Any]] = []
+        conn = self._conn()
+        with conn:
+            for doc in documents:
+                replaced = self._write(
+                    conn,
+                    project_slug,
+                    doc["doc_id"],
+                    doc.get("title", ""),
+                    doc.get("text", ""),
+                    doc.get("metadata"),
+                )
+                results.append({"doc_id": doc["doc_id"], "replaced": replaced})
+
+        replaced_count = sum(1 for r in results if r["replaced"])
+        return {
+            "status": "ok",
+            "inserted": len(results) - replaced_count,
+            "replaced": replaced_count,
+            "results": results,
+        }
+
+    def delete_document(self, project_slug: str, doc_id: str) -> Dict[str, Any]:
+        conn = self._conn()
+        with conn:
+            deleted = self._delete(conn, project_slug, doc_id)
+        return {"status": "ok", "deleted": deleted}
+
+    def warm(self, project_slug: Optional[str] = None) -> int:
+        # Открывает соединение потока; число документов проекта (или всех, если проект не задан)
+        conn = self._conn()
+        if project_slug is None:
+            (count,) = conn.execute("SELECT COUNT(*) FROM fts_documents").fetchone()
+        else:
+            (count,) = conn.execute(
+                "SELECT COUNT(*) FROM fts_documents WHERE project_slug = ?", (project_slug,)
+            ).fetchone()
+        return count
+
+    def flush(self) -> None:
+        # Записи фиксируются транзакциями сразу — сбрасывать нечего
+        return None
+
+    def compact(self, blocking: bool = True) -> Dict[str, Any]:
+        # Слияние сегментов FTS5-индекса в один (ускоряет поиск после массовой загрузки)
+        conn = self._conn()
+        with conn:
+            conn.execute("INSERT INTO fts_chunks (fts_chunks) VALUES ('optimize')")
+        return {"status": "ok"}
+
+    def close(self) -> None:
+        with self._conns_lock:
+            conns, self._conns = self._conns, []
+        for conn in conns:
+            conn.close()
+        self._local = threading.local()
+
+    def search_documents(
+        self,
+        project_slug: str,
+        query: str,
+        limit: int = 5,
+        min_score: Optional[float] = None,
+        mode: str = "keyword",
+        nprobe: Optional[int] = None,
+        ranker: str = "bm25",
+    ) -> List[Dict[str, Any]]:
+        # Только mode="keyword" и ranker="bm25": очки — bm25() FTS5 со знаком плюс (больше — лучше),
+        # snippet — отрывок лучшего чанка документа. Документ попадает в выдачу один раз.
+        # MATCH сразу ограничен колонкой project, snippet() считается только для отобранных limit чанков
+        if mode != "keyword":
+            raise ValueError(f"Unknown search mode: {mode}. SQLite FTS store supports only 'keyword'.")
+        if ranker != "bm25":
+            raise ValueError(f"Unknown ranker: {ranker}. SQLite FTS store supports only 'bm25'.")
+        if limit <= 0:
+            return []
+        match = self._match_query(query)
+        if match is None:
+            return []
+
+        match = f'project : "{_project_token(project_slug)}" AND ({match})'
+        conn = self._conn()
+        # Лучший чанк каждого документа (при равных очках — первый), затем top-limit документов
+        rows = conn.execute(
+            f"""
+            WITH hit AS (
+                SELECT
+                    rowid AS chunk_rowid,
+                    rowid / {_CHUNKS_PER_DOCUMENT} AS document_id,
+                    -bm25(fts_chunks, {_TITLE_WEIGHT}, {_BODY_WEIGHT}, 0.0) AS score
+                FROM fts_chunks
+                WHERE fts_chunks MATCH ?
+            ),
+            best AS (
+                SELECT
+                    chunk_rowid,
+                    document_id,
+                    score,
+                    ROW_NUMBER() OVER (PARTITION BY document_id ORDER BY score DESC, chunk_rowid) AS place
+                FROM hit
+            )
+            SELECT d.doc_id, d.title, d.metadata, d.chunks, best.chunk_rowid, best.score
+            FROM best
+            JOIN fts_documents AS d ON d.id = best.document_id
+            WHERE best.place = 1 AND d.project_slug = ? AND (? IS NULL OR best.score >= ?)
+            ORDER BY best.score DESC, d.doc_id
+            LIMIT ?
+            """,
+            (match, project_slug, min_score, min_score, limit),
+        ).fetchall()
+        if not rows:
+            return []
+
+        placeholders = ", ".join("?" for _ in rows)
+        excerpts = dict(
+            conn.execute(
+                f"""
+                SELECT rowid, snippet(fts_chunks, 1, '', '', '…', {_SNIPPET_TOKENS})
+                FROM fts_chunks
+                WHERE fts_chunks MATCH ? AND rowid IN ({placeholders})
+                """,
+                (match, *[row["chunk_rowid"] for row in rows]),
+            ).fetchall()
+        )
+
+        results: List[Dict[str, Any]] = []
+        for row in rows:
+            chunk_index = row["chunk_rowid"] % _CHUNKS_PER_DOCUMENT
+            chunk = json.loads(row["chunks"])[chunk_index]
+            results.append(
+                {
+                    "doc_id": row["doc_id"],
+                    "title": row["title"],
+                    "snippet": excerpts.get(row["chunk_rowid"], "").strip(),
+                    "metadata": json.loads(row["metadata"]),
+                    "chunk": {"index": chunk_index, **chunk},
+                    "score": row["score"],
+                }
+            )
+        return results
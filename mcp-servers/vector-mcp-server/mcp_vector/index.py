@@ -0,0 +1,369 @@
+# mcp-servers/vector-mcp-server/mcp_vector/index.py
+
+# Инвертированный индекс для JsonlDocumentStore: term -> {chunk_key: [позиции]} отдельно по project_slug
+
+from __future__ import annotations
+
+import bisect
+import json
+import math
+import os
+import re
+from pathlib import Path
+from typing import Dict, Any, List, Optional, Set, Tuple
+
+# Термы — слова из букв/цифр/подчеркиваний, допускаются дефисы внутри (бизнес-зал, billing-service)
+_TERM_RE = re.compile(r"\w+(?:-\w+)*")
+
+
+# Русские термы сравниваются по основе: до двух последних букв (окончание) отбрасываются,
+# основа не короче _STEM_MIN_LENGTH; короче этого — только точное совпадение
+_STEM_MIN_LENGTH = 4
+_CYRILLIC_RE = re.compile(r"[а-яё]")
+
+
+def tokenize(text: str) -> List[str]:
+    return _TERM_RE.findall(text.lower())
+
+
+def stem_prefix(term: str) -> str:
+    if len(term) <= _STEM_MIN_LENGTH:
+        return term
+    if _CYRILLIC_RE.search(term):
+        return term[: max(_STEM_MIN_LENGTH, len(term) - 2)]
+    return term
+
+
+def expand_term(term: str, vocabulary: List[str]) -> List[str]:
+    # Термы отсортированного словаря с той же основой, что у term (для коротких — только сам term):
+    # "биллинг" и "биллинга" находят друг друга, "billing" — "billing" и "billing-service"
+    if len(term) <= _STEM_MIN_LENGTH:
+        i = bisect.bisect_left(vocabulary, term)
+        return [term] if i < len(vocabulary) and vocabulary[i] == term else []
+    prefix = stem_prefix(term)
+    start = bisect.bisect_left(vocabulary, prefix)
+    end = bisect.bisect_left(vocabulary, prefix + "\uffff", start)
+    return vocabulary[start:end]
+
+
+def chunk_key(doc_id: str, chunk_index: int) -> str:
+    return f"{doc_id}#{chunk_index}"
+
+
+def split_chunk_key(key: str) -> Tuple[str, int]:
+    doc_id, _, chunk_index = key.rpartition("#")
+    return doc_id, int(chunk_index)
+
+
+def index_path_for(store_path: Path) -> Path:
+    # <dir>/documents.jsonl -> <dir>/documents.index.json
+    return store_path.with_name(f"{store_path.stem}.index.json")
+
+
+class InvertedIndex:
+    VERSION = 4
+
+    def __init__(self) -> None:
+        # Какую часть лога покрывает индекс: {"size": байт, "inode": ..., "tail": хэш последних байт}
+        self.source: Dict[str, Any] = {}
+        # Сумма длин актуальных записей лога; остальное — мусор (перезаписанные версии и удаления)
+        self.live_bytes: int = 0
+        # project_slug -> {
+        #     "docs": {doc_id: {offset, length, terms, lengths, title_terms, title_length}},
+        #     "postings": {term: {chunk_key: [pos, ...]}},
+        #     "titles": {term: {doc_id: tf}},
+        #     "stats": {"chunks": N, "length": сумма длин чанков, "title_length": сумма длин заголовков},
+        # }
+        self.projects: Dict[str, Dict[str, Any]] = {}
+        # Отсортированный словарь проекта (термы текста и заголовков) для expand_term; сбрасывается при записи
+        self._vocabulary: Dict[str, List[str]] = {}
+
+    # ------------------------
+    # Обновление
+    # ------------------------
+
+    def _project(self, project_slug: str) -> Dict[str, Any]:
+        return self.projects.setdefault(
+            project_slug,
+            {
+                "docs": {},
+                "postings": {},
+                "titles": {},
+                "stats": {"chunks": 0, "length": 0, "title_length": 0},
+            },
+        )
+
+    def add_document(
+        self,
+        project_slug: str,
+        doc_id: str,
+        chunks: List[str],
+        offset: int,
+        length: int,
+        title: str = "",
+    ) -> None:
+        # Индексируется каждый чанк документа отдельно: позиции считаются внутри чанка.
+        # Заголовок документа — отдельное поле (для BM25F), общее для всех его чанков
+        self.remove_document(project_slug, doc_id)
+        self._vocabulary.pop(project_slug, None)
+        project = self._project(project_slug)
+        postings = project["postings"]
+        stats = project["stats"]
+
+        chunk_terms: List[List[str]] = []
+        chunk_lengths: List[int] = []
+        for i, chunk in enumerate(chunks):
+            positions: Dict[str, List[int]] = {}
+            terms = tokenize(chunk)
+            for pos, term in enumerate(terms):
+                positions.setdefault(term, []).append(pos)
+
+            key = chunk_key(doc_id, i)
+            for term, term_positions in positions.items():
+                postings.setdefault(term, {})[key] = term_positions
+            chunk_terms.append(list(positions))
+            chunk_lengths.append(len(terms))
+
+        title_terms = tokenize(title)
+        for term in title_terms:
+            tfs = project["titles"].setdefault(term, {})
+            tfs[doc_id] = tfs.get(doc_id, 0) + 1
+
+        project["docs"][doc_id] = {
+            "offset": offset,
+            "length": length,
+            "terms": chunk_terms,
+            "lengths": chunk_lengths,
+            "title_terms": sorted(set(title_terms)),
+            "title_length": len(title_terms),
+        }
+        stats["chunks"] += len(chunk_lengths)
+        stats["length"] += sum(chunk_lengths)
+        stats["title_length"] += len(title_terms)
+        self.live_bytes += length
+
+    def remove_document(self, project_slug: str, doc_id: str) -> bool:
+        project = self.projects.get(project_slug)
+        if not project or doc_id not in project["docs"]:
+            return False
+
+        entry = project["docs"].pop(doc_id)
+        self._vocabulary.pop(project_slug, None)
+        self.live_bytes -= entry["length"]
+        postings = project["postings"]
+        for i, terms in enumerate(entry["terms"]):
+            key = chunk_key(doc_id, i)
+            for term in terms:
+                chunks = postings.get(term)
+                if chunks is None:
+                    continue
+                chunks.pop(key, None)
+                if not chunks:
+                    del postings[term]
+
+        titles = project["titles"]
+        for term in entry["title_terms"]:
+            tfs = titles.get(term)
+            if tfs is None:
+                continue
+            tfs.pop(doc_id, None)
+            if not tfs:
+                del titles[term]
+
+        stats = project["stats"]
+        stats["chunks"] -= len(entry["lengths"])
+        stats["length"] -= sum(entry["lengths"])
+        stats["title_length"] -= entry["title_length"]
+        return True
+
+    def set_location(self, project_slug: str, doc_id: str, offset: int, length: int) -> None:
+        entry = self.projects[project_slug]["docs"][doc_id]
+        self.live_bytes += length - entry["length"]
+        entry["offset"] = offset
+        entry["length"] = length
+
+    # ------------------------
+    # Чтение
+    # ------------------------
+
+    def has_project(self, project_slug: str) -> bool:
+        project = self.projects.get(project_slug)
+        return bool(project and project["docs"])
+
+    def iter_locations(self) -> List[Tuple[int, int, str, str]]:
+        # (offset, length, project_slug, doc_id) всех актуальных документов в порядке лога
+        locations = [
+            (entry["offset"], entry["length"], project_slug, doc_id)
+            for project_slug, project in self.projects.items()
+            for doc_id, entry in project["docs"].items()
+        ]
+        locations.sort()
+        return locations
+
+    def doc_location(self, project_slug: str, doc_id: str) -> Optional[Tuple[int, int]]:
+        project = self.projects.get(project_slug)
+        if not project:
+            return None
+        entry = project["docs"].get(doc_id)
+        if entry is None:
+            return None
+        return entry["offset"], entry["length"]
+
+    def count_substring(self, project_slug: str, word: str) -> Dict[str, int]:
+        # {chunk_key: число вхождений word внутри термов чанка} (как text.count(word), но по словарю, а не по тексту).
+        # Подстрочное совпадение важно для русской морфологии: "биллинг" находит "биллинга".
+        project = self.projects.get(project_slug)
+        if not project or not word:
+            return {}
+
+        counts: Dict[str, int] = {}
+        for term, chunks in project["postings"].items():
+            occurrences = term.count(word)
+            if not occurrences:
+                continue
+            for key, positions in chunks.items():
+                counts[key] = counts.get(key, 0) + occurrences * len(positions)
+        return counts
+
+    def count_phrase(self, project_slug: str, words: List[str]) -> Dict[str, int]:
+        # Фраза из нескольких слов: первое слово — суффикс терма, последнее — префикс,
+        # средние совпадают точно, позиции идут подряд
+        if len(words) == 1:
+            return self.count_substring(project_slug, words[0])
+
+        project = self.projects.get(project_slug)
+        if not project or not words:
+            return {}
+
+        postings = project["postings"]
+        last = len(words) - 1
+        slots: List[Dict[str, Set[int]]] = []
+        for i, word in enumerate(words):
+            if i == 0:
+                terms = [t for t in postings if t.endswith(word)]
+            elif i == last:
+                terms = [t for t in postings if t.startswith(word)]
+            else:
+                terms = [word] if word in postings else []
+
+            slot: Dict[str, Set[int]] = {}
+            for term in terms:
+                for key, positions in postings[term].items():
+                    slot.setdefault(key, set()).update(positions)
+            if not slot:
+                return {}
+            slots.append(slot)
+
+        candidates = set(slots[0]).intersection(*slots[1:])
+        counts: Dict[str, int] = {}
+        for key in candidates:
+            count = sum(
+                1
+                for p in slots[0][key]
+                if all(p + i in slots[i][key] for i in range(1, len(slots)))
+            )
+            if count:
+                counts[key] = count
+        return counts
+
+    def vocabulary(self, project_slug: str) -> List[str]:
+        vocabulary = self._vocabulary.get(project_slug)
+        if vocabulary is None:
+            project = self.projects.get(project_slug) or {}
+            vocabulary = sorted(set(project.get("postings", {})) | set(project.get("titles", {})))
+            self._vocabulary[project_slug] = vocabulary
+        return vocabulary
+
+    def bm25(
+        self,
+        project_slug: str,
+        terms: List[str],
+        k1: float = 1.2,
+        b: float = 0.75,
+        title_boost: float = 2.0,
+    ) -> Dict[str, float]:
+        # BM25F по чанкам: {chunk_key: score}. Поля — текст чанка и заголовок документа
+        # (с весом title_boost), каждое нормируется на свою среднюю длину.
+        # Терм запроса — это все словоформы словаря с его основой (expand_term): их вхождения
+        # складываются, как если бы это был один терм. Статистика (N, df, средние длины) уже лежит
+        # в индексе — обходим только постинги этих словоформ
+        project = self.projects.get(project_slug)
+        if not project or not project["stats"]["chunks"]:
+            return {}
+
+        docs = project["docs"]
+        stats = project["stats"]
+        n_chunks = stats["chunks"]
+        avg_length = stats["length"] / n_chunks or 1.0
+        avg_title = stats["title_length"] / len(docs) or 1.0
+        vocabulary = self.vocabulary(project_slug)
+
+        scores: Dict[str, float] = {}
+        for term in set(terms):
+            body: Dict[str, int] = {}
+            titles: Dict[str, int] = {}
+            for form in expand_term(term, vocabulary):
+                for key, positions in project["postings"].get(form, {}).items():
+                    body[key] = body.get(key, 0) + len(positions)
+                for doc_id, title_tf in project["titles"].get(form, {}).items():
+                    titles[doc_id] = titles.get(doc_id, 0) + title_tf
+
+            candidates = set(body)
+            for doc_id in titles:
+                candidates.update(chunk_key(doc_id, i) for i in range(len(docs[doc_id]["lengths"])))
+            if not candidates:
+                continue
+
+            df = len(candidates)
+            idf = math.log(1.0 + (n_chunks - df + 0.5) / (df + 0.5))
+            for key in candidates:
+                doc_id, chunk_index = split_chunk_key(key)
+                entry = docs[doc_id]
+
+                tf = 0.0
+                count = body.get(key)
+                if count:
+                    tf += count / (1.0 - b + b * entry["lengths"][chunk_index] / avg_length)
+                title_tf = titles.get(doc_id)
+                if title_tf:
+                    tf += title_boost * title_tf / (1.0 - b + b * entry["title_length"] / avg_title)
+
+                scores[key] = scores.get(key, 0.0) + idf * tf * (k1 + 1.0) / (k1 + tf)
+        return scores
+
+    # ------------------------
+    # Персистентность
+    # ------------------------
+
+    def save(self, path: Path) -> None:
+        tmp_path = path.with_name(path.name + ".tmp")
+        with tmp_path.open("w", encoding="utf-8") as f:
+            json.dump(
+                {
+                    "version": self.VERSION,
+                    "source": self.source,
+                    "live_bytes": self.live_bytes,
+                    "projects": self.projects,
+                },
+                f,
+                ensure_ascii=False,
+            )
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: Path) -> Optional["InvertedIndex"]:
+        if not path.exists():
+            return None
+        try:
+            with path.open("r", encoding="utf-8") as f:
+                raw = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if raw.get("version") != cls.VERSION:
+            return None
+
+        index = cls()
+        index.source = raw.get("source", {})
+        index.live_bytes = raw.get("live_bytes", 0)
+        index.projects = raw.get("projects", {})
+        return index
@@ -1,11 +1,40 @@
 # mcp-servers/vector-mcp-server/mcp_vector/store.py
 from __future__ import annotations
 
+import hashlib
 import json
 import os
-from dataclasses import dataclass, asdict
+import re
+import threading
+from dataclasses import dataclass, asdict, field
 from pathlib import Path
-from typing import Dict, Any, List, Optional, Tuple
+from typing import Dict, Any, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from .chunking import chunk_text
+from .embeddings import Embedder, get_embedder
+from .fts import SqliteFtsDocumentStore
+from .index import InvertedIndex, index_path_for, split_chunk_key, tokenize
+from .vectors import VectorIndex, vectors_dir_for
+
+# Короткие стоп-слова, которые не участвуют в поиске по токенам
+_STOP_WORDS = {"как", "что", "где", "когда", "и", "в", "на", "с", "по", "для", "или", "а", "это", "эта", "этот"}
+
+# Технические термины (2-3 слова подряд из латиницы/цифр)
+_TECHNICAL_PHRASE_RE = re.compile(r'\b[a-z][a-z0-9_-]*(?:\s+[a-z][a-z0-9_-]*){0,2}\b')
+
+# Сколько последних байт покрытой части лога хэшируем, чтобы узнать, что файл не переписали
+_TAIL_PROBE_BYTES = 64
+
+# Размер пачки текстов для эмбеддера при пересборке векторов
+_EMBED_BATCH_SIZE = 256
+
+# Минимальный прирост лога между сохранениями снапшота индекса (дальше — удвоение)
+_INDEX_SAVE_MIN_BYTES = 64 * 1024
+
+# Порог очков по умолчанию для каждого ранжировщика keyword-поиска
+_DEFAULT_MIN_SCORE = {"bm25": 0.0, "legacy": 5.0}
 
 
 def get_store_path() -> Path:
@@ -29,43 +58,436 @@ class StoredDocument:
     title: str
     text: str
     metadata: Dict[str, Any]
+    # Чанки документа: [{"start", "end", "heading"}, ...], смещения в символах text
+    chunks: List[Dict[str, Any]] = field(default_factory=list)
+
+    def chunk_texts(self) -> List[str]:
+        return [self.text[c["start"]:c["end"]] for c in self.chunks]
 
 
 class JsonlDocumentStore:
-    def __init__(self, path: Optional[Path] = None) -> None:
+    # Хранилище — append-only лог: каждая строка либо версия документа, либо
+    # {"op": "delete", ...}. Актуальна последняя запись по (project_slug, doc_id).
+    # Мусор (перезаписанные версии и удаления) убирается компактизацией.
+
+    def __init__(
+        self,
+        path: Optional[Path] = None,
+        *,
+        compaction_ratio: float = 0.5,
+        compaction_min_bytes: int = 4 * 1024 * 1024,
+        background_compaction: bool = True,
+        embedder: Optional[Embedder] = None,
+        ann_min_rows: int = 10_000,
+        ann_nprobe: int = 8,
+        chunk_size: int = 1200,
+        chunk_overlap: int = 200,
+    ) -> None:
         self.path: Path = path or get_store_path()
         self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.index_path: Path = index_path_for(self.path)
+        self.vectors_dir: Path = vectors_dir_for(self.path)
+        self.embedder: Embedder = embedder or get_embedder()
+
+        # Плотный поиск в проектах от ann_min_rows документов идет через IVF с ann_nprobe кластерами
+        self.ann_min_rows = ann_min_rows
+        self.ann_nprobe = ann_nprobe
+
+        # Документы режутся на чанки до chunk_size символов с перекрытием chunk_overlap;
+        # индексируются, эмбеддятся и возвращаются в поиске именно чанки
+        self.chunk_size = chunk_size
+        self.chunk_overlap = chunk_overlap
+
+        # Компактизация запускается, когда доля мусора >= compaction_ratio и лог >= compaction_min_bytes
+        self.compaction_ratio = compaction_ratio
+        self.compaction_min_bytes = compaction_min_bytes
+        self.background_compaction = background_compaction
+
+        self._index: Optional[InvertedIndex] = None
+        # Разобранные документы в памяти: project_slug -> {doc_id: StoredDocument}; None — еще не загружены
+        self._docs: Optional[Dict[str, Dict[str, StoredDocument]]] = None
+        # Плотные векторы документов; None — пересоберем лениво из кэша документов
+        self._vectors: Optional[VectorIndex] = None
+        self._seen_stat: Optional[Tuple[int, int, int]] = None
+        self._index_saved_at = 0
+        self._lock = threading.RLock()
+        self._compaction_lock = threading.Lock()
+        self._compaction_thread: Optional[threading.Thread] = None
 
     # ------------------------
     # Внутренние helpers
     # ------------------------
 
-    def _load_all(self) -> List[StoredDocument]:
+    def _from_raw(self, raw: Dict[str, Any]) -> StoredDocument:
+        d = StoredDocument(
+            project_slug=raw["project_slug"],
+            doc_id=raw["doc_id"],
+            title=raw.get("title", ""),
+            text=raw.get("text", ""),
+            metadata=raw.get("metadata", {}) or {},
+            chunks=raw.get("chunks") or [],
+        )
+        if not d.chunks and "chunks" not in raw:
+            # Записи, сделанные до появления чанков, режем при чтении
+            d.chunks = self._chunk(d.text)
+        return d
+
+    def _chunk(self, text: str) -> List[Dict[str, Any]]:
+        return [
+            {"start": c.start, "end": c.end, "heading": c.heading}
+            for c in chunk_text(text, self.chunk_size, self.chunk_overlap)
+        ]
+
+    def _new_record(
+        self,
+        project_slug: str,
+        doc_id: str,
+        title: str,
+        text: str,
+        metadata: Optional[Dict[str, Any]],
+    ) -> Dict[str, Any]:
+        return asdict(
+            StoredDocument(
+                project_slug=project_slug,
+                doc_id=doc_id,
+                title=title,
+                text=text,
+                metadata=metadata or {},
+                chunks=self._chunk(text),
+            )
+        )
+
+    @staticmethod
+    def _encode(record: Dict[str, Any]) -> bytes:
+        return (json.dumps(record, ensure_ascii=False) + "\n").encode("utf-8")
+
+    def _iter_records(
+        self,
+        start: int = 0,
+        end: Optional[int] = None,
+    ) -> Iterator[Tuple[int, int, Optional[Dict[str, Any]]]]:
+        # (offset, length, record) для каждой полной строки лога; для пустых строк record = None.
+        # Недописанная последняя строка (без \n) пропускается — ее подхватим при следующем чтении.
         if not self.path.exists():
-            return []
+            return
 
-        docs: List[StoredDocument] = []
-        with self.path.open("r", encoding="utf-8") as f:
+        offset = start
+        with self.path.open("rb") as f:
+            f.seek(start)
             for line in f:
-                line = line.strip()
-                if not line:
-                    continue
-                raw = json.loads(line)
-                docs.append(
-                    StoredDocument(
-                        project_slug=raw["project_slug"],
-                        doc_id=raw["doc_id"],
-                        title=raw.get("title", ""),
-                        text=raw.get("text", ""),
-                        metadata=raw.get("metadata", {}) or {},
-                    )
-                )
+                if end is not None and offset + len(line) > end:
+                    break
+                if not line.endswith(b"\n"):
+                    break
+                record = json.loads(line.decode("utf-8")) if line.strip() else None
+                yield offset, len(line), record
+                offset += len(line)
+
+    def _load_all(self) -> List[StoredDocument]:
+        # Проигрывает весь лог: последняя запись по ключу побеждает, delete удаляет
+        docs: Dict[Tuple[str, str], StoredDocument] = {}
+        for _, _, record in self._iter_records():
+            if record is None:
+                continue
+            key = (record["project_slug"], record["doc_id"])
+            docs.pop(key, None)
+            if record.get("op") != "delete":
+                docs[key] = self._from_raw(record)
+        return list(docs.values())
+
+    def _append(self, records: List[Dict[str, Any]]) -> List[Tuple[int, int]]:
+        # Дописывает записи в конец лога одним write + fsync, возвращает (offset, length) каждой
+        lines = [self._encode(r) for r in records]
+        with self.path.open("ab") as f:
+            offset = f.tell()
+            f.write(b"".join(lines))
+            f.flush()
+            os.fsync(f.fileno())
+
+        locations: List[Tuple[int, int]] = []
+        for line in lines:
+            locations.append((offset, len(line)))
+            offset += len(line)
+        return locations
+
+    # ------------------------
+    # Документы в памяти
+    # ------------------------
+
+    def _get_docs(self, index: InvertedIndex) -> Dict[str, Dict[str, StoredDocument]]:
+        # Один раз читаем актуальные записи по смещениям из индекса, дальше кэш
+        # обновляется вместе с индексом (запись, догон хвоста лога)
+        if self._docs is not None:
+            return self._docs
+
+        docs: Dict[str, Dict[str, StoredDocument]] = {}
+        with self.path.open("rb") as f:
+            for offset, length, project_slug, doc_id in index.iter_locations():
+                f.seek(offset)
+                d = self._from_raw(json.loads(f.read(length).decode("utf-8")))
+                docs.setdefault(project_slug, {})[doc_id] = d
+        self._docs = docs
         return docs
 
-    def _save_all(self, docs: List[StoredDocument]) -> None:
-        with self.path.open("w", encoding="utf-8") as f:
+    def _cache_put(self, docs: List[StoredDocument]) -> None:
+        if self._docs is not None:
             for d in docs:
-                f.write(json.dumps(asdict(d), ensure_ascii=False) + "\n")
+                self._docs.setdefault(d.project_slug, {})[d.doc_id] = d
+
+        # Эмбеддинги считаются при записи, одной пачкой на вызов
+        if self._vectors is not None and docs:
+            self._embed_into(self._vectors, docs)
+
+    def _cache_drop(self, project_slug: str, doc_id: str) -> None:
+        if self._docs is not None:
+            self._docs.get(project_slug, {}).pop(doc_id, None)
+        if self._vectors is not None:
+            self._vectors.remove(project_slug, doc_id)
+
+    # ------------------------
+    # Плотные векторы
+    # ------------------------
+
+    def _embed_into(self, vectors: VectorIndex, docs: List[StoredDocument]) -> None:
+        # Эмбеддим чанки всех документов одним вызовом; к чанку добавляем заголовок документа и секции
+        texts = [
+            f"{d.title}\n{c['heading']}\n{chunk}"
+            for d in docs
+            for c, chunk in zip(d.chunks, d.chunk_texts())
+        ]
+        embedded = self.embedder.embed(texts) if texts else np.zeros((0, self.embedder.dim), dtype=np.float32)
+
+        row = 0
+        for d in docs:
+            vectors.upsert(d.project_slug, d.doc_id, embedded[row:row + len(d.chunks)])
+            row += len(d.chunks)
+
+    def _load_vectors(self, index: InvertedIndex) -> Optional[VectorIndex]:
+        # Снапшот векторов годится, только если он сохранен вместе с тем же снапшотом индекса
+        if not index.source.get("size"):
+            return VectorIndex(self.embedder.name, self.embedder.dim)
+        vectors = VectorIndex.load(self.vectors_dir, self.embedder.name, self.embedder.dim)
+        if vectors is None or vectors.source != index.source:
+            return None
+        return vectors
+
+    def _get_vectors(self, index: InvertedIndex) -> VectorIndex:
+        if self._vectors is not None:
+            return self._vectors
+
+        vectors = VectorIndex(self.embedder.name, self.embedder.dim)
+        for project_slug, project_docs in self._get_docs(index).items():
+            docs = list(project_docs.values())
+            for start in range(0, len(docs), _EMBED_BATCH_SIZE):
+                self._embed_into(vectors, docs[start:start + _EMBED_BATCH_SIZE])
+        self._vectors = vectors
+        return vectors
+
+    # ------------------------
+    # Индекс поверх лога
+    # ------------------------
+
+    def _stat_key(self) -> Optional[Tuple[int, int, int]]:
+        try:
+            st = self.path.stat()
+        except FileNotFoundError:
+            return None
+        return st.st_ino, st.st_size, st.st_mtime_ns
+
+    def _probe(self, size: int) -> str:
+        start = max(0, size - _TAIL_PROBE_BYTES)
+        with self.path.open("rb") as f:
+            f.seek(start)
+            chunk = f.read(size - start)
+        return hashlib.blake2b(chunk, digest_size=8).hexdigest()
+
+    def _mark_covered(self, index: InvertedIndex, size: int) -> None:
+        st = self.path.stat()
+        index.source = {"size": size, "inode": st.st_ino, "tail": self._probe(size)}
+
+    def _source_matches(self, index: InvertedIndex) -> bool:
+        # Индекс валиден, если покрытая им часть лога — все еще префикс текущего файла
+        size = index.source.get("size", 0)
+        if not size:
+            return True
+        try:
+            st = self.path.stat()
+        except FileNotFoundError:
+            return False
+        if st.st_size < size or st.st_ino != index.source.get("inode"):
+            return False
+        return self._probe(size) == index.source.get("tail")
+
+    def _replay(self, index: InvertedIndex, end: Optional[int] = None) -> None:
+        # Догоняет индекс по записям, дописанным в лог после покрытой части
+        start = index.source.get("size", 0)
+        covered = start
+        for offset, length, record in self._iter_records(start, end):
+            covered = offset + length
+            if record is None:
+                continue
+            if record.get("op") == "delete":
+                index.remove_document(record["project_slug"], record["doc_id"])
+                self._cache_drop(record["project_slug"], record["doc_id"])
+            else:
+                d = self._from_raw(record)
+                index.add_document(d.project_slug, d.doc_id, d.chunk_texts(), offset, length, d.title)
+                self._cache_put([d])
+        if covered != start:
+            self._mark_covered(index, covered)
+
+    def _get_index(self) -> InvertedIndex:
+        # Индекс в памяти; при изменении файла догоняем хвост лога,
+        # а если файл переписали в обход стора — берем снапшот с диска или строим заново
+        key = self._stat_key()
+        if self._index is not None and key == self._seen_stat:
+            return self._index
+
+        index = self._index
+        if index is None or not self._source_matches(index):
+            index = InvertedIndex.load(self.index_path)
+            if index is None or not self._source_matches(index):
+                index = InvertedIndex()
+            self._index_saved_at = index.source.get("size", 0)
+
+        if index is not self._index:
+            # Новый индекс — кэш документов перечитаем лениво по его смещениям
+            self._docs = None
+            self._vectors = self._load_vectors(index)
+
+        self._replay(index)
+        self._index = index
+        self._seen_stat = key
+        self._maybe_save_index(index)
+        return index
+
+    def _maybe_save_index(self, index: InvertedIndex, force: bool = False) -> None:
+        # Снапшот индекса сохраняется при удвоении покрытого лога — суммарно O(размер лога)
+        covered = index.source.get("size", 0)
+        grown = covered - self._index_saved_at
+        if force or grown >= max(_INDEX_SAVE_MIN_BYTES, self._index_saved_at):
+            index.save(self.index_path)
+            if self._vectors is not None:
+                self._vectors.source = dict(index.source)
+                self._vectors.save(self.vectors_dir)
+            self._index_saved_at = covered
+
+    def _write(self, index: InvertedIndex, records: List[Dict[str, Any]]) -> List[Tuple[int, int]]:
+        covered = index.source.get("size", 0)
+        locations = self._append(records)
+        if locations[0][0] != covered:
+            # Кто-то дописал лог между нашим чтением и записью — сначала учитываем его записи
+            self._replay(index, end=locations[0][0])
+        return locations
+
+    def _after_write(self, index: InvertedIndex, end: int) -> None:
+        self._mark_covered(index, end)
+        self._seen_stat = self._stat_key()
+        self._maybe_save_index(index)
+        self._maybe_compact(index)
+
+    # ------------------------
+    # Компактизация
+    # ------------------------
+
+    @staticmethod
+    def _garbage_ratio(index: InvertedIndex) -> float:
+        size = index.source.get("size", 0)
+        if not size:
+            return 0.0
+        return 1.0 - index.live_bytes / size
+
+    @property
+    def garbage_ratio(self) -> float:
+        with self._lock:
+            return self._garbage_ratio(self._get_index())
+
+    def _maybe_compact(self, index: InvertedIndex) -> None:
+        if self._compaction_thread is not None and self._compaction_thread.is_alive():
+            return
+        if index.source.get("size", 0) < self.compaction_min_bytes:
+            return
+        if self._garbage_ratio(index) < self.compaction_ratio:
+            return
+
+        if self.background_compaction:
+            self._compaction_thread = threading.Thread(
+                target=self.compact,
+                name="vector-store-compaction",
+                daemon=True,
+            )
+            self._compaction_thread.start()
+        else:
+            self.compact(blocking=False)
+
+    def compact(self, blocking: bool = True) -> Dict[str, Any]:
+        # Переписывает лог, оставляя только актуальные записи: temp-файл + fsync + атомарный rename.
+        # Основная копия делается без блокировки — запись и поиск в это время не стоят.
+        if not self._compaction_lock.acquire(blocking=blocking):
+            return {"status": "skipped"}
+        try:
+            return self._compact()
+        finally:
+            self._compaction_lock.release()
+
+    def _compact(self) -> Dict[str, Any]:
+        with self._lock:
+            index = self._get_index()
+            snapshot_end = index.source.get("size", 0)
+            live = index.iter_locations()
+
+        if not snapshot_end:
+            return {"status": "ok", "bytes_before": 0, "bytes_after": 0}
+
+        tmp_path = self.path.with_name(self.path.name + ".compact")
+        moved: Dict[Tuple[str, str], Tuple[int, int]] = {}
+        with self.path.open("rb") as src, tmp_path.open("wb") as dst:
+            for offset, length, project_slug, doc_id in live:
+                src.seek(offset)
+                moved[(project_slug, doc_id)] = (dst.tell(), length)
+                dst.write(src.read(length))
+
+            # Дальше под блокировкой: дописанное за время копирования переносим как есть и подменяем файл
+            with self._lock:
+                if self._get_index() is not index:
+                    # Лог переписали в обход стора — снапшот устарел
+                    dst.close()
+                    tmp_path.unlink()
+                    return {"status": "skipped"}
+
+                tail_end = index.source.get("size", 0)
+                base = dst.tell()
+                src.seek(snapshot_end)
+                dst.write(src.read(tail_end - snapshot_end))
+                dst.flush()
+                os.fsync(dst.fileno())
+                bytes_after = dst.tell()
+                dst.close()
+                # На Windows открытый файл нельзя заменить — закрываем и исходный лог
+                src.close()
+
+                os.replace(tmp_path, self.path)
+
+                for offset, length, project_slug, doc_id in index.iter_locations():
+                    if offset >= snapshot_end:
+                        index.set_location(project_slug, doc_id, base + offset - snapshot_end, length)
+                    else:
+                        index.set_location(project_slug, doc_id, *moved[(project_slug, doc_id)])
+
+                self._mark_covered(index, bytes_after)
+                self._seen_stat = self._stat_key()
+                self._maybe_save_index(index, force=True)
+
+        return {"status": "ok", "bytes_before": tail_end, "bytes_after": bytes_after}
+
+    def flush(self) -> None:
+        # Принудительно сохраняет снапшот индекса (например, в конце массовой загрузки)
+        with self._lock:
+            self._maybe_save_index(self._get_index(), force=True)
+
+    # ------------------------
+    # Публичный API
+    # ------------------------
 
     def upsert_document(
         self,
@@ -75,132 +497,268 @@ class JsonlDocumentStore:
         text: str,
         metadata: Optional[Dict[str, Any]] = None,
     ) -> Dict[str, Any]:
-        docs = self._load_all()
-        metadata = metadata or {}
-
-        replaced = False
-        for i, d in enumerate(docs):
-            if d.project_slug == project_slug and d.doc_id == doc_id:
-                docs[i] = StoredDocument(
-                    project_slug=project_slug,
-                    doc_id=doc_id,
-                    title=title,
-                    text=text,
-                    metadata=metadata,
-                )
-                replaced = True
-                break
+        record = self._new_record(project_slug, doc_id, title, text, metadata)
+        d = self._from_raw(record)
 
-        if not replaced:
-            docs.append(
-                StoredDocument(
-                    project_slug=project_slug,
-                    doc_id=doc_id,
-                    title=title,
-                    text=text,
-                    metadata=metadata,
-                )
-            )
+        with self._lock:
+            index = self._get_index()
+            replaced = index.doc_location(project_slug, doc_id) is not None
 
-        self._save_all(docs)
+            [(offset, length)] = self._write(index, [record])
+            index.add_document(project_slug, doc_id, d.chunk_texts(), offset, length, title)
+            self._cache_put([d])
+            self._after_write(index, offset + length)
 
         return {
             "status": "ok",
             "replaced": replaced,
         }
 
+    def upsert_documents(
+        self,
+        project_slug: str,
+        documents: List[Dict[str, Any]],
+    ) -> Dict[str, Any]:
+        # Пакетная запись: все документы дописываются в лог одним write + fsync.
+        # documents: [{"doc_id", "title", "text", "metadata"}, ...]; при повторе doc_id побеждает последний
+        records = [
+            self._new_record(
+                project_slug,
+                doc["doc_id"],
+                doc.get("title", ""),
+                doc.get("text", ""),
+                doc.get("metadata"),
+            )
+            for doc in documents
+        ]
+        if not records:
+            return {"status": "ok", "inserted": 0, "replaced": 0, "results": []}
+        docs = [self._from_raw(r) for r in records]
+
+        results: List[Dict[str, Any]] = []
+        with self._lock:
+            index = self._get_index()
+            locations = self._write(index, records)
+            for d, (offset, length) in zip(docs, locations):
+                replaced = index.doc_location(project_slug, d.doc_id) is not None
+                index.add_document(project_slug, d.doc_id, d.chunk_texts(), offset, length, d.title)
+                results.append({"doc_id": d.doc_id, "replaced": replaced})
+            self._cache_put(docs)
+            self._after_write(index, locations[-1][0] + locations[-1][1])
+
+        replaced_count = sum(1 for r in results if r["replaced"])
+        return {
+            "status": "ok",
+            "inserted": len(results) - replaced_count,
+            "replaced": replaced_count,
+            "results": results,
+        }
+
+    def delete_document(self, project_slug: str, doc_id: str) -> Dict[str, Any]:
+        with self._lock:
+            index = self._get_index()
+            if index.doc_location(project_slug, doc_id) is None:
+                return {"status": "ok", "deleted": False}
+
+            [(offset, length)] = self._write(
+                index,
+                [{"op": "delete", "project_slug": project_slug, "doc_id": doc_id}],
+            )
+            index.remove_document(project_slug, doc_id)
+            self._cache_drop(project_slug, doc_id)
+            self._after_write(index, offset + length)
+
+        return {"status": "ok", "deleted": True}
+
+    def warm(self, project_slug: Optional[str] = None) -> int:
+        # Заранее поднимает индекс и кэш документов (чтобы первый поиск не платил за загрузку);
+        # возвращает число документов проекта (или всех, если проект не задан)
+        with self._lock:
+            docs = self._get_docs(self._get_index())
+            if project_slug is None:
+                return sum(len(project_docs) for project_docs in docs.values())
+            return len(docs.get(project_slug, {}))
+
     def search_documents(
         self,
         project_slug: str,
         query: str,
         limit: int = 5,
-        min_score: float = 5.0,
+        min_score: Optional[float] = None,
+        mode: str = "keyword",
+        nprobe: Optional[int] = None,
+        ranker: str = "bm25",
+    ) -> List[Dict[str, Any]]:
+        # mode="keyword" — поиск по инвертированному индексу (min_score — порог очков чанка);
+        # ranker="bm25" — BM25F по тексту чанка и заголовку, ranker="legacy" — прежние
+        # веса (фраза x10, токен x1, бонус за разнообразие) с подстрочным совпадением;
+        # mode="dense" — косинусная близость эмбеддингов (min_score не применяется,
+        # отбрасываются только чанки с неположительной близостью; nprobe — для IVF).
+        # Документ попадает в выдачу один раз — с лучшим чанком в snippet и "chunk"
+        with self._lock:
+            if mode == "keyword":
+                if ranker not in _DEFAULT_MIN_SCORE:
+                    raise ValueError(f"Unknown ranker: {ranker}. Expected 'bm25' or 'legacy'.")
+                if min_score is None:
+                    min_score = _DEFAULT_MIN_SCORE[ranker]
+                return self._search_keyword(project_slug, query, limit, min_score, ranker)
+            if mode == "dense":
+                return self._search_dense(project_slug, query, limit, nprobe or self.ann_nprobe)
+        raise ValueError(f"Unknown search mode: {mode}. Expected 'keyword' or 'dense'.")
+
+    @staticmethod
+    def _result(d: StoredDocument, chunk_index: int, score: float) -> Dict[str, Any]:
+        chunk = d.chunks[chunk_index]
+        return {
+            "doc_id": d.doc_id,
+            "title": d.title,
+            "snippet": d.text[chunk["start"]:chunk["end"]].strip(),
+            "metadata": d.metadata,
+            "chunk": {"index": chunk_index, **chunk},
+            "score": score,
+        }
+
+    def _search_dense(
+        self,
+        project_slug: str,
+        query: str,
+        limit: int,
+        nprobe: int,
     ) -> List[Dict[str, Any]]:
-        import re
+        index = self._get_index()
+        if not index.has_project(project_slug):
+            return []
+
+        query_vector = self.embedder.embed([query])[0]
+        if not query_vector.any():
+            return []
+
+        # Берем чанков с запасом: несколько лучших чанков могут оказаться из одного документа
+        hits = self._get_vectors(index).search(
+            project_slug,
+            query_vector,
+            max(limit, 0) * 4,
+            nprobe=nprobe,
+            ann_min_rows=self.ann_min_rows,
+        )
+
+        best: Dict[str, Tuple[int, float]] = {}
+        for key, score in hits:
+            if score <= 0 or len(best) >= limit:
+                break
+            doc_id, chunk_index = split_chunk_key(key)
+            best.setdefault(doc_id, (chunk_index, score))
 
-        all_docs = self._load_all()
-        docs = [d for d in all_docs if d.project_slug == project_slug]
-        if not docs:
+        project_docs = self._get_docs(index).get(project_slug, {})
+        return [
+            self._result(project_docs[doc_id], chunk_index, score)
+            for doc_id, (chunk_index, score) in best.items()
+        ]
+
+    def _search_keyword(
+        self,
+        project_slug: str,
+        query: str,
+        limit: int,
+        min_score: float,
+        ranker: str,
+    ) -> List[Dict[str, Any]]:
+        index = self._get_index()
+        if not index.has_project(project_slug):
             return []
 
         q = query.lower()
 
-        # Токенизация: разбиваем запрос на слова, фильтруем короткие стоп-слова
-        stop_words = {"как", "что", "где", "когда", "и", "в", "на", "с", "по", "для", "или", "а", "это", "эта", "этот"}
+        # Токенизация: разбиваем запрос на термы, фильтруем короткие стоп-слова
+        query_terms = tokenize(q)
         tokens = [
-            word for word in q.split()
-            if len(word) > 2 and word not in stop_words
+            word for word in query_terms
+            if len(word) > 2 and word not in _STOP_WORDS
         ]
 
         if not tokens:
-            # Если после фильтрации не осталось токенов, используем исходный запрос
-            tokens = [q]
+            # Если после фильтрации не осталось токенов, используем все термы запроса
+            tokens = query_terms
+        if not tokens:
+            return []
 
-        # Извлекаем технические термины (2-3 слова подряд из латиницы/цифр)
-        technical_phrases = re.findall(r'\b[a-z][a-z0-9_-]*(?:\s+[a-z][a-z0-9_-]*){0,2}\b', q)
-        technical_phrases = [p for p in technical_phrases if len(p) > 3]
+        # Подсчитываем релевантность чанков по постингам, не читая сами документы
+        if ranker == "bm25":
+            scores = index.bm25(project_slug, tokens)
+        else:
+            scores = self._legacy_scores(index, project_slug, q, tokens)
 
-        scored: List[Tuple[float, StoredDocument, str]] = []
+        return self._top_chunks(index, project_slug, scores, limit, min_score)
 
-        for d in docs:
-            text_lower = d.text.lower()
-
-            # Подсчитываем релевантность на основе токенов и фраз
-            score = 0.0
-            matched_tokens = []
-
-            # 1. Фразовый поиск (высокий вес)
-            for phrase in technical_phrases:
-                phrase_count = text_lower.count(phrase)
-                if phrase_count > 0:
-                    score += phrase_count * 10.0  # Фраза дает 10 баллов за вхождение
-                    matched_tokens.append(phrase)
-
-            # 2. Поиск по токенам (базовый вес)
-            token_matches = 0
-            for token in tokens:
-                count = text_lower.count(token)
-                if count > 0:
-                    score += count * 1.0  # Токен дает 1 балл за вхождение
-                    matched_tokens.append(token)
-                    token_matches += 1
-
-            # 3. Бонус за количество совпавших разных токенов
-            if token_matches >= 2:
-                score += token_matches * 2.0
-
-            # Применяем минимальный порог релевантности
-            if score >= min_score:
-                # Находим фрагмент с наибольшей концентрацией совпадений
-                best_idx = -1
-                if matched_tokens:
-                    for token in matched_tokens:
-                        idx = text_lower.find(token)
-                        if idx != -1:
-                            best_idx = idx
-                            break
-
-                if best_idx == -1:
-                    best_idx = 0
-
-                start = max(0, best_idx - 80)
-                end = min(len(d.text), best_idx + 80)
-                snippet = d.text[start:end].replace("\n", " ")
-
-                scored.append((score, d, snippet))
-
-        scored.sort(key=lambda x: x[0], reverse=True)
+    @staticmethod
+    def _legacy_scores(
+        index: InvertedIndex,
+        project_slug: str,
+        q: str,
+        tokens: List[str],
+    ) -> Dict[str, float]:
+        technical_phrases = [p for p in _TECHNICAL_PHRASE_RE.findall(q) if len(p) > 3]
+        scores: Dict[str, float] = {}
+
+        # 1. Фразовый поиск (высокий вес)
+        for phrase in technical_phrases:
+            for key, phrase_count in index.count_phrase(project_slug, tokenize(phrase)).items():
+                scores[key] = scores.get(key, 0.0) + phrase_count * 10.0
+
+        # 2. Поиск по токенам (базовый вес)
+        token_matches: Dict[str, int] = {}
+        for token in tokens:
+            for key, count in index.count_substring(project_slug, token).items():
+                scores[key] = scores.get(key, 0.0) + count * 1.0
+                token_matches[key] = token_matches.get(key, 0) + 1
+
+        # 3. Бонус за количество совпавших разных токенов
+        for key, matches in token_matches.items():
+            if matches >= 2:
+                scores[key] += matches * 2.0
+        return scores
+
+    def _top_chunks(
+        self,
+        index: InvertedIndex,
+        project_slug: str,
+        scores: Dict[str, float],
+        limit: int,
+        min_score: float,
+    ) -> List[Dict[str, Any]]:
+        # Документ представляет его лучший чанк; порог — по очкам чанка
+        best: Dict[str, Tuple[float, int]] = {}
+        for key, score in scores.items():
+            if score < min_score:
+                continue
+            doc_id, chunk_index = split_chunk_key(key)
+            current = best.get(doc_id)
+            if current is None or (score, -chunk_index) > (current[0], -current[1]):
+                best[doc_id] = (score, chunk_index)
+
+        # При равенстве очков — порядок в файле
+        scored: List[Tuple[float, int, str, int]] = []
+        for doc_id, (score, chunk_index) in best.items():
+            offset, _ = index.doc_location(project_slug, doc_id)  # type: ignore[misc]
+            scored.append((score, offset, doc_id, chunk_index))
+
+        scored.sort(key=lambda x: (-x[0], x[1]))
         top = scored[: max(limit, 0)]
 
-        results: List[Dict[str, Any]] = []
-        for score, d, snippet in top:
-            results.append(
-                {
-                    "doc_id": d.doc_id,
-                    "title": d.title,
-                    "snippet": snippet,
-                    "metadata": d.metadata,
-                }
-            )
+        project_docs = self._get_docs(index).get(project_slug, {})
+
+        return [
+            self._result(project_docs[doc_id], chunk_index, score)
+            for score, _, doc_id, chunk_index in top
+        ]
+
 
-        return results
\ No newline at end of file
+def create_store(backend: Optional[str] = None, path: Optional[Path] = None, **kwargs: Any):
+    # Хранилище по имени бэкенда: "jsonl" — JsonlDocumentStore, "sqlite" — SqliteFtsDocumentStore.
+    # Без аргумента бэкенд берется из DOCOPS_VECTOR_BACKEND (по умолчанию jsonl)
+    backend = (backend or os.getenv("DOCOPS_VECTOR_BACKEND") or "jsonl").lower()
+    if backend == "jsonl":
+        return JsonlDocumentStore(path=path, **kwargs)
+    if backend == "sqlite":
+        return SqliteFtsDocumentStore(path=path, **kwargs)
+    raise ValueError(f"Unknown vector store backend: {backend}. Expected 'jsonl' or 'sqlite'.")
\ No newline at end of file
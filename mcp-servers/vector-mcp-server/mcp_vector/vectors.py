@@ -0,0 +1,243 @@
+# mcp-servers/vector-mcp-server/mcp_vector/vectors.py
+
+# Плотные векторы чанков документов: непрерывная float32-матрица на каждый project_slug
+# (+ опциональный IVF-индекс для больших проектов)
+
+from __future__ import annotations
+
+import json
+import os
+import re
+from pathlib import Path
+from typing import Dict, Any, List, Optional, Tuple
+
+import numpy as np
+
+from .ann import IVFIndex
+from .index import chunk_key, split_chunk_key
+
+
+def vectors_dir_for(store_path: Path) -> Path:
+    # <dir>/documents.jsonl -> <dir>/documents.vectors/
+    return store_path.with_name(f"{store_path.stem}.vectors")
+
+
+def _safe_name(project_slug: str) -> str:
+    return re.sub(r"[^\w.-]", "_", project_slug)
+
+
+class VectorMatrix:
+    # Строки матрицы — L2-нормированные векторы, поэтому косинус = скалярное произведение.
+    # Строка — один чанк, ключ "doc_id#i". Освободившиеся строки переиспользуются при следующей вставке.
+
+    def __init__(self, dim: int) -> None:
+        self.dim = dim
+        self.ids: List[Optional[str]] = []
+        self.rows: Dict[str, int] = {}
+        # doc_id -> число чанков документа в матрице
+        self.doc_chunks: Dict[str, int] = {}
+        self.free: List[int] = []
+        self._matrix: np.ndarray = np.zeros((0, dim), dtype=np.float32)
+        self._alive: np.ndarray = np.zeros(0, dtype=bool)
+        # IVF строится лениво при первом поиске в большом проекте и дальше обновляется инкрементально
+        self.ann: Optional[IVFIndex] = None
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    def _ensure_writable(self, rows_needed: int) -> None:
+        # Матрица после загрузки — read-only memmap; при первой записи копируем ее в память
+        # и растим емкость удвоением, чтобы вставка была амортизированно O(dim)
+        capacity = self._matrix.shape[0]
+        writable = isinstance(self._matrix, np.ndarray) and not isinstance(self._matrix, np.memmap)
+        if writable and capacity >= rows_needed:
+            return
+
+        new_capacity = max(rows_needed, capacity * 2, 16)
+        n = min(capacity, len(self.ids))
+        matrix = np.zeros((new_capacity, self.dim), dtype=np.float32)
+        matrix[:n] = self._matrix[:n]
+        alive = np.zeros(new_capacity, dtype=bool)
+        alive[:n] = self._alive[:n]
+        self._matrix = matrix
+        self._alive = alive
+
+    def upsert(self, key: str, vector: np.ndarray) -> None:
+        row = self.rows.get(key)
+        if row is None:
+            if self.free:
+                row = self.free.pop()
+            else:
+                row = len(self.ids)
+                self.ids.append(None)
+            self._ensure_writable(len(self.ids))
+            self.ids[row] = key
+            self.rows[key] = row
+            doc_id, chunk_index = split_chunk_key(key)
+            self.doc_chunks[doc_id] = max(self.doc_chunks.get(doc_id, 0), chunk_index + 1)
+        else:
+            self._ensure_writable(len(self.ids))
+
+        self._matrix[row] = vector
+        self._alive[row] = True
+        if self.ann is not None:
+            self.ann.add(row, vector)
+
+    def remove(self, key: str) -> bool:
+        row = self.rows.pop(key, None)
+        if row is None:
+            return False
+        self._ensure_writable(len(self.ids))
+        self.ids[row] = None
+        self._alive[row] = False
+        self._matrix[row] = 0.0
+        self.free.append(row)
+        if self.ann is not None:
+            self.ann.remove(row)
+        return True
+
+    def remove_doc(self, doc_id: str) -> None:
+        for i in range(self.doc_chunks.pop(doc_id, 0)):
+            self.remove(chunk_key(doc_id, i))
+
+    def search(
+        self,
+        query: np.ndarray,
+        k: int,
+        nprobe: int = 8,
+        ann_min_rows: int = 10_000,
+    ) -> List[Tuple[str, float]]:
+        # Маленькие проекты ищутся точно; начиная с ann_min_rows — через IVF (nprobe — баланс recall/скорость)
+        n = len(self.ids)
+        if not self.rows or k <= 0:
+            return []
+
+        if len(self.rows) >= ann_min_rows:
+            # Переобучаем центроиды, когда проект вырос в 4 раза с момента обучения
+            if self.ann is None or len(self.rows) > 4 * self.ann.trained_rows:
+                self.ann = IVFIndex.train(self._matrix[:n], self._alive[:n])
+            rows, scores = self.ann.search(self._matrix, query, k, nprobe)
+            return [(self.ids[i], float(score)) for i, score in zip(rows, scores)]  # type: ignore[misc]
+
+        scores = self._matrix[:n] @ query
+        if self.free:
+            scores[~self._alive[:n]] = -np.inf
+
+        k = min(k, len(self.rows))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [(self.ids[i], float(scores[i])) for i in top]  # type: ignore[misc]
+
+    # ------------------------
+    # Персистентность
+    # ------------------------
+
+    def save(self, directory: Path, project_slug: str) -> None:
+        name = _safe_name(project_slug)
+        n = len(self.ids)
+
+        tmp_npy = directory / f"{name}.npy.tmp"
+        with tmp_npy.open("wb") as f:
+            np.save(f, np.ascontiguousarray(self._matrix[:n]))
+        os.replace(tmp_npy, directory / f"{name}.npy")
+
+        tmp_ids = directory / f"{name}.ids.json.tmp"
+        tmp_ids.write_text(json.dumps(self.ids, ensure_ascii=False), encoding="utf-8")
+        os.replace(tmp_ids, directory / f"{name}.ids.json")
+
+        if self.ann is not None:
+            self.ann.save(directory, name, n)
+
+    @classmethod
+    def load(cls, directory: Path, project_slug: str, dim: int) -> "VectorMatrix":
+        name = _safe_name(project_slug)
+        vm = cls(dim)
+        vm._matrix = np.load(directory / f"{name}.npy", mmap_mode="r")
+        vm.ids = json.loads((directory / f"{name}.ids.json").read_text(encoding="utf-8"))
+        vm._alive = np.array([key is not None for key in vm.ids], dtype=bool)
+        for row, key in enumerate(vm.ids):
+            if key is None:
+                vm.free.append(row)
+            else:
+                vm.rows[key] = row
+                doc_id, chunk_index = split_chunk_key(key)
+                vm.doc_chunks[doc_id] = max(vm.doc_chunks.get(doc_id, 0), chunk_index + 1)
+        vm.ann = IVFIndex.load(directory, name)
+        return vm
+
+
+class VectorIndex:
+    # Набор матриц по проектам + сведения о том, какую часть лога и каким эмбеддером они покрывают
+
+    # Версия формата снапшота (2 — строки по чанкам, а не по документам)
+    VERSION = 2
+
+    def __init__(self, embedder_name: str, dim: int) -> None:
+        self.embedder_name = embedder_name
+        self.dim = dim
+        self.source: Dict[str, Any] = {}
+        self.projects: Dict[str, VectorMatrix] = {}
+
+    def upsert(self, project_slug: str, doc_id: str, vectors: np.ndarray) -> None:
+        # vectors — по строке на чанк; чанки прошлой версии документа удаляются
+        matrix = self.projects.get(project_slug)
+        if matrix is None:
+            matrix = self.projects[project_slug] = VectorMatrix(self.dim)
+        matrix.remove_doc(doc_id)
+        for i, vector in enumerate(vectors):
+            matrix.upsert(chunk_key(doc_id, i), vector)
+
+    def remove(self, project_slug: str, doc_id: str) -> None:
+        matrix = self.projects.get(project_slug)
+        if matrix is not None:
+            matrix.remove_doc(doc_id)
+
+    def search(
+        self,
+        project_slug: str,
+        query: np.ndarray,
+        k: int,
+        nprobe: int = 8,
+        ann_min_rows: int = 10_000,
+    ) -> List[Tuple[str, float]]:
+        # [(chunk_key, score), ...] по убыванию близости
+        matrix = self.projects.get(project_slug)
+        if matrix is None:
+            return []
+        return matrix.search(query, k, nprobe=nprobe, ann_min_rows=ann_min_rows)
+
+    def save(self, directory: Path) -> None:
+        directory.mkdir(parents=True, exist_ok=True)
+        for project_slug, matrix in self.projects.items():
+            matrix.save(directory, project_slug)
+
+        manifest = {
+            "version": self.VERSION,
+            "embedder": self.embedder_name,
+            "dim": self.dim,
+            "source": self.source,
+            "projects": list(self.projects),
+        }
+        tmp = directory / "manifest.json.tmp"
+        tmp.write_text(json.dumps(manifest, ensure_ascii=False), encoding="utf-8")
+        os.replace(tmp, directory / "manifest.json")
+
+    @classmethod
+    def load(cls, directory: Path, embedder_name: str, dim: int) -> Optional["VectorIndex"]:
+        manifest_path = directory / "manifest.json"
+        if not manifest_path.exists():
+            return None
+        try:
+            manifest = json.loads(manifest_path.read_text(encoding="utf-8"))
+            if manifest.get("version") != cls.VERSION:
+                return None
+            if manifest.get("embedder") != embedder_name or manifest.get("dim") != dim:
+                return None
+
+            vi = cls(embedder_name, dim)
+            vi.source = manifest.get("source", {})
+            for project_slug in manifest.get("projects", []):
+                vi.projects[project_slug] = VectorMatrix.load(directory, project_slug, dim)
+        except (OSError, ValueError):
+            return None
+        return vi
@@ -1,9 +1,16 @@
 # mcp-servers/vector-mcp-server/mcp_vector/tests/test_server.py
 
 import os
+import sqlite3
 from pathlib import Path
 
-from mcp_vector.store import JsonlDocumentStore
+import numpy as np
+
+from mcp_vector.ann import recall_at_k
+from mcp_vector.chunking import chunk_text
+from mcp_vector.embeddings import HashingEmbedder
+from mcp_vector.fts import SqliteFtsDocumentStore
+from mcp_vector.store import JsonlDocumentStore, create_store
 
 
 def test_upsert_and_search_documents(tmp_path):
@@ -69,4 +76,446 @@ def test_search_documents_empty_when_no_match(tmp_path):
         query="несуществующее-слово",
         limit=5,
     )
-    assert results == []
\ No newline at end of file
+    assert results == []
+
+
+def test_bm25_matches_inflected_russian_query(tmp_path):
+    store = JsonlDocumentStore(path=tmp_path / "documents.jsonl")
+    store.upsert_document(
+        project_slug="docops-saas",
+        doc_id="docs/billing.md",
+        title="Billing",
+        text="Сервис биллинга отвечает за учет подписок.",
+        metadata={},
+    )
+    store.upsert_document(
+        project_slug="docops-saas",
+        doc_id="docs/auth.md",
+        title="Auth",
+        text="Сервис аутентификации выдает токены.",
+        metadata={},
+    )
+
+    for query in ("биллинг", "подписка", "учета"):
+        hits = store.search_documents(project_slug="docops-saas", query=query)
+        assert [h["doc_id"] for h in hits] == ["docs/billing.md"], query
+    # Короткие термы совпадают только точно
+    assert store.search_documents(project_slug="docops-saas", query="уч") == []
+
+
+def test_search_uses_persistent_index(tmp_path):
+    store_path = tmp_path / "documents.jsonl"
+    store = JsonlDocumentStore(path=store_path)
+
+    store.upsert_document(
+        project_slug="docops-saas",
+        doc_id="docs/api.md",
+        title="API",
+        text="Rate limiting в API Gateway: rate limiting отдает 429.",
+        metadata={"kind": "doc"},
+    )
+    store.upsert_document(
+        project_slug="docops-saas",
+        doc_id="docs/billing.md",
+        title="Billing",
+        text="Сервис биллинга.",
+        metadata={},
+    )
+    store.flush()
+    assert store.index_path.exists()
+
+    # Новый экземпляр поднимает индекс с диска и ищет по фразе
+    reopened = JsonlDocumentStore(path=store_path)
+    results = reopened.search_documents(project_slug="docops-saas", query="rate limiting")
+    assert [r["doc_id"] for r in results] == ["docs/api.md"]
+    assert "Rate limiting" in results[0]["snippet"]
+
+    # Документы другого проекта не попадают в выдачу
+    assert reopened.search_documents(project_slug="airport-food", query="rate limiting") == []
+
+
+def test_index_rebuilt_when_file_changed_externally(tmp_path):
+    store_path = tmp_path / "documents.jsonl"
+    store = JsonlDocumentStore(path=store_path)
+    store.upsert_document(
+        project_slug="docops-saas",
+        doc_id="docs/old.md",
+        title="Old",
+        text="kafka kafka kafka kafka kafka",
+        metadata={},
+    )
+
+    store_path.write_text(
+        '{"project_slug": "docops-saas", "doc_id": "docs/new.md", "title": "New", '
+        '"text": "rabbitmq rabbitmq rabbitmq rabbitmq rabbitmq", "metadata": {}}\n',
+        encoding="utf-8",
+    )
+
+    assert store.search_documents(project_slug="docops-saas", query="kafka") == []
+    hits = store.search_documents(project_slug="docops-saas", query="rabbitmq")
+    assert [h["doc_id"] for h in hits] == ["docs/new.md"]
+
+
+def test_append_only_log_and_compaction(tmp_path):
+    store_path = tmp_path / "documents.jsonl"
+    store = JsonlDocumentStore(path=store_path, background_compaction=False)
+
+    for version in range(5):
+        store.upsert_document(
+            project_slug="docops-saas",
+            doc_id="docs/ci.md",
+            title=f"CI v{version}",
+            text=f"pipeline pipeline pipeline pipeline pipeline v{version}",
+            metadata={"version": version},
+        )
+    store.upsert_document(
+        project_slug="docops-saas",
+        doc_id="docs/tmp.md",
+        title="Tmp",
+        text="pipeline pipeline pipeline pipeline pipeline",
+        metadata={},
+    )
+    assert store.delete_document(project_slug="docops-saas", doc_id="docs/tmp.md")["deleted"] is True
+
+    # Все версии дописаны в конец файла, актуальна последняя
+    assert len(store_path.read_text(encoding="utf-8").splitlines()) == 7
+    assert store.garbage_ratio > 0.5
+
+    res = store.compact()
+    assert res["bytes_after"] < res["bytes_before"]
+    assert len(store_path.read_text(encoding="utf-8").splitlines()) == 1
+    assert store.garbage_ratio == 0.0
+
+    for s in (store, JsonlDocumentStore(path=store_path)):
+        hits = s.search_documents(project_slug="docops-saas", query="pipeline")
+        assert [h["doc_id"] for h in hits] == ["docs/ci.md"]
+        assert hits[0]["metadata"]["version"] == 4
+
+
+def test_compaction_triggered_by_garbage_ratio(tmp_path):
+    store_path = tmp_path / "documents.jsonl"
+    store = JsonlDocumentStore(
+        path=store_path,
+        compaction_ratio=0.5,
+        compaction_min_bytes=0,
+        background_compaction=False,
+    )
+
+    for version in range(10):
+        store.upsert_document(
+            project_slug="airport-food",
+            doc_id="docs/process_overview.md",
+            title="Process",
+            text=f"lounge lounge lounge lounge lounge {version}",
+            metadata={},
+        )
+
+    assert store.garbage_ratio < 0.5
+    assert len(store_path.read_text(encoding="utf-8").splitlines()) < 10
+
+
+def test_upsert_documents_batch(tmp_path):
+    store_path = tmp_path / "documents.jsonl"
+    store = JsonlDocumentStore(path=store_path)
+    store.upsert_document(
+        project_slug="docops-saas",
+        doc_id="docs/a.md",
+        title="A",
+        text="old",
+        metadata={},
+    )
+
+    res = store.upsert_documents(
+        project_slug="docops-saas",
+        documents=[
+            {"doc_id": "docs/a.md", "title": "A", "text": "kafka kafka kafka kafka kafka"},
+            {"doc_id": "docs/b.md", "title": "B", "text": "postgres", "metadata": {"kind": "doc"}},
+            {"doc_id": "docs/b.md", "title": "B", "text": "postgres postgres postgres postgres postgres"},
+        ],
+    )
+    assert res["status"] == "ok"
+    assert [r["replaced"] for r in res["results"]] == [True, False, True]
+    assert (res["inserted"], res["replaced"]) == (1, 2)
+
+    hits = store.search_documents(project_slug="docops-saas", query="postgres")
+    assert [h["doc_id"] for h in hits] == ["docs/b.md"]
+    assert store.search_documents(project_slug="docops-saas", query="kafka")[0]["doc_id"] == "docs/a.md"
+
+
+def test_search_served_from_memory_and_tails_appends(tmp_path, monkeypatch):
+    store_path = tmp_path / "documents.jsonl"
+    store = JsonlDocumentStore(path=store_path)
+    store.upsert_document(
+        project_slug="docops-saas",
+        doc_id="docs/a.md",
+        title="A",
+        text="grafana grafana grafana grafana grafana",
+        metadata={},
+    )
+    assert store.search_documents(project_slug="docops-saas", query="grafana")
+
+    # Пока файл не менялся, поиск не открывает его
+    real_open = Path.open
+
+    def _no_open(self, *args, **kwargs):
+        if self == store_path:
+            raise AssertionError("store file must not be read in steady state")
+        return real_open(self, *args, **kwargs)
+
+    monkeypatch.setattr(Path, "open", _no_open)
+    hits = store.search_documents(project_slug="docops-saas", query="grafana")
+    assert hits[0]["doc_id"] == "docs/a.md"
+    monkeypatch.setattr(Path, "open", real_open)
+
+    # Запись другим экземпляром (как из другого процесса) подхватывается догоном хвоста
+    JsonlDocumentStore(path=store_path).upsert_document(
+        project_slug="docops-saas",
+        doc_id="docs/b.md",
+        title="B",
+        text="loki loki loki loki loki",
+        metadata={},
+    )
+    hits = store.search_documents(project_slug="docops-saas", query="loki")
+    assert [h["doc_id"] for h in hits] == ["docs/b.md"]
+
+
+def test_hashing_embedder_is_deterministic_and_normalized():
+    embedder = HashingEmbedder(dim=64)
+    a = embedder.embed(["Сервис биллинга выставляет счета"])
+    b = embedder.embed(["Сервис биллинга выставляет счета"])
+    assert a.dtype == np.float32 and a.shape == (1, 64)
+    assert np.array_equal(a, b)
+    assert abs(float(np.linalg.norm(a[0])) - 1.0) < 1e-5
+
+
+def test_dense_search_with_persisted_vectors(tmp_path):
+    store_path = tmp_path / "documents.jsonl"
+    store = JsonlDocumentStore(path=store_path)
+    store.upsert_documents(
+        project_slug="docops-saas",
+        documents=[
+            {"doc_id": "docs/billing.md", "title": "Биллинг", "text": "Сервис биллинга выставляет счета и ведет подписки."},
+            {"doc_id": "docs/auth.md", "title": "Аутентификация", "text": "Токены доступа и SSO для корпоративных клиентов."},
+        ],
+    )
+
+    # Словоформа запроса отличается от текста — помогают символьные триграммы
+    hits = store.search_documents(project_slug="docops-saas", query="биллинг подписка", limit=1, mode="dense")
+    assert [h["doc_id"] for h in hits] == ["docs/billing.md"]
+
+    store.flush()
+    assert (store.vectors_dir / "docops-saas.npy").exists()
+
+    # После перезапуска матрица открывается через memmap и учитывает удаления
+    reopened = JsonlDocumentStore(path=store_path)
+    reopened.delete_document(project_slug="docops-saas", doc_id="docs/billing.md")
+    hits = reopened.search_documents(project_slug="docops-saas", query="биллинг подписка", mode="dense")
+    assert "docs/billing.md" not in [h["doc_id"] for h in hits]
+
+
+def test_ivf_recall_against_exact_search():
+    rng = np.random.default_rng(42)
+    centers = rng.normal(size=(20, 32))
+    data = centers[rng.integers(0, 20, size=4000)] + 0.3 * rng.normal(size=(4000, 32))
+    data = (data / np.linalg.norm(data, axis=1, keepdims=True)).astype(np.float32)
+    queries = data[rng.choice(4000, 50, replace=False)]
+
+    report = recall_at_k(data, queries, k=10, nprobes=(1, 8))
+    assert report[8]["recall"] >= 0.9
+    assert report[8]["recall"] >= report[1]["recall"]
+
+
+def test_dense_search_switches_to_ivf_and_persists_it(tmp_path):
+    store_path = tmp_path / "documents.jsonl"
+    store = JsonlDocumentStore(path=store_path, ann_min_rows=10, ann_nprobe=64)
+    store.upsert_documents(
+        project_slug="docops-saas",
+        documents=[
+            {"doc_id": f"docs/service_{i}.md", "title": f"service {i}", "text": f"component{i} handles queue{i}"}
+            for i in range(40)
+        ],
+    )
+
+    hits = store.search_documents(project_slug="docops-saas", query="component7 queue7", limit=3, mode="dense")
+    assert hits[0]["doc_id"] == "docs/service_7.md"
+    assert store._vectors.projects["docops-saas"].ann is not None
+
+    # Новые документы назначаются в кластеры сразу при записи
+    store.upsert_document(
+        project_slug="docops-saas",
+        doc_id="docs/late.md",
+        title="late",
+        text="latecomer latecomer",
+        metadata={},
+    )
+    hits = store.search_documents(project_slug="docops-saas", query="latecomer", limit=1, mode="dense")
+    assert hits[0]["doc_id"] == "docs/late.md"
+
+    store.flush()
+    reopened = JsonlDocumentStore(path=store_path, ann_min_rows=10, ann_nprobe=64)
+    hits = reopened.search_documents(project_slug="docops-saas", query="latecomer", limit=1, mode="dense")
+    assert hits[0]["doc_id"] == "docs/late.md"
+    assert reopened._vectors.projects["docops-saas"].ann is not None
+
+
+def test_chunk_text_splits_by_headings_with_overlap():
+    text = (
+        "# Биллинг\n\n"
+        "## Описание\n\n" + "Сервис выставляет счета клиентам. " * 20 + "\n\n"
+        "## Ретраи\n\n```\n# не заголовок\n```\nВебхуки повторяются.\n"
+    )
+    chunks = chunk_text(text, max_chars=300, overlap=50)
+
+    assert [c.index for c in chunks] == list(range(len(chunks)))
+    assert all(c.end - c.start <= 300 for c in chunks)
+    # Заголовок без текста приклеивается к следующей секции
+    assert chunks[0].start == 0
+    assert chunks[0].heading == "Биллинг / Описание"
+    assert chunks[-1].heading == "Биллинг / Ретраи"
+    assert "# не заголовок" in text[chunks[-1].start:chunks[-1].end]
+    # Соседние окна одной секции перекрываются
+    assert chunks[1].start < chunks[0].end
+
+
+def test_search_returns_best_chunk(tmp_path):
+    store_path = tmp_path / "documents.jsonl"
+    store = JsonlDocumentStore(path=store_path, chunk_size=300, chunk_overlap=50)
+    text = (
+        "# Биллинг\n\n## Описание\n\n" + "Сервис выставляет счета клиентам. " * 20 + "\n\n"
+        "## Ретраи\n\nstripe webhook повторяется с экспоненциальной задержкой.\n"
+    )
+    store.upsert_document(project_slug="docops-saas", doc_id="docs/billing.md", title="Billing", text=text, metadata={})
+
+    for mode in ("keyword", "dense"):
+        hits = store.search_documents(project_slug="docops-saas", query="stripe webhook", mode=mode)
+        assert len(hits) == 1
+        assert hits[0]["chunk"]["heading"] == "Биллинг / Ретраи"
+        assert hits[0]["snippet"].startswith("## Ретраи")
+
+    # При обновлении документа старые чанки не остаются ни в индексе, ни в векторах
+    store.upsert_document(project_slug="docops-saas", doc_id="docs/billing.md", title="Billing", text="Коротко.", metadata={})
+    assert store.search_documents(project_slug="docops-saas", query="stripe webhook") == []
+    assert list(store._vectors.projects["docops-saas"].rows) == ["docs/billing.md#0"]
+
+
+def test_bm25_normalises_length_and_boosts_title(tmp_path):
+    store_path = tmp_path / "documents.jsonl"
+    store = JsonlDocumentStore(path=store_path)
+    filler = " ".join(f"слово{i}" for i in range(300))
+    store.upsert_documents(
+        project_slug="docops-saas",
+        documents=[
+            # Длинный документ с большим числом вхождений — legacy ставит его первым
+            {"doc_id": "docs/long.md", "title": "Разное", "text": f"invoice invoice invoice {filler}"},
+            {"doc_id": "docs/short.md", "title": "Invoice", "text": "invoice генерируется раз в месяц"},
+            {"doc_id": "docs/other.md", "title": "Другое", "text": "про подписки"},
+        ],
+    )
+
+    bm25 = store.search_documents(project_slug="docops-saas", query="invoice")
+    assert [h["doc_id"] for h in bm25] == ["docs/short.md", "docs/long.md"]
+    assert bm25[0]["score"] > bm25[1]["score"] > 0
+
+    legacy = store.search_documents(project_slug="docops-saas", query="invoice", ranker="legacy", min_score=1.0)
+    assert legacy[0]["doc_id"] == "docs/long.md"
+
+    # Статистика для BM25 поддерживается при удалении и переживает перезапуск
+    store.delete_document(project_slug="docops-saas", doc_id="docs/long.md")
+    store.flush()
+    stats = JsonlDocumentStore(path=store_path)._get_index().projects["docops-saas"]["stats"]
+    assert stats["chunks"] == 2
+    assert stats["title_length"] == 2
+
+
+def test_sqlite_fts_store_upsert_search_and_delete(tmp_path):
+    store = SqliteFtsDocumentStore(path=tmp_path / "docs.db")
+
+    res = store.upsert_documents(
+        project_slug="docops-saas",
+        documents=[
+            {"doc_id": "docs/billing.md", "title": "Billing", "text": "Сервис биллинга выставляет счета.", "metadata": {"kind": "doc"}},
+            {"doc_id": "docs/api.md", "title": "API", "text": "Rate limiting в API Gateway: rate limiting отдает 429."},
+        ],
+    )
+    assert (res["inserted"], res["replaced"]) == (2, 0)
+    assert store.upsert_document(
+        project_slug="docops-saas",
+        doc_id="docs/billing.md",
+        title="Billing v2",
+        text="Обновленный текст: сервис биллинга и расчет подписок.",
+        metadata={"version": 2},
+    )["replaced"] is True
+
+    hits = store.search_documents(project_slug="docops-saas", query="расчет подписок")
+    assert [h["doc_id"] for h in hits] == ["docs/billing.md"]
+    assert "подписок" in hits[0]["snippet"]
+    assert hits[0]["metadata"] == {"version": 2}
+    assert hits[0]["score"] > 0 and hits[0]["chunk"]["index"] == 0
+
+    # Старая версия документа из индекса ушла, другой проект не виден
+    assert store.search_documents(project_slug="docops-saas", query="счета") == []
+    assert store.search_documents(project_slug="airport-food", query="rate limiting") == []
+    assert store.warm("docops-saas") == 2
+
+    assert store.delete_document("docops-saas", "docs/api.md")["deleted"] is True
+    assert store.search_documents(project_slug="docops-saas", query="gateway") == []
+    store.close()
+
+    # Новый экземпляр видит те же данные
+    reopened = create_store("sqlite", tmp_path / "docs.db")
+    assert [h["doc_id"] for h in reopened.search_documents(project_slug="docops-saas", query="биллинга")] == ["docs/billing.md"]
+    reopened.close()
+
+
+def test_sqlite_fts_trigram_tokenizer_matches_identifier_parts(tmp_path):
+    store = SqliteFtsDocumentStore(path=tmp_path / "docs.db", tokenizer="trigram")
+    store.upsert_document(
+        project_slug="docops-saas",
+        doc_id="services/billing/main.py",
+        title="main.py",
+        text="def create_invoice(subscription_id): return InvoiceService().create(subscription_id)",
+    )
+
+    hits = store.search_documents(project_slug="docops-saas", query="invoice")
+    assert [h["doc_id"] for h in hits] == ["services/billing/main.py"]
+    store.close()
+
+    # Токенайзер берется из существующей схемы, даже если запрошен другой
+    assert SqliteFtsDocumentStore(path=tmp_path / "docs.db").tokenizer == "trigram"
+
+
+def test_sqlite_fts_limits_search_to_project_and_rebuilds_old_schema(tmp_path):
+    path = tmp_path / "docs.db"
+    # Индекс старой схемы: чанки ссылались на документ через колонку document_id
+    conn = sqlite3.connect(path)
+    conn.executescript(
+        """
+        CREATE TABLE fts_documents (
+            id INTEGER PRIMARY KEY AUTOINCREMENT, project_slug TEXT NOT NULL, doc_id TEXT NOT NULL,
+            title TEXT NOT NULL, text TEXT NOT NULL, metadata TEXT NOT NULL, chunks TEXT NOT NULL,
+            UNIQUE (project_slug, doc_id)
+        );
+        CREATE VIRTUAL TABLE fts_chunks USING fts5(title, body, document_id UNINDEXED, chunk_index UNINDEXED);
+        INSERT INTO fts_documents (project_slug, doc_id, title, text, metadata, chunks)
+        VALUES ('docops', 'docs/old.md', 'Old', 'Лимиты запросов к API', '{}', '[{"start": 0, "end": 21, "heading": null}]');
+        INSERT INTO fts_chunks (title, body, document_id, chunk_index) VALUES ('Old', 'Лимиты запросов к API', 1, 0);
+        """
+    )
+    conn.close()
+
+    store = SqliteFtsDocumentStore(path=path)
+    assert [h["doc_id"] for h in store.search_documents(project_slug="docops", query="лимиты")] == ["docs/old.md"]
+
+    # Проекты со slug-префиксом друг друга не пересекаются
+    store.upsert_documents(
+        project_slug="docops-saas",
+        documents=[{"doc_id": f"docs/{i}.md", "title": f"Doc {i}", "text": "лимиты " * (i + 1)} for i in range(5)],
+    )
+    assert [h["doc_id"] for h in store.search_documents(project_slug="docops", query="лимиты")] == ["docs/old.md"]
+    hits = store.search_documents(project_slug="docops-saas", query="лимиты", limit=2)
+    assert [h["doc_id"] for h in hits] == ["docs/4.md", "docs/3.md"]
+    assert all("лимиты" in h["snippet"] for h in hits)
+
+    assert store.delete_document("docops-saas", "docs/4.md")["deleted"] is True
+    assert [h["doc_id"] for h in store.search_documents(project_slug="docops-saas", query="лимиты", limit=1)] == ["docs/3.md"]
+    store.close()
\ No newline at end of file
@@ -0,0 +1,43 @@
+# scripts/bench_vector_ann.py
+
+# Бенчмарк IVF-индекса векторного стора: recall@k и задержка против точного поиска
+
+from __future__ import annotations
+
+import argparse
+
+import numpy as np
+
+from mcp_vector.ann import recall_at_k
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Recall@k IVF против точного поиска на синтетических данных")
+    parser.add_argument("--rows", type=int, default=100_000, help="Количество векторов")
+    parser.add_argument("--dim", type=int, default=256, help="Размерность")
+    parser.add_argument("--clusters", type=int, default=200, help="Число кластеров в синтетике")
+    parser.add_argument("--queries", type=int, default=200, help="Количество запросов")
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--nlist", type=int, default=None, help="Число центроидов IVF (по умолчанию sqrt(rows))")
+    args = parser.parse_args(argv)
+
+    rng = np.random.default_rng(0)
+    centers = rng.normal(size=(args.clusters, args.dim))
+    data = centers[rng.integers(0, args.clusters, size=args.rows)]
+    data += 0.5 * rng.normal(size=data.shape)
+    data = (data / np.linalg.norm(data, axis=1, keepdims=True)).astype(np.float32)
+    queries = data[rng.choice(args.rows, args.queries, replace=False)]
+
+    report = recall_at_k(data, queries, k=args.k, nlist=args.nlist)
+
+    print(f"rows={args.rows} dim={args.dim} k={args.k}")
+    for nprobe, stats in report.items():
+        print(
+            f"nprobe={nprobe:>3}  recall@{args.k}={stats['recall']:.3f}  "
+            f"ivf={stats['ms_per_query']:.2f} ms  exact={stats['exact_ms_per_query']:.2f} ms"
+        )
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,137 @@
+# scripts/fake_openai_server.py
+
+# Локальный OpenAI-совместимый сервер для нагрузочных проверок LLM-клиента без настоящего API:
+# POST /v1/chat/completions (обычный и stream=True) с искусственной задержкой и счетчиками;
+# первые запросы можно сделать ошибочными (429 + Retry-After) или медленными — для проверки повторов и хеджа.
+# Запуск: python -m scripts.fake_openai_server --port 8799, затем OPENAI_BASE_URL=http://127.0.0.1:8799/v1
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import time
+import uuid
+from typing import Any, Dict
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+
+def create_app(
+    latency: float = 0.2,
+    chunk_delay: float = 0.01,
+    failures: int = 0,
+    retry_after: float = 0.05,
+    slow_calls: int = 0,
+    slow_latency: float = 5.0,
+) -> FastAPI:
+    app = FastAPI(title="Fake OpenAI")
+    # calls — всего запросов, in_flight/max_in_flight — одновременно обрабатываемые, models — модели по порядку
+    app.state.stats = {"calls": 0, "in_flight": 0, "max_in_flight": 0, "models": []}
+
+    def _answer(body: Dict[str, Any]) -> str:
+        last = body["messages"][-1].get("content", "") if body.get("messages") else ""
+        return f"echo: {str(last)[:200]}"
+
+    def _chunk(completion_id: str, model: str, delta: Dict[str, Any], finish: Any = None) -> str:
+        payload = {
+            "id": completion_id,
+            "object": "chat.completion.chunk",
+            "created": int(time.time()),
+            "model": model,
+            "choices": [{"index": 0, "delta": delta, "finish_reason": finish}],
+        }
+        return f"data: {json.dumps(payload, ensure_ascii=False)}\n\n"
+
+    @app.get("/stats")
+    async def stats() -> Dict[str, Any]:
+        return app.state.stats
+
+    @app.post("/v1/chat/completions")
+    async def chat_completions(request: Request):
+        body = await request.json()
+        stats = app.state.stats
+        stats["calls"] += 1
+        call_no = stats["calls"]
+        model = body.get("model", "fake-model")
+        stats["models"].append(model)
+
+        if call_no <= failures:
+            return JSONResponse(
+                {"error": {"message": "Rate limit reached", "type": "rate_limit_error", "code": None}},
+                status_code=429,
+                headers={"retry-after-ms": str(int(retry_after * 1000))},
+            )
+
+        stats["in_flight"] += 1
+        stats["max_in_flight"] = max(stats["max_in_flight"], stats["in_flight"])
+        delay = slow_latency if call_no <= failures + slow_calls else latency
+        completion_id = f"chatcmpl-{uuid.uuid4().hex[:12]}"
+        answer = _answer(body)
+
+        if not body.get("stream"):
+            try:
+                await asyncio.sleep(delay)
+            finally:
+                stats["in_flight"] -= 1
+            return JSONResponse(
+                {
+                    "id": completion_id,
+                    "object": "chat.completion",
+                    "created": int(time.time()),
+                    "model": model,
+                    "choices": [
+                        {
+                            "index": 0,
+                            "message": {"role": "assistant", "content": answer},
+                            "finish_reason": "stop",
+                        }
+                    ],
+                    "usage": {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0},
+                }
+            )
+
+        async def _events():
+            try:
+                await asyncio.sleep(delay)
+                yield _chunk(completion_id, model, {"role": "assistant", "content": ""})
+                for word in answer.split(" "):
+                    yield _chunk(completion_id, model, {"content": word + " "})
+                    await asyncio.sleep(chunk_delay)
+                yield _chunk(completion_id, model, {}, finish="stop")
+                yield "data: [DONE]\n\n"
+            finally:
+                stats["in_flight"] -= 1
+
+        return StreamingResponse(_events(), media_type="text/event-stream")
+
+    return app
+
+
+def main(argv: list[str] | None = None) -> int:
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="Фейковый OpenAI-совместимый сервер")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8799)
+    parser.add_argument("--latency", type=float, default=0.2, help="Задержка до ответа/первого токена, с")
+    parser.add_argument("--chunk-delay", type=float, default=0.01, help="Пауза между токенами потока, с")
+    parser.add_argument("--failures", type=int, default=0, help="Сколько первых запросов ответить 429")
+    parser.add_argument("--slow-calls", type=int, default=0, help="Сколько следующих запросов сделать медленными")
+    parser.add_argument("--slow-latency", type=float, default=5.0, help="Задержка медленных запросов, с")
+    args = parser.parse_args(argv)
+
+    app = create_app(
+        latency=args.latency,
+        chunk_delay=args.chunk_delay,
+        failures=args.failures,
+        slow_calls=args.slow_calls,
+        slow_latency=args.slow_latency,
+    )
+    uvicorn.run(app, host=args.host, port=args.port)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -3,7 +3,7 @@ import textwrap
 import yaml
 from pathlib import Path
 
-from app.core.storage import init_schema, clear_all, insert_many, get_connection
+from app.core.storage import init_schema, clear_all, insert_many, connection
 
 
 BASE_DIR = Path(__file__).resolve().parents[1]
@@ -15,57 +15,67 @@ DEMO_REPOS_DIR = DEMO_DATA_DIR / "demo_repos"
 def load_projects_config():
     with open(CONFIG_PATH, "r", encoding="utf-8") as f:
         data = yaml.safe_load(f)
-    return data.get("projects", [])
+    projects = data.get("projects", [])
+    if isinstance(projects, dict):
+        # projects.yaml хранит проекты словарем slug -> описание; приводим к плоским записям
+        projects = [_flatten_project(slug, cfg or {}) for slug, cfg in projects.items()]
+    return projects
+
+
+def _flatten_project(slug, cfg):
+    repo = cfg.get("repo") or {}
+    confluence = cfg.get("confluence") or {}
+    return {
+        "slug": slug,
+        "name": cfg.get("name", slug),
+        "description": cfg.get("description", ""),
+        "repo_path": repo.get("path", slug),
+        "confluence_space_key": confluence.get("space_key", ""),
+        "confluence_space_name": confluence.get("name", cfg.get("name", slug)),
+        "confluence_base_url": confluence.get("base_url", ""),
+    }
 
 
 def seed_db(projects_cfg):
     init_schema()
     clear_all()
 
-    # 1) вставляем проекты
-    project_rows = [
+    # 1) вставляем проекты (таблицы очищены выше — сид каждый раз пересоздает каталог целиком)
+    project_rows = (
         {
             "slug": p["slug"],
             "name": p["name"],
             "description": p.get("description", ""),
         }
         for p in projects_cfg
-    ]
-    insert_many(
-        "INSERT INTO projects",
-        project_rows,
     )
+    _report("projects", insert_many("INSERT INTO projects", project_rows))
 
     # Получаем их id
-    conn = get_connection()
-    cur = conn.cursor()
-    cur.execute("SELECT id, slug FROM projects;")
-    id_by_slug = {row["slug"]: row["id"] for row in cur.fetchall()}
-
-    # 2) репозитории
-    repo_rows = []
-    space_rows = []
-
-    for p in projects_cfg:
-        pid = id_by_slug[p["slug"]]
-        repo_rows.append(
-            {
-                "project_id": pid,
-                "name": f"{p['slug']}-mono-repo",
-                "path": p["repo_path"],
-            }
-        )
-        space_rows.append(
-            {
-                "project_id": pid,
-                "space_key": p["confluence_space_key"],
-                "name": p["confluence_space_name"],
-                "base_url": p["confluence_base_url"],
-            }
-        )
-
-    insert_many("INSERT INTO repos", repo_rows)
-    insert_many("INSERT INTO confluence_spaces", space_rows)
+    with connection() as conn:
+        id_by_slug = {row["slug"]: row["id"] for row in conn.execute("SELECT id, slug FROM projects;")}
+
+    # 2) репозитории и пространства Confluence — генераторами, без промежуточных списков
+    repo_rows = (
+        {
+            "project_id": id_by_slug[p["slug"]],
+            "name": f"{p['slug']}-mono-repo",
+            "path": p["repo_path"],
+        }
+        for p in projects_cfg
+    )
+    space_rows = (
+        {
+            "project_id": id_by_slug[p["slug"]],
+            "space_key": p["confluence_space_key"],
+            "name": p["confluence_space_name"],
+            "base_url": p["confluence_base_url"],
+        }
+        for p in projects_cfg
+    )
+
+    _report("repos", insert_many("INSERT INTO repos", repo_rows))
+    _report("confluence_spaces", insert_many("INSERT INTO confluence_spaces", space_rows))
 
     # 3) демо-вопросы для красивых сценариев в UI
     demo_queries = [
@@ -82,9 +92,11 @@ def seed_db(projects_cfg):
             "expected_outline": "Шаги от оформления заказа до передачи гостю, интеграции с системами аэропорта, потенциальные точки отказа.",
         },
     ]
-    insert_many("INSERT INTO demo_queries", demo_queries)
+    _report("demo_queries", insert_many("INSERT INTO demo_queries", demo_queries))
+
 
-    conn.close()
+def _report(table, stats):
+    print(f"  {table}: {stats.rows} строк, {stats.batches} транзакц., {stats.rows_per_second:.0f} строк/с")
 
 
 def ensure_demo_repo_docops():
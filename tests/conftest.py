@@ -0,0 +1,65 @@
+# tests/conftest.py
+
+from __future__ import annotations
+
+from pathlib import Path
+
+import pytest
+
+from app.config.settings import settings
+
+
+def _setup_demo_repo(base: Path, slug: str = "docops-saas") -> Path:
+    repo_root = base / slug
+    docs_dir = repo_root / "docs"
+    services_dir = repo_root / "services" / "billing"
+
+    docs_dir.mkdir(parents=True)
+    services_dir.mkdir(parents=True)
+
+    (repo_root / "README.md").write_text(
+        "# Demo Repo\n\nТестовый проект для DocOpsAgent.\n",
+        encoding="utf-8",
+    )
+
+    (docs_dir / "billing_overview.md").write_text(
+        "# Сервис биллинга\n\nСервис биллинга отвечает за выставление счетов.",
+        encoding="utf-8",
+    )
+
+    (services_dir / "main.py").write_text(
+        "def create_invoice():\n    return {'status': 'ok'}\n",
+        encoding="utf-8",
+    )
+
+    return repo_root
+
+
+@pytest.fixture
+def demo_projects_env(tmp_path, monkeypatch):
+    base = tmp_path / "demo_repos"
+    base.mkdir()
+
+    _setup_demo_repo(base, slug="docops-saas")
+
+    repo2 = base / "airport-food"
+    docs2 = repo2 / "docs"
+    docs2.mkdir(parents=True)
+    (repo2 / "README.md").write_text("# Airport Food\n", encoding="utf-8")
+    (docs2 / "process_overview.md").write_text(
+        "# Процесс доставки\n\nПроцесс доставки в бизнес-зал аэропорта.",
+        encoding="utf-8",
+    )
+
+    # перенастраиваем пути в settings
+    settings.paths.demo_repos_dir = base
+    settings.paths.docs_index_dir = tmp_path / "docs_index"
+    settings.paths.llm_cache_path = tmp_path / "llm_cache.db"
+
+    yield base
+
+    from app.agent.registry import reset_agent_registry
+    from app.core.storage import close_connections
+
+    reset_agent_registry()
+    close_connections()
\ No newline at end of file
@@ -2,7 +2,8 @@
 
 from __future__ import annotations
 
-from pathlib import Path
+import sqlite3
+import time
 
 import pytest
 
@@ -11,52 +12,8 @@ from app.agent import workflows
 from app.agent.agent import DocOpsAgent, ProjectContext
 
 
-def _setup_demo_repo(base: Path, slug: str = "docops-saas") -> Path:
-    repo_root = base / slug
-    docs_dir = repo_root / "docs"
-    services_dir = repo_root / "services" / "billing"
-
-    docs_dir.mkdir(parents=True)
-    services_dir.mkdir(parents=True)
-
-    (repo_root / "README.md").write_text(
-        "# Demo Repo\n\nТестовый проект для DocOpsAgent.\n",
-        encoding="utf-8",
-    )
-
-    (docs_dir / "billing_overview.md").write_text(
-        "# Сервис биллинга\n\nСервис биллинга отвечает за выставление счетов.",
-        encoding="utf-8",
-    )
-
-    (services_dir / "main.py").write_text(
-        "def create_invoice():\n    return {'status': 'ok'}\n",
-        encoding="utf-8",
-    )
-
-    return repo_root
-
-
-@pytest.fixture(autouse=True)
-def demo_projects_env(tmp_path, monkeypatch):
-    base = tmp_path / "demo_repos"
-    base.mkdir()
-
-    _setup_demo_repo(base, slug="docops-saas")
-
-    repo2 = base / "airport-food"
-    docs2 = repo2 / "docs"
-    docs2.mkdir(parents=True)
-    (repo2 / "README.md").write_text("# Airport Food\n", encoding="utf-8")
-    (docs2 / "process_overview.md").write_text(
-        "# Процесс доставки\n\nПроцесс доставки в бизнес-зал аэропорта.",
-        encoding="utf-8",
-    )
-
-    # перенастраиваем пути в settings
-    settings.paths.demo_repos_dir = base
-
-    yield base
+# Каждый тест модуля — на демо-проектах во временном каталоге (фикстура из tests/conftest.py)
+pytestmark = pytest.mark.usefixtures("demo_projects_env")
 
 
 @pytest.fixture
@@ -97,4 +54,510 @@ def test_docops_agent_wraps_workflows(demo_projects_env, fake_llm):
 
     qa = agent.answer_question("Расскажи про биллинг.")
     assert "[FAKE-LLM ANSWER]" in qa["answer"]
-    assert isinstance(qa["sources"], list)
\ No newline at end of file
+    assert isinstance(qa["sources"], list)
+
+
+def test_qa_over_docs_fans_out_retrieval(demo_projects_env, fake_llm, monkeypatch):
+    def slow_git(**kwargs):
+        time.sleep(0.3)
+        return [{"path": "docs/slow.md", "snippet": "медленный git", "score": 1.0}]
+
+    def slow_vector(**kwargs):
+        time.sleep(0.3)
+        return [{"doc_id": "docs/vector.md", "snippet": "из векторного стора"}]
+
+    monkeypatch.setattr(workflows.git_tools, "search_in_docs", slow_git)
+    monkeypatch.setattr(workflows.vector_tools, "search_documents", slow_vector)
+
+    started = time.monotonic()
+    result = workflows.qa_over_docs(project_slug="docops-saas", question="биллинг")
+    assert time.monotonic() - started < 0.55
+    assert {s["path"] for s in result.sources} == {"docs/slow.md", "docs/vector.md"}
+
+    # Источник, не уложившийся в таймаут, просто не попадает в контекст
+    started = time.monotonic()
+    result = workflows.qa_over_docs(
+        project_slug="docops-saas",
+        question="биллинг",
+        timeouts={"git": 0.05},
+    )
+    assert time.monotonic() - started < 0.55
+    assert [s["path"] for s in result.sources] == ["docs/vector.md"]
+
+
+def test_retrieval_pool_recovers_after_repeated_timeouts():
+    # Брошенные по таймауту поиски досчитываются в фоне; когда они заканчиваются, потоки пула свободны
+    pool_size = settings.retrieval.max_workers + settings.retrieval.headroom
+
+    def slow():
+        time.sleep(0.2)
+        return [{"path": "docs/slow.md"}]
+
+    for _ in range(pool_size + 4):
+        assert workflows.retrieve({"git": slow}, {"git": 0.01}) == {"git": []}
+    assert workflows.abandoned_retrievals() > 0
+
+    deadline = time.monotonic() + 5.0
+    while workflows.abandoned_retrievals() and time.monotonic() < deadline:
+        time.sleep(0.05)
+    assert workflows.abandoned_retrievals() == 0
+
+    found = workflows.retrieve({"git": lambda: [{"path": "docs/fast.md"}]}, {"git": 0.5})
+    assert found == {"git": [{"path": "docs/fast.md"}]}
+
+
+def test_search_confluence_bounds_http_calls_by_timeout(monkeypatch):
+    calls = []
+
+    def search_pages(**kwargs):
+        calls.append(("search", kwargs["timeout"]))
+        return [{"id": "1", "title": "Биллинг"}, {"id": "2", "title": "Счета"}]
+
+    def get_page(page_id, timeout=None):
+        calls.append((page_id, timeout))
+        time.sleep(0.06)
+        return {"body": {"storage": {"value": "<p>текст</p>"}}}
+
+    monkeypatch.setattr(workflows.confluence_tools, "search_pages", search_pages)
+    monkeypatch.setattr(workflows.confluence_tools, "get_page", get_page)
+
+    # Каждый HTTP-запрос получает остаток общего таймаута; после дедлайна страницы не запрашиваются
+    results = workflows._search_confluence("биллинг", "DOC", 5, timeout=0.05)
+    assert [r["id"] for r in results] == ["1"]
+    assert calls[0] == ("search", 0.05)
+    assert calls[1][0] == "1" and 0 < calls[1][1] <= 0.05
+    assert len(calls) == 2
+
+
+def test_fuse_merges_sources_and_drops_near_duplicates():
+    from app.agent.fusion import fuse
+
+    shared = "Сервис биллинга отвечает за учет подписок, выставление счетов и интеграцию с платежными провайдерами."
+    fused = fuse(
+        {
+            "git": [
+                {"path": "docs/billing.md", "snippet": shared},
+                {"path": "docs/auth.md", "snippet": "Сервис аутентификации выдает токены доступа."},
+            ],
+            "vector": [
+                # Тот же файл из векторного стора — один документ с суммой вкладов RRF
+                {"doc_id": "docs/billing.md", "snippet": shared},
+                # Копия текста под другим путем — отсеивается как почти дубликат
+                {"doc_id": "docs/copy_of_billing.md", "snippet": shared + " "},
+            ],
+        }
+    )
+
+    assert [f["path"] for f in fused] == ["docs/billing.md", "docs/auth.md"]
+    assert fused[0]["kinds"] == ["git", "vector"]
+    assert fused[0]["score"] > fused[1]["score"]
+
+
+def test_qa_over_docs_sends_each_document_once(demo_projects_env, fake_llm, monkeypatch, tmp_path):
+    from app.mcp_client import vector_tools
+    from app.mcp_client.client import _clients  # type: ignore[attr-defined]
+
+    monkeypatch.setattr(settings.paths, "vector_store_path", tmp_path / "vector_store" / "documents.jsonl")
+    monkeypatch.setattr(_clients, "_vector_store", None)
+
+    text = (demo_projects_env / "docops-saas" / "docs" / "billing_overview.md").read_text(encoding="utf-8")
+    vector_tools.upsert_document(
+        project_slug="docops-saas",
+        doc_id="docs/billing_overview.md",
+        title="Billing",
+        text=text,
+    )
+
+    result = workflows.qa_over_docs(project_slug="docops-saas", question="биллинга")
+    paths = [s["path"] for s in result.sources]
+    assert paths.count("docs/billing_overview.md") == 1
+    assert sorted(result.sources[0]["kinds"]) == ["git", "vector"]
+
+
+def test_pack_context_fits_budget_and_trims_at_sentences():
+    from app.agent.packing import estimate_tokens, pack_context
+
+    long_text = " ".join(f"Предложение номер {i} про биллинг и счета." for i in range(200))
+    hits = [
+        {"path": "docs/long.md", "snippet": long_text, "kind": "git", "kinds": ["git"], "score": 0.03},
+        {"path": "docs/short.md", "snippet": "Счета выставляются раз в месяц.", "kind": "vector", "kinds": ["vector"], "score": 0.02},
+    ]
+
+    packed = pack_context(hits, budget=200)
+    assert packed.tokens <= 200
+    assert estimate_tokens(packed.text) <= packed.tokens
+    # Короткий фрагмент выгоднее по релевантности на токен и попадает целиком,
+    # длинный — обрезается под остаток по концу предложения
+    assert [item["path"] for item in packed.items] == ["docs/long.md", "docs/short.md"]
+    assert packed.items[1]["snippet"] == "Счета выставляются раз в месяц."
+    trimmed = packed.items[0]["snippet"]
+    assert len(trimmed) < len(long_text)
+    assert trimmed.endswith("счета.")
+
+
+def test_qa_over_docs_reports_context_tokens(demo_projects_env, fake_llm):
+    result = workflows.qa_over_docs(project_slug="docops-saas", question="биллинга", context_tokens=500)
+    assert result.sources
+    assert 0 < result.context_tokens <= 500
+
+
+def test_qa_over_docs_serves_repeated_question_from_cache(demo_projects_env, monkeypatch):
+    calls = []
+
+    def _counting_chat(messages, model=None, max_tokens=2048, temperature=0.2):
+        calls.append(messages)
+        return f"answer #{len(calls)}"
+
+    monkeypatch.setattr("app.agent.workflows.llm_chat", _counting_chat)
+    monkeypatch.setattr(settings.llm_cache, "semantic", True)
+
+    first = workflows.qa_over_docs(project_slug="docops-saas", question="биллинга")
+    assert first.cached is None
+
+    started = time.perf_counter()
+    again = workflows.qa_over_docs(project_slug="docops-saas", question="биллинга")
+    assert again.cached == "exact"
+    assert again.answer == first.answer
+
+    # Другой регистр и пунктуация, те же источники — попадание по семантическому ключу
+    similar = workflows.qa_over_docs(project_slug="docops-saas", question="  Биллинга?? ")
+    assert similar.cached == "semantic"
+    assert similar.answer == first.answer
+    assert len(calls) == 1
+    assert time.perf_counter() - started < 1.0
+
+
+def test_async_qa_touches_cache_off_event_loop(demo_projects_env, monkeypatch):
+    import asyncio
+    import threading
+
+    from app.core.cache import get_response_cache
+
+    # Чтение и запись кэша ответов (SQLite) не должны идти в потоке event loop
+    cache = get_response_cache()
+    threads = []
+    original_get, original_put = cache.get, cache.put
+    monkeypatch.setattr(cache, "get", lambda *a: threads.append(threading.get_ident()) or original_get(*a))
+    monkeypatch.setattr(cache, "put", lambda *a: threads.append(threading.get_ident()) or original_put(*a))
+
+    async def _fake_achat(messages, model=None, max_tokens=2048, temperature=0.2):
+        return "Биллинг выставляет счета."
+
+    async def _fake_stream(messages, model=None, max_tokens=2048, temperature=0.2):
+        yield "Биллинг."
+
+    monkeypatch.setattr("app.agent.workflows.llm_achat", _fake_achat)
+    monkeypatch.setattr("app.agent.workflows.llm_achat_stream", _fake_stream)
+
+    async def _run():
+        loop_thread = threading.get_ident()
+        first = await workflows.aqa_over_docs(project_slug="docops-saas", question="биллинга")
+        events = [e async for e in workflows.aqa_over_docs_stream(project_slug="docops-saas", question="доставки")]
+        return loop_thread, first, events
+
+    loop_thread, first, events = asyncio.run(_run())
+    assert first.cached is None and events[-1]["type"] == "done"
+    assert threads and loop_thread not in threads
+
+
+def test_response_cache_expires_and_evicts(tmp_path):
+    from app.core.cache import ResponseCache
+
+    cache = ResponseCache(tmp_path / "cache.db", ttl=60.0, max_entries=2)
+    cache.put(["a"], "A")
+    cache.put(["b"], "B")
+    assert cache.get("a") == "A"  # a становится свежее b
+    cache.put(["c"], "C")
+    assert cache.get("b") is None
+    assert cache.get("a") == "A"
+    assert cache.get("c") == "C"
+
+    cache.ttl = -1.0
+    assert cache.get("a") is None
+    cache.close()
+
+    # Записи переживают пересоздание кэша
+    reopened = ResponseCache(tmp_path / "cache.db", ttl=60.0)
+    assert reopened.get("c") == "C"
+    reopened.close()
+
+
+def test_qa_over_docs_stream_yields_sources_then_deltas(demo_projects_env, fake_llm, monkeypatch):
+    def _fake_stream(messages, model=None, max_tokens=2048, temperature=0.2):
+        yield "Биллинг "
+        yield "выставляет счета."
+
+    monkeypatch.setattr("app.agent.workflows.llm_chat_stream", _fake_stream)
+
+    events = list(workflows.qa_over_docs_stream(project_slug="docops-saas", question="биллинга"))
+    assert [e["type"] for e in events] == ["sources", "delta", "delta", "done"]
+    assert events[0]["sources"][0]["path"] == "docs/billing_overview.md"
+    result = events[-1]["result"]
+    assert result.answer == "Биллинг выставляет счета."
+    assert result.cached is None
+
+    # Дочитанный поток попадает в кэш и для обычного вызова
+    again = workflows.qa_over_docs(project_slug="docops-saas", question="биллинга")
+    assert again.cached == "exact"
+    assert again.answer == result.answer
+
+
+def test_on_ask_question_streams_answer(demo_projects_env, monkeypatch):
+    import asyncio
+
+    from app.ui import callbacks
+
+    async def _fake_stream(messages, model=None, max_tokens=2048, temperature=0.2):
+        yield "Один, "
+        yield "два."
+
+    monkeypatch.setattr("app.agent.workflows.llm_achat_stream", _fake_stream)
+
+    async def _collect():
+        return [update async for update in callbacks.on_ask_question("docops-saas", "биллинга")]
+
+    updates = asyncio.run(_collect())
+    assert updates[0][0] == ""
+    assert "billing_overview.md" in updates[0][1]
+    assert [answer for answer, _ in updates[1:]] == ["Один, ", "Один, два."]
+
+
+def test_agent_registry_reuses_warm_agents_and_evicts_lru(demo_projects_env, monkeypatch):
+    from concurrent.futures import ThreadPoolExecutor
+
+    from app.agent.agent import DocOpsAgent
+    from app.agent.registry import AgentRegistry
+
+    warmed = []
+    closed = []
+    monkeypatch.setattr(DocOpsAgent, "warm_up", lambda self: warmed.append(self.project.slug))
+    monkeypatch.setattr(DocOpsAgent, "close", lambda self: closed.append(self.project.slug))
+
+    registry = AgentRegistry(max_agents=2)
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        agents = list(pool.map(registry.get, ["docops-saas"] * 16))
+    assert len({id(a) for a in agents}) == 1
+    assert warmed == ["docops-saas"]
+
+    registry.get("airport-food")
+    registry.get("docops-saas")  # docops-saas снова самый свежий
+    registry.get("third-project")
+    assert closed == ["airport-food"]
+    assert registry.projects() == ["docops-saas", "third-project"]
+
+
+def test_agent_warm_up_loads_project_state(demo_projects_env, monkeypatch, tmp_path):
+    from app.agent.agent import DocOpsAgent
+    from app.core import storage
+    from app.mcp_client import docs_index
+    from app.mcp_client.client import _clients  # type: ignore[attr-defined]
+
+    monkeypatch.setattr(storage, "DB_PATH", tmp_path / "demo.db")
+    monkeypatch.setattr(settings.paths, "vector_store_path", tmp_path / "vector_store" / "documents.jsonl")
+    monkeypatch.setattr(_clients, "_vector_store", None)
+    storage.init_schema()
+    storage.insert_many(
+        "INSERT INTO projects",
+        [{"slug": "docops-saas", "name": "DocOps SaaS Platform", "description": "Демо"}],
+    )
+
+    agent = DocOpsAgent(project=ProjectContext(slug="docops-saas"))
+    agent.warm_up()
+    assert agent.warm
+    assert agent.project.name == "DocOps SaaS Platform"
+    root = (demo_projects_env / "docops-saas").resolve()
+    index_keys = [key for key in docs_index._indexes if key[0] == root]
+    assert index_keys and docs_index._indexes[index_keys[0]].files
+
+    agent.close()
+    assert not [key for key in docs_index._indexes if key[0] == root]
+
+
+def test_storage_reuses_pooled_connections(monkeypatch, tmp_path):
+    import sqlite3
+    import threading
+
+    from app.core import storage
+
+    monkeypatch.setattr(storage, "DB_PATH", tmp_path / "demo.db")
+    storage.init_schema()
+    storage.insert_many(
+        "INSERT INTO projects",
+        [{"slug": "docops-saas", "name": "DocOps SaaS Platform", "description": "Демо"}],
+    )
+
+    with storage.connection() as first, storage.connection() as second:
+        assert first is second
+        assert first.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+
+    with storage.read_connection() as reader:
+        assert reader.execute("SELECT name FROM projects").fetchone()[0] == "DocOps SaaS Platform"
+        with pytest.raises(sqlite3.OperationalError):
+            reader.execute("DELETE FROM projects")
+
+    # Другой поток получает собственное соединение
+    other = []
+    thread = threading.Thread(target=lambda: other.append(storage._pool.get(storage.DB_PATH, readonly=False)))
+    thread.start()
+    thread.join()
+    assert other[0] is not first
+
+    assert storage.get_project("docops-saas")["name"] == "DocOps SaaS Platform"
+    storage.close_connections()
+
+
+def test_insert_many_streams_batches_and_upserts(monkeypatch, tmp_path):
+    from app.core import storage
+
+    monkeypatch.setattr(storage, "DB_PATH", tmp_path / "demo.db")
+    storage.init_schema()
+
+    rows = ({"slug": f"p-{i}", "name": f"Project {i}", "description": ""} for i in range(2500))
+    stats = storage.insert_many("INSERT INTO projects", rows, batch_size=1000)
+    assert (stats.rows, stats.batches) == (2500, 3)
+    assert stats.rows_per_second > 0
+
+    stats = storage.insert_many(
+        "INSERT INTO projects",
+        iter([{"slug": "p-1", "name": "Renamed", "description": "upd"}]),
+        conflict=("slug",),
+        update=("name",),
+    )
+    assert stats.rows == 1
+    with storage.read_connection() as conn:
+        assert conn.execute("SELECT COUNT(*) FROM projects").fetchone()[0] == 2500
+        row = conn.execute("SELECT name, description FROM projects WHERE slug = 'p-1'").fetchone()
+    assert (row["name"], row["description"]) == ("Renamed", "")
+
+    assert storage.insert_many("INSERT INTO projects", iter([])).rows == 0
+    storage.close_connections()
+
+
+def test_vector_tools_use_sqlite_backend_from_settings(monkeypatch, tmp_path):
+    from app.mcp_client import vector_tools
+    from app.mcp_client.client import _clients  # type: ignore[attr-defined]
+    from mcp_vector.fts import SqliteFtsDocumentStore  # type: ignore
+
+    monkeypatch.setattr(settings.vector_store, "backend", "sqlite")
+    monkeypatch.setattr(settings.paths, "fts_store_path", tmp_path / "demo.db")
+    monkeypatch.setattr(_clients, "_vector_store", None)
+
+    vector_tools.upsert_document("docops-saas", "docs/auth.md", "Auth", "Сервис аутентификации и SSO.")
+    hits = vector_tools.search_documents("docops-saas", "аутентификации")
+    assert isinstance(_clients.vector_store, SqliteFtsDocumentStore)
+    assert [h["doc_id"] for h in hits] == ["docs/auth.md"]
+    _clients.vector_store.close()
+
+
+def test_schema_migrations_and_indexed_lookups(monkeypatch, tmp_path):
+    from app.core import storage
+
+    monkeypatch.setattr(storage, "DB_PATH", tmp_path / "demo.db")
+    # БД, созданная до появления миграций: таблицы есть, schema_version нет
+    with storage.connection() as conn:
+        for statement in storage.MIGRATIONS[0][2]:
+            conn.execute(statement)
+
+    latest = storage.MIGRATIONS[-1][0]
+    assert storage.migrate() == latest
+    assert storage.migrate() == latest  # повторный запуск ничего не применяет
+    with storage.read_connection() as conn:
+        versions = [row["version"] for row in conn.execute("SELECT version FROM schema_version ORDER BY version")]
+    assert versions == [v for v, _, _ in storage.MIGRATIONS]
+
+    storage.insert_many(
+        "INSERT INTO projects",
+        ({"slug": f"p-{i}", "name": f"Project {i}", "description": ""} for i in range(200)),
+    )
+    storage.insert_many(
+        "INSERT INTO repos",
+        ({"project_id": i + 1, "name": f"repo-{i}", "path": f"p-{i}"} for i in range(200)),
+    )
+    storage.insert_many(
+        "INSERT INTO confluence_spaces",
+        ({"project_id": i + 1, "space_key": f"S{i}", "name": f"Space {i}", "base_url": ""} for i in range(200)),
+    )
+    with storage.connection() as conn:
+        conn.execute("ANALYZE")
+
+    for sql in (storage.PROJECT_REPOS_SQL, storage.PROJECT_SPACES_SQL):
+        plan = storage.query_plan(sql, ("p-7",))
+        assert not [step for step in plan if step.startswith("SCAN")], plan
+        assert any("USING" in step and "INDEX" in step for step in plan), plan
+    plan = storage.query_plan("SELECT project_id FROM confluence_spaces WHERE space_key = ?", ("S7",))
+    assert any("idx_confluence_spaces_space_key" in step for step in plan), plan
+
+    assert storage.get_project_sources("p-7") == {
+        "repos": [{"name": "repo-7", "path": "p-7"}],
+        "spaces": [{"space_key": "S7", "name": "Space 7", "base_url": ""}],
+    }
+    storage.close_connections()
+
+
+def test_project_catalog_pages_searches_and_invalidates_on_write(monkeypatch, tmp_path):
+    from app.core import storage
+    from app.core.catalog import ProjectCatalog
+    from app.ui import callbacks
+
+    monkeypatch.setattr(storage, "DB_PATH", tmp_path / "demo.db")
+    storage.init_schema()
+    storage.insert_many(
+        "INSERT INTO projects",
+        ({"slug": f"proj-{i:03d}", "name": f"Project {i:03d}", "description": ""} for i in range(120)),
+    )
+    storage.insert_many(
+        "INSERT INTO confluence_spaces",
+        [{"project_id": 8, "space_key": "P007", "name": "Space 7", "base_url": ""}],
+    )
+
+    catalog = ProjectCatalog(page_size=50)
+    first = catalog.page()
+    assert first.items[0] == ("Project 000", "proj-000") and len(first.items) == 50 and first.has_more
+    last = catalog.page(page=2)
+    assert len(last.items) == 20 and not last.has_more
+    assert [slug for _, slug in catalog.page("PROJECT 11").items] == [f"proj-11{i}" for i in range(10)]
+    assert catalog.page("proj-05").items[0] == ("Project 050", "proj-050")
+    assert catalog.page("100%").items == []  # спецсимволы LIKE экранируются
+
+    info = catalog.get("proj-007")
+    assert info is not None and info.confluence_space == "P007"
+    assert catalog.get("missing") is None
+
+    # Повторные обращения идут из кэша, без запросов к БД
+    calls = []
+    monkeypatch.setattr(storage, "list_projects", lambda *a, **kw: calls.append(a) or [])
+    assert catalog.page() is first
+    assert calls == []
+    monkeypatch.undo()
+    monkeypatch.setattr(storage, "DB_PATH", tmp_path / "demo.db")
+
+    # Запись в БД сбрасывает кэш
+    storage.insert_many("INSERT INTO projects", [{"slug": "aaa", "name": "AAA", "description": ""}])
+    assert catalog.page().items[0] == ("AAA", "aaa")
+
+    # Запись из другого процесса (отдельное соединение, мимо storage) тоже сбрасывает кэш
+    assert catalog.get("external") is None
+    external = sqlite3.connect(tmp_path / "demo.db")
+    with external:
+        external.execute("INSERT INTO projects (slug, name, description) VALUES ('external', '0 External', '')")
+    external.close()
+    assert catalog.page().items[0] == ("0 External", "external")
+    assert catalog.get("external") is not None
+
+    # Страница и поиск читают только индекс, без полного просмотра таблицы
+    search_plan = storage.query_plan(
+        "SELECT slug, name FROM projects WHERE name LIKE ? ESCAPE '\\' OR slug LIKE ? ESCAPE '\\' "
+        "ORDER BY name COLLATE NOCASE, slug LIMIT 51",
+        ("proj%", "proj%"),
+    )
+    assert not [step for step in search_plan if step.startswith("SCAN")], search_plan
+    page_plan = storage.query_plan("SELECT slug, name FROM projects ORDER BY name COLLATE NOCASE, slug LIMIT 51")
+    assert len(page_plan) == 1 and "idx_projects_name" in page_plan[0], page_plan  # без сортировки в TEMP B-TREE
+
+    # Колбэк листания оставляет выбранный проект в списке
+    monkeypatch.setattr("app.ui.callbacks.get_project_catalog", lambda: catalog)
+    dropdown, page, prev_btn, next_btn = callbacks.on_next_projects("", 0, "proj-007")
+    assert page == 1 and dropdown["value"] == "proj-007"
+    assert dropdown["choices"][0] == ("Project 007", "proj-007")
+    assert prev_btn["interactive"] is True and next_btn["interactive"] is True
+    storage.close_connections()
\ No newline at end of file
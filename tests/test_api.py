@@ -0,0 +1,96 @@
+# tests/test_api.py
+
+from __future__ import annotations
+
+import json
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.api.routes import router
+from app.config.settings import settings
+from app.core import storage
+
+
+@pytest.fixture
+def client(demo_projects_env, monkeypatch, tmp_path):
+    calls = []
+
+    async def _fake_achat(messages, model=None, max_tokens=2048, temperature=0.2):
+        calls.append(messages)
+        return "Ответ про биллинг."
+
+    async def _fake_achat_stream(messages, model=None, max_tokens=2048, temperature=0.2):
+        for part in ("Ответ ", "про ", "биллинг."):
+            yield part
+
+    monkeypatch.setattr("app.agent.workflows.llm_achat", _fake_achat)
+    monkeypatch.setattr("app.agent.workflows.llm_achat_stream", _fake_achat_stream)
+    monkeypatch.setattr(settings.agents, "warm", False)
+    # Пустая БД: каталог проектов — каталоги demo_repos_dir
+    monkeypatch.setattr(storage, "DB_PATH", tmp_path / "demo.db")
+
+    app = FastAPI()
+    app.include_router(router)
+    with TestClient(app) as test_client:
+        test_client.llm_calls = calls
+        yield test_client
+
+
+def test_qa_endpoint_returns_answer_and_sources(client):
+    response = client.post("/api/v1/qa", json={"project": "docops-saas", "question": "биллинга"})
+    assert response.status_code == 200
+    body = response.json()
+    assert body["answer"] == "Ответ про биллинг."
+    assert body["sources"][0]["path"] == "docs/billing_overview.md"
+    assert body["context_tokens"] > 0
+
+
+def test_qa_endpoint_rejects_unknown_project(client):
+    response = client.post("/api/v1/qa", json={"project": "../etc", "question": "биллинга"})
+    assert response.status_code == 404
+
+
+def test_qa_endpoint_checks_project_in_catalog(client):
+    # После seed каталог — таблица projects: каталог репозитория без записи в БД API не видит, как и UI
+    storage.init_schema()
+    storage.insert_many("INSERT INTO projects", [{"slug": "docops-saas", "name": "DocOps SaaS", "description": ""}])
+
+    assert client.post("/api/v1/qa", json={"project": "docops-saas", "question": "биллинга"}).status_code == 200
+    response = client.post("/api/v1/qa", json={"project": "airport-food", "question": "доставки"})
+    assert response.status_code == 404
+    assert "Unknown project" in response.json()["detail"]
+
+
+def test_qa_batch_dedupes_questions_and_reports_errors(client):
+    items = [
+        {"project": "docops-saas", "question": "биллинга"},
+        {"project": "airport-food", "question": "доставки"},
+        {"project": "docops-saas", "question": "  биллинга "},
+        {"project": "missing", "question": "что угодно"},
+    ]
+    response = client.post("/api/v1/qa/batch", json={"items": items})
+    assert response.status_code == 200
+    results = response.json()["results"]
+    assert [r["question"] for r in results] == [i["question"] for i in items]
+    assert results[0]["response"] == results[2]["response"]
+    assert results[1]["response"]["answer"] == "Ответ про биллинг."
+    assert results[3]["response"] is None and "Unknown project" in results[3]["error"]
+    assert len(client.llm_calls) == 2
+
+
+def test_qa_stream_endpoint_sends_sse_events(client):
+    with client.stream("POST", "/api/v1/qa/stream", json={"project": "docops-saas", "question": "биллинга"}) as response:
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/event-stream")
+        raw = "".join(response.iter_text())
+
+    events = []
+    for block in raw.strip().split("\n\n"):
+        name, data = block.split("\n", 1)
+        events.append((name.removeprefix("event: "), json.loads(data.removeprefix("data: "))))
+
+    assert [name for name, _ in events] == ["sources", "delta", "delta", "delta", "done"]
+    assert events[0][1]["sources"][0]["path"] == "docs/billing_overview.md"
+    assert events[-1][1]["answer"] == "Ответ про биллинг."
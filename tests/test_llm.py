@@ -0,0 +1,195 @@
+# tests/test_llm.py
+
+from __future__ import annotations
+
+import asyncio
+import threading
+import time
+from types import SimpleNamespace
+
+import httpx
+import pytest
+from openai import AsyncOpenAI
+
+from app.config.settings import settings
+from app.core import llm
+from app.core.limits import TokenBucket
+from scripts.fake_openai_server import create_app
+
+
+@pytest.fixture
+def fake_openai_server(monkeypatch):
+    # AsyncOpenAI ходит в фейковый сервер в том же процессе, без сети; возвращает счетчики сервера
+    monkeypatch.setattr(settings.llm_retry, "base_delay", 0.01)
+
+    def _start(**options):
+        app = create_app(**{"latency": 0.05, **options})
+
+        def _client() -> AsyncOpenAI:
+            transport = httpx.ASGITransport(app=app)
+            return AsyncOpenAI(
+                api_key="test",
+                base_url="http://fake-openai/v1",
+                http_client=httpx.AsyncClient(transport=transport, base_url="http://fake-openai/v1"),
+            )
+
+        monkeypatch.setattr(llm, "_create_async_client", _client)
+        llm.reset_async_limits()
+        return app.state.stats
+
+    yield _start
+    llm.reset_async_limits()
+
+
+@pytest.fixture
+def fake_openai(fake_openai_server):
+    return fake_openai_server()
+
+
+def _messages(text: str):
+    return [{"role": "user", "content": text}]
+
+
+def test_achat_coalesces_identical_concurrent_prompts(fake_openai):
+    async def _run():
+        return await asyncio.gather(*(llm.achat(_messages("один и тот же вопрос")) for _ in range(20)))
+
+    answers = asyncio.run(_run())
+    assert len(set(answers)) == 1
+    assert answers[0].startswith("echo:")
+    assert fake_openai["calls"] == 1
+
+
+def test_achat_limits_requests_in_flight(fake_openai, monkeypatch):
+    monkeypatch.setattr(settings.llm, "max_in_flight", 3)
+
+    async def _run():
+        return await asyncio.gather(*(llm.achat(_messages(f"вопрос {i}")) for i in range(12)))
+
+    answers = asyncio.run(_run())
+    assert len(set(answers)) == 12
+    assert fake_openai["calls"] == 12
+    assert fake_openai["max_in_flight"] <= 3
+
+
+def test_llm_limit_is_shared_by_threads_and_event_loops(monkeypatch):
+    # Синхронные вызовы из потоков и асинхронные из разных event loop'ов делят один лимит
+    monkeypatch.setattr(settings.llm, "max_in_flight", 2)
+    stats = {"calls": 0, "in_flight": 0, "max_in_flight": 0}
+    lock = threading.Lock()
+
+    def _enter():
+        with lock:
+            stats["calls"] += 1
+            stats["in_flight"] += 1
+            stats["max_in_flight"] = max(stats["max_in_flight"], stats["in_flight"])
+
+    def _leave():
+        with lock:
+            stats["in_flight"] -= 1
+
+    def _completion():
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content="ok"))])
+
+    class _Completions:
+        def create(self, **kwargs):
+            _enter()
+            time.sleep(0.05)
+            _leave()
+            return _completion()
+
+    class _AsyncCompletions:
+        async def create(self, **kwargs):
+            _enter()
+            await asyncio.sleep(0.05)
+            _leave()
+            return _completion()
+
+    def _client(completions):
+        client = SimpleNamespace(chat=SimpleNamespace(completions=completions))
+        client.with_options = lambda **kwargs: client
+        return client
+
+    monkeypatch.setattr(llm, "get_client", lambda: _client(_Completions()))
+    monkeypatch.setattr(llm, "_create_async_client", lambda: _client(_AsyncCompletions()))
+    llm.reset_async_limits()
+
+    def _loop(n):
+        async def _run():
+            await asyncio.gather(*(llm.achat(_messages(f"loop {n} вопрос {i}")) for i in range(3)))
+
+        asyncio.run(_run())
+
+    workers = [threading.Thread(target=llm.chat, args=(_messages(f"поток {i}"),)) for i in range(4)]
+    workers += [threading.Thread(target=_loop, args=(n,)) for n in range(2)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    llm.reset_async_limits()
+
+    assert stats["calls"] == 10
+    assert stats["max_in_flight"] <= 2
+
+
+def test_token_bucket_waits_for_refill():
+    bucket = TokenBucket(rate_per_minute=600)  # 10 в секунду, всплеск до 600
+
+    async def _run():
+        bucket._tokens = 0
+        started = time.monotonic()
+        await bucket.acquire(2)
+        return time.monotonic() - started
+
+    assert asyncio.run(_run()) >= 0.15
+
+
+def test_achat_retries_rate_limits_honouring_retry_after(fake_openai_server):
+    stats = fake_openai_server(failures=2, retry_after=0.1)
+
+    started = time.monotonic()
+    answer = asyncio.run(llm.achat(_messages("повтор")))
+    assert answer.startswith("echo:")
+    assert stats["calls"] == 3
+    assert time.monotonic() - started >= 0.2
+
+
+def test_achat_falls_back_to_cheaper_model_on_last_attempt(fake_openai_server, monkeypatch):
+    stats = fake_openai_server(failures=1)
+    monkeypatch.setattr(settings.llm_retry, "max_retries", 1)
+    monkeypatch.setattr(settings.llm, "fallback_model", "fallback-mini")
+
+    asyncio.run(llm.achat(_messages("запасная модель"), model="main-model"))
+    assert stats["models"] == ["main-model", "fallback-mini"]
+
+
+def test_achat_without_retries_calls_primary_model(fake_openai_server, monkeypatch):
+    stats = fake_openai_server()
+    monkeypatch.setattr(settings.llm_retry, "max_retries", 0)
+    monkeypatch.setattr(settings.llm, "fallback_model", "fallback-mini")
+
+    asyncio.run(llm.achat(_messages("без повторов"), model="main-model"))
+    assert stats["models"] == ["main-model"]
+
+
+def test_achat_gives_up_after_max_retries(fake_openai_server, monkeypatch):
+    import openai
+
+    stats = fake_openai_server(failures=10)
+    monkeypatch.setattr(settings.llm_retry, "max_retries", 2)
+
+    with pytest.raises(openai.RateLimitError):
+        asyncio.run(llm.achat(_messages("без шансов")))
+    assert stats["calls"] == 3
+
+
+def test_achat_hedges_slow_request(fake_openai_server, monkeypatch):
+    stats = fake_openai_server(slow_calls=1, slow_latency=5.0)
+    monkeypatch.setattr(settings.llm_retry, "hedge", True)
+    monkeypatch.setattr(settings.llm_retry, "hedge_delay", 0.1)
+
+    started = time.monotonic()
+    answer = asyncio.run(llm.achat(_messages("хедж")))
+    assert answer.startswith("echo:")
+    assert stats["calls"] == 2
+    assert time.monotonic() - started < 2.0
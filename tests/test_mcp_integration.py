@@ -3,6 +3,8 @@
 from __future__ import annotations
 
 import os
+import subprocess
+import time
 from pathlib import Path
 
 import pytest
@@ -32,6 +34,7 @@ def mcp_env(tmp_path, monkeypatch):
     _setup_demo_repo(demo_repos, slug="docops-saas")
 
     settings.paths.demo_repos_dir = demo_repos
+    settings.paths.docs_index_dir = tmp_path / "docs_index"
 
     vector_path = tmp_path / "vector_store" / "documents.jsonl"
     os.environ["DOCOPS_VECTOR_STORE_PATH"] = str(vector_path)
@@ -77,4 +80,170 @@ def test_git_tools_and_vector_tools_integration(mcp_env):
     first = hits[0]
     assert first["doc_id"] == "docs/billing_overview.md"
     assert "подписки" in first["snippet"]
-    assert first["metadata"]["kind"] == "doc"
\ No newline at end of file
+    assert first["metadata"]["kind"] == "doc"
+
+
+def test_git_search_in_docs_rankers(mcp_env):
+    docs_dir = mcp_env["demo_repos_dir"] / "docops-saas" / "docs"
+    filler = " ".join(f"слово{i}" for i in range(300))
+    (docs_dir / "long.md").write_text(f"# Разное\n\nподписки подписки подписки {filler}", encoding="utf-8")
+
+    bm25 = git_tools.search_in_docs(project_slug="docops-saas", query="подписки")
+    assert bm25[0]["path"] == "docs/billing_overview.md"
+    assert "подписки" in bm25[0]["snippet"]
+
+    legacy = git_tools.search_in_docs(project_slug="docops-saas", query="подписки", ranker="legacy", min_score=1.0)
+    assert legacy[0]["path"] == "docs/long.md"
+
+
+def test_git_search_in_docs_bm25_matches_inflected_russian(mcp_env):
+    docs_dir = mcp_env["demo_repos_dir"] / "docops-saas" / "docs"
+    (docs_dir / "invoices.md").write_text("# Счета\n\nСервис биллинга выставляет счета.", encoding="utf-8")
+
+    # Запрос в другой форме слова находит документ так же, как подстрочный legacy-ранжировщик
+    for query in ("биллинг", "биллингом"):
+        hits = git_tools.search_in_docs(project_slug="docops-saas", query=query)
+        assert "docs/invoices.md" in [h["path"] for h in hits], query
+    legacy = git_tools.search_in_docs(project_slug="docops-saas", query="биллинг", ranker="legacy", min_score=1.0)
+    assert "docs/invoices.md" in [h["path"] for h in legacy]
+
+
+def test_git_docs_index_is_incremental(mcp_env, monkeypatch):
+    from app.mcp_client.docs_index import DocsIndex, get_docs_index, reset_docs_indexes
+
+    # Сверка с диском на каждом запросе (без паузы между сверками)
+    monkeypatch.setattr(git_tools, "_DOCS_REFRESH_INTERVAL", 0.0)
+    docs_dir = mcp_env["demo_repos_dir"] / "docops-saas" / "docs"
+    (docs_dir / "deploy.md").write_text("# Deploy\n\nДеплой через helm.", encoding="utf-8")
+
+    hits = git_tools.search_in_docs(project_slug="docops-saas", query="helm")
+    assert [h["path"] for h in hits] == ["docs/deploy.md"]
+
+    # Повторный запрос без изменений не перечитывает ни одного файла
+    reads = []
+    original_add = DocsIndex.add_file
+    monkeypatch.setattr(DocsIndex, "add_file", lambda self, rel, *a: reads.append(rel) or original_add(self, rel, *a))
+    git_tools.search_in_docs(project_slug="docops-saas", query="helm")
+    assert reads == []
+
+    # Изменился один файл — перечитывается только он; удаленный файл пропадает из индекса
+    (docs_dir / "deploy.md").write_text("# Deploy\n\nДеплой через argocd, без ручных шагов.", encoding="utf-8")
+    (docs_dir / "billing_overview.md").unlink()
+    assert git_tools.search_in_docs(project_slug="docops-saas", query="argocd")[0]["path"] == "docs/deploy.md"
+    assert reads == ["docs/deploy.md"]
+    assert git_tools.search_in_docs(project_slug="docops-saas", query="подписки") == []
+
+    # Снапшот на диске подхватывается новым процессом без переиндексации
+    reset_docs_indexes()
+    root = (mcp_env["demo_repos_dir"] / "docops-saas").resolve()
+    index = get_docs_index(root, "docops-saas")
+    assert set(index.files) == {"docs/deploy.md"}
+    assert index.refresh() == 0
+
+
+def test_git_docs_index_follows_commits(mcp_env, monkeypatch):
+    from app.mcp_client.docs_index import DocsIndex, get_docs_index
+
+    monkeypatch.setattr(git_tools, "_DOCS_REFRESH_INTERVAL", 0.0)
+    repo = (mcp_env["demo_repos_dir"] / "docops-saas").resolve()
+    docs_dir = repo / "docs"
+
+    def git(*args):
+        subprocess.run(
+            ["git", "-c", "user.name=test", "-c", "user.email=test@example.com", *args],
+            cwd=repo, check=True, capture_output=True,
+        )
+
+    git("init", "-q")
+    (docs_dir / "deploy.md").write_text("# Deploy\n\nДеплой через helm.", encoding="utf-8")
+    git("add", "-A")
+    git("commit", "-q", "-m", "init")
+
+    assert git_tools.search_in_docs(project_slug="docops-saas", query="helm")[0]["path"] == "docs/deploy.md"
+    index = get_docs_index(repo, "docops-saas")
+    assert index.commit is not None
+
+    # Дальше дерево не обходится: изменения берутся из git diff и git status
+    monkeypatch.setattr(DocsIndex, "_scan", lambda self: pytest.fail("full rescan"))
+    reads = []
+    original_add = DocsIndex.add_file
+    monkeypatch.setattr(DocsIndex, "add_file", lambda self, rel, *a: reads.append(rel) or original_add(self, rel, *a))
+
+    (docs_dir / "deploy.md").write_text("# Deploy\n\nДеплой через argocd.", encoding="utf-8")
+    (docs_dir / "billing_overview.md").unlink()
+    git("add", "-A")
+    git("commit", "-q", "-m", "switch to argocd")
+
+    assert git_tools.search_in_docs(project_slug="docops-saas", query="argocd")[0]["path"] == "docs/deploy.md"
+    assert git_tools.search_in_docs(project_slug="docops-saas", query="подписки") == []
+    assert reads == ["docs/deploy.md"]
+
+    # Незакоммиченные правки видны сразу, а их откат — при следующем обновлении
+    (docs_dir / "draft.md").write_text("# Draft\n\nЧерновик про kafka.", encoding="utf-8")
+    assert git_tools.search_in_docs(project_slug="docops-saas", query="kafka")[0]["path"] == "docs/draft.md"
+    (docs_dir / "draft.md").unlink()
+    assert git_tools.search_in_docs(project_slug="docops-saas", query="kafka") == []
+
+
+def test_git_search_in_docs_throttles_refresh(mcp_env, monkeypatch):
+    from app.mcp_client.docs_index import DocsIndex
+
+    docs_dir = mcp_env["demo_repos_dir"] / "docops-saas" / "docs"
+    (docs_dir / "deploy.md").write_text("# Deploy\n\nДеплой через helm.", encoding="utf-8")
+    assert git_tools.search_in_docs(project_slug="docops-saas", query="helm")[0]["path"] == "docs/deploy.md"
+
+    # Запросы подряд не сверяют индекс с диском (ни git, ни обхода каталога)
+    calls = []
+    original_state = DocsIndex._git_state
+    monkeypatch.setattr(DocsIndex, "_git_state", lambda self: calls.append("git") or original_state(self))
+    (docs_dir / "deploy.md").write_text("# Deploy\n\nДеплой через argocd.", encoding="utf-8")
+    assert git_tools.search_in_docs(project_slug="docops-saas", query="helm")[0]["path"] == "docs/deploy.md"
+    assert calls == []
+
+    # После интервала изменения подхватываются
+    monkeypatch.setattr(git_tools, "_DOCS_REFRESH_INTERVAL", 0.0)
+    assert git_tools.search_in_docs(project_slug="docops-saas", query="argocd")[0]["path"] == "docs/deploy.md"
+    assert calls == ["git"]
+
+
+def test_docs_watcher_pushes_changes_to_indexes(mcp_env, monkeypatch):
+    from app.core.watcher import DocsWatcher
+    from app.mcp_client.docs_index import DocsIndex
+    from app.mcp_client.ingest import VectorIngestQueue
+
+    docs_dir = mcp_env["demo_repos_dir"] / "docops-saas" / "docs"
+    ingest = VectorIngestQueue()
+    watcher = DocsWatcher(repos_dir=mcp_env["demo_repos_dir"], debounce=0.05, ingest=ingest)
+    ingest.start()
+    watcher.poll()
+
+    # Индекс ведет watcher — запросы не сверяют его с диском
+    monkeypatch.setattr(DocsIndex, "refresh", lambda self: pytest.fail("query-time refresh"))
+
+    (docs_dir / "deploy.md").write_text("# Deploy\n\nДеплой через helm.", encoding="utf-8")
+    watcher.poll()
+    (docs_dir / "deploy.md").write_text("# Deploy\n\nДеплой через helm и argocd.", encoding="utf-8")
+    watcher.poll()
+    # Изменения еще копятся (debounce)
+    assert git_tools.search_in_docs(project_slug="docops-saas", query="helm") == []
+
+    time.sleep(0.06)
+    watcher.poll()
+    ingest.join()
+
+    hits = git_tools.search_in_docs(project_slug="docops-saas", query="argocd")
+    assert [h["path"] for h in hits] == ["docs/deploy.md"]
+    hits = vector_tools.search_documents(project_slug="docops-saas", query="argocd")
+    assert [h["doc_id"] for h in hits] == ["docs/deploy.md"]
+
+    (docs_dir / "deploy.md").unlink()
+    time.sleep(0.06)
+    watcher.poll()
+    time.sleep(0.06)
+    watcher.poll()
+    ingest.join()
+    assert git_tools.search_in_docs(project_slug="docops-saas", query="argocd") == []
+    assert vector_tools.search_documents(project_slug="docops-saas", query="argocd") == []
+
+    monkeypatch.undo()
+    watcher.stop()
\ No newline at end of file